@@ -2,8 +2,11 @@ from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
+from backend.config import GROUP_CREATE_DEADLINE_SECONDS
+from backend.observability.tracing import traced
 from backend.schemas.groups import GroupCreateRequest, GroupCreateResponse, GroupInfoResponse, GroupResultsResponse, VoteRequest
 from backend.schemas.restaurants import Restaurant
+from backend.services import deadline
 from backend.services import groups as group_service
 from backend.services.exceptions import ServiceError
 
@@ -12,17 +15,20 @@ router = APIRouter(prefix="/api/groups", tags=["groups"])
 
 
 @router.post("", response_model=GroupCreateResponse)
+@traced
 async def create_group(
     group_request: GroupCreateRequest,
     member_id: str = Query(..., min_length=1, max_length=64, description="作成者のメンバーID"),
 ) -> GroupCreateResponse:
     try:
-        return await group_service.create_group(group_request, member_id)
+        with deadline.budget(GROUP_CREATE_DEADLINE_SECONDS):
+            return await group_service.create_group(group_request, member_id)
     except ServiceError as exc:
         raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
 
 
 @router.get("/{group_id}", response_model=GroupInfoResponse)
+@traced
 async def get_group(
     group_id: str,
     member_id: Optional[str] = Query(default=None, min_length=1, max_length=64, description="参加者のメンバーID"),
@@ -34,6 +40,7 @@ async def get_group(
 
 
 @router.get("/{group_id}/candidates", response_model=List[Restaurant])
+@traced
 async def get_group_candidates(
     group_id: str,
     member_id: Optional[str] = Query(default=None, min_length=1, max_length=64),
@@ -47,6 +54,7 @@ async def get_group_candidates(
 
 
 @router.post("/{group_id}/vote")
+@traced
 async def submit_vote(
     group_id: str,
     vote_request: VoteRequest,
@@ -60,6 +68,7 @@ async def submit_vote(
 
 
 @router.post("/{group_id}/finish", response_model=GroupResultsResponse)
+@traced
 async def finish_group(
     group_id: str,
     member_id: str = Query(..., min_length=1, max_length=64),
@@ -71,6 +80,7 @@ async def finish_group(
 
 
 @router.get("/{group_id}/results", response_model=GroupResultsResponse)
+@traced
 async def get_group_results(group_id: str) -> GroupResultsResponse:
     try:
         return await group_service.get_group_results(group_id)
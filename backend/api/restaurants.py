@@ -1,8 +1,11 @@
-from typing import List
+import json
+from typing import Any, AsyncIterator, Dict, List, Union
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from backend.api.deps import limiter
+from backend.observability.tracing import traced
 from backend.schemas.groups import SearchPreferences
 from backend.schemas.restaurants import Restaurant, SummarizeRequest
 from backend.services import restaurants as restaurant_service
@@ -14,6 +17,7 @@ router = APIRouter(prefix="/api/restaurants", tags=["restaurants"])
 
 @router.post("/search", response_model=List[Restaurant])
 @limiter.limit("10/minute")
+@traced
 async def search_restaurants(request: Request, preferences: SearchPreferences) -> List[Restaurant]:
     del request  # request is required for rate limiting but unused directly
     try:
@@ -24,16 +28,22 @@ async def search_restaurants(request: Request, preferences: SearchPreferences) -
 
 @router.get("/{place_id}", response_model=Restaurant)
 @limiter.limit("20/minute")
-async def get_restaurant_details(request: Request, place_id: str) -> Restaurant:
+@traced
+async def get_restaurant_details(
+    request: Request,
+    place_id: str,
+    summary: bool = Query(default=True, description="false なら要約を待たずに返す（要約は /summary/stream で取得）"),
+) -> Restaurant:
     del request
     try:
-        return await restaurant_service.get_restaurant_details(place_id)
+        return await restaurant_service.get_restaurant_details(place_id, include_summary=summary)
     except ServiceError as exc:
         raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
 
 
 @router.post("/summarize")
 @limiter.limit("30/minute")
+@traced
 async def summarize_restaurant(request: Request, request_data: SummarizeRequest) -> dict:
     del request
     try:
@@ -41,3 +51,67 @@ async def summarize_restaurant(request: Request, request_data: SummarizeRequest)
         return {"summary": summary}
     except ServiceError as exc:
         raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+
+
+SSE_RESPONSES: Dict[Union[int, str], Dict[str, Any]] = {
+    200: {
+        "description": "Server-Sent Events: 要約の断片ごとに `delta`、完了時に全文の `done`、途中で失敗したら `error`",
+        "content": {"text/event-stream": {}},
+    }
+}
+
+
+@router.get("/{place_id}/summary/stream", response_class=StreamingResponse, responses=SSE_RESPONSES)
+@limiter.limit("20/minute")
+@traced
+async def stream_restaurant_summary(request: Request, place_id: str) -> StreamingResponse:
+    del request
+    try:
+        restaurant = await restaurant_service.get_restaurant_details(place_id, include_summary=False)
+        return await _event_stream(restaurant_service.stream_summary(restaurant.name, restaurant.reviews, "detail"))
+    except ServiceError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+
+
+@router.post("/summarize/stream", response_class=StreamingResponse, responses=SSE_RESPONSES)
+@limiter.limit("30/minute")
+@traced
+async def stream_summary(request: Request, request_data: SummarizeRequest) -> StreamingResponse:
+    del request
+    try:
+        return await _event_stream(
+            restaurant_service.stream_summary(
+                request_data.restaurant_name, request_data.reviews, request_data.format or "card"
+            )
+        )
+    except ServiceError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+
+
+async def _event_stream(pieces: AsyncIterator[str]) -> StreamingResponse:
+    # Waiting for the first piece here lets failures before it still become an HTTP error status.
+    first = await pieces.__anext__()
+    return StreamingResponse(
+        _events(first, pieces),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _events(first: str, pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+    text = [first]
+    try:
+        yield _event("delta", {"text": first})
+        async for piece in pieces:
+            text.append(piece)
+            yield _event("delta", {"text": piece})
+    except ServiceError as exc:
+        yield _event("error", {"status_code": exc.status_code, "detail": exc.detail})
+        return
+    finally:
+        await pieces.aclose()
+    yield _event("done", {"summary": "".join(text).strip()})
+
+
+def _event(name: str, data: Dict[str, Any]) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
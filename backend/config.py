@@ -10,10 +10,194 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable must be set")
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+# "always" pings on every checkout, "idle" only when the connection sat unused for
+# DB_POOL_PRE_PING_IDLE_SECONDS, "off" never pings.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+SERVER_CONCURRENCY = int(os.getenv("SERVER_CONCURRENCY", "0"))
+
+# Only used with sqlite+aiosqlite URLs (single-node deployments and benchmarks).
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", "65536"))
+SQLITE_MMAP_SIZE_BYTES = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", str(256 * 1024 * 1024)))
+
+
+def _url_list(name: str) -> List[str]:
+    return [url.strip() for url in os.getenv(name, "").split(",") if url.strip()]
+
+
+DATABASE_REPLICA_URLS: List[str] = _url_list("DATABASE_REPLICA_URLS")
+DATABASE_REPLICA_LAG_QUERY = os.getenv("DATABASE_REPLICA_LAG_QUERY")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2.0"))
+REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL_SECONDS", "5.0"))
+REPLICA_LAG_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_TIMEOUT_SECONDS", "1.0"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10.0"))
+
+# Shard 0 is DATABASE_URL (with DATABASE_REPLICA_URLS); DATABASE_SHARD_URLS appends shards 1..N-1,
+# each with optional replicas in DATABASE_SHARD_<n>_REPLICA_URLS.
+DATABASE_SHARD_URLS: List[str] = [DATABASE_URL, *_url_list("DATABASE_SHARD_URLS")]
+DATABASE_SHARD_REPLICA_URLS: List[List[str]] = [
+    DATABASE_REPLICA_URLS,
+    *(_url_list(f"DATABASE_SHARD_{index}_REPLICA_URLS") for index in range(1, len(DATABASE_SHARD_URLS))),
+]
+SHARD_OVERRIDE_REFRESH_SECONDS = float(os.getenv("SHARD_OVERRIDE_REFRESH_SECONDS", "5.0"))
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# A request running the same statement this many times is logged as a likely N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in {"1", "true", "yes"}
+# "jsonl" writes one span per line; "chrome" writes trace events for chrome://tracing / Perfetto.
+TRACE_EXPORT_FORMAT = os.getenv("TRACE_EXPORT_FORMAT", "jsonl").lower()
+TRACE_EXPORT_PATH = os.getenv(
+    "TRACE_EXPORT_PATH", "traces/trace.json" if TRACE_EXPORT_FORMAT == "chrome" else "traces/trace.jsonl"
+)
+
+# Per-request sampling profiler; the middleware is not installed at all unless enabled.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in {"1", "true", "yes"}
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+
+# Cold start: skip the migration run when every shard already records the head revision, then
+# open this many pooled DB connections per primary and keep-alive connections per upstream host
+# before /readyz reports ready.
+FAST_START = os.getenv("FAST_START", "false").lower() in {"1", "true", "yes"}
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "0"))
+WARMUP_UPSTREAM_CONNECTIONS = int(os.getenv("WARMUP_UPSTREAM_CONNECTIONS", "0"))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", "60"))
+
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-GOOGLE_PLACES_API_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-GOOGLE_PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash-lite:generateContent"
+# Token-bucket quota for outbound calls, per upstream (0 = unlimited). "memory" keeps the buckets
+# per instance; "database" shares them across instances through shard 0.
+UPSTREAM_QUOTA_STORE = os.getenv("UPSTREAM_QUOTA_STORE", "memory").lower()
+PLACES_NEARBY_QPS = float(os.getenv("PLACES_NEARBY_QPS", "0"))
+PLACES_DETAILS_QPS = float(os.getenv("PLACES_DETAILS_QPS", "0"))
+GEMINI_QPS = float(os.getenv("GEMINI_QPS", "0"))
+UPSTREAM_QUOTA_BURST_SECONDS = float(os.getenv("UPSTREAM_QUOTA_BURST_SECONDS", "2"))
+# Share of each bucket that bulk calls (summaries) may not use, so interactive calls find tokens.
+UPSTREAM_QUOTA_BULK_RESERVE = float(os.getenv("UPSTREAM_QUOTA_BULK_RESERVE", "0.25"))
+UPSTREAM_QUOTA_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_QUOTA_MAX_WAIT_SECONDS", "10"))
+
+# Per-upstream circuit breaker over the last CIRCUIT_WINDOW calls. A call still running after the
+# upstream's slow-call threshold counts as a failure at that moment, without waiting for its timeout.
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+# Opens regardless of the rate, so a sudden outage is not diluted by the successes before it.
+CIRCUIT_CONSECUTIVE_FAILURES = int(os.getenv("CIRCUIT_CONSECUTIVE_FAILURES", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "3"))
+PLACES_SLOW_CALL_SECONDS = float(os.getenv("PLACES_SLOW_CALL_SECONDS", "3"))
+# Also the timeout for the optional card summaries generated during group creation.
+GEMINI_SLOW_CALL_SECONDS = float(os.getenv("GEMINI_SLOW_CALL_SECONDS", "8"))
+# AIMD concurrency limit per upstream: +1/limit per fast success, x BACKOFF per failure or slow call.
+UPSTREAM_CONCURRENCY_INITIAL = int(os.getenv("UPSTREAM_CONCURRENCY_INITIAL", "20"))
+UPSTREAM_CONCURRENCY_MIN = int(os.getenv("UPSTREAM_CONCURRENCY_MIN", "2"))
+UPSTREAM_CONCURRENCY_MAX = int(os.getenv("UPSTREAM_CONCURRENCY_MAX", "100"))
+UPSTREAM_CONCURRENCY_BACKOFF = float(os.getenv("UPSTREAM_CONCURRENCY_BACKOFF", "0.5"))
+# Calls over the limit queue this long (or until the request's deadline) before getting a 503.
+UPSTREAM_CONCURRENCY_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_CONCURRENCY_MAX_WAIT_SECONDS", "5"))
+
+# Hedged requests: an idempotent call to an upstream listed in HEDGE_UPSTREAMS that has not answered by
+# the HEDGE_PERCENTILE of its recent latencies gets a second attempt. Hedges are capped at
+# HEDGE_MAX_RATIO of the calls, since each one spends quota.
+HEDGE_UPSTREAMS = {name.strip() for name in os.getenv("HEDGE_UPSTREAMS", "").split(",") if name.strip()}
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.05"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "20"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "50"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "500"))
+
+# Gemini calls run in at most LLM_MAX_CONCURRENCY slots, of which bulk work (group-creation card summaries)
+# may hold LLM_BULK_MAX_CONCURRENCY, so interactive summaries always find a free slot soon. Work that has
+# queued for LLM_*_MAX_QUEUE_SECONDS, or whose request deadline comes first, is dropped.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_BULK_MAX_CONCURRENCY = int(os.getenv("LLM_BULK_MAX_CONCURRENCY", "12"))
+LLM_INTERACTIVE_MAX_QUEUE_SECONDS = float(os.getenv("LLM_INTERACTIVE_MAX_QUEUE_SECONDS", "10"))
+LLM_BULK_MAX_QUEUE_SECONDS = float(os.getenv("LLM_BULK_MAX_QUEUE_SECONDS", "30"))
+
+# Review text in a summary prompt is trimmed to about this many tokens, per summary format.
+SUMMARY_CARD_REVIEW_TOKENS = int(os.getenv("SUMMARY_CARD_REVIEW_TOKENS", "600"))
+SUMMARY_DETAIL_REVIEW_TOKENS = int(os.getenv("SUMMARY_DETAIL_REVIEW_TOKENS", "1500"))
+# Gemini prices used for the cost estimates in metrics and group-creation logs.
+GEMINI_INPUT_USD_PER_MILLION_TOKENS = float(os.getenv("GEMINI_INPUT_USD_PER_MILLION_TOKENS", "0.10"))
+GEMINI_OUTPUT_USD_PER_MILLION_TOKENS = float(os.getenv("GEMINI_OUTPUT_USD_PER_MILLION_TOKENS", "0.40"))
+
+# Gemini summaries are reused for SUMMARY_CACHE_TTL_SECONDS; older ones are still served for up to
+# SUMMARY_CACHE_STALE_SECONDS when Gemini cannot be called.
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "3600"))
+SUMMARY_CACHE_STALE_SECONDS = float(os.getenv("SUMMARY_CACHE_STALE_SECONDS", "86400"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+# POST /api/groups answers within this budget. Candidates whose details or summary are not ready
+# GROUP_CREATE_WRITE_RESERVE_SECONDS before it ends are stored from the nearby search alone and
+# completed in the background, within RESTAURANT_ENRICHMENT_DEADLINE_SECONDS of the search.
+GROUP_CREATE_DEADLINE_SECONDS = float(os.getenv("GROUP_CREATE_DEADLINE_SECONDS", "8"))
+GROUP_CREATE_WRITE_RESERVE_SECONDS = float(os.getenv("GROUP_CREATE_WRITE_RESERVE_SECONDS", "1"))
+RESTAURANT_ENRICHMENT_DEADLINE_SECONDS = float(os.getenv("RESTAURANT_ENRICHMENT_DEADLINE_SECONDS", "60"))
+# Each requested place type is searched in parallel; the best GROUP_INITIAL_CANDIDATES results are
+# enriched for the response, and the rest plus up to NEARBY_SEARCH_MAX_PAGES pages per type (Google
+# stops at 3) are added to the group's deck in the background. A next_page_token only works after
+# about NEARBY_PAGE_TOKEN_DELAY_SECONDS and is retried NEARBY_PAGE_TOKEN_RETRIES times before that.
+GROUP_INITIAL_CANDIDATES = int(os.getenv("GROUP_INITIAL_CANDIDATES", "20"))
+NEARBY_SEARCH_MAX_PAGES = int(os.getenv("NEARBY_SEARCH_MAX_PAGES", "3"))
+NEARBY_PAGE_TOKEN_DELAY_SECONDS = float(os.getenv("NEARBY_PAGE_TOKEN_DELAY_SECONDS", "2"))
+NEARBY_PAGE_TOKEN_RETRIES = int(os.getenv("NEARBY_PAGE_TOKEN_RETRIES", "2"))
+# When a member has DECK_EXTENSION_REMAINING or fewer candidates left, up to DECK_EXTENSION_SIZE more are
+# searched in the cells around the group's area and appended to its deck, at most DECK_MAX_EXTENSIONS times.
+DECK_EXTENSION_REMAINING = int(os.getenv("DECK_EXTENSION_REMAINING", "10"))
+DECK_EXTENSION_SIZE = int(os.getenv("DECK_EXTENSION_SIZE", "20"))
+DECK_MAX_EXTENSIONS = int(os.getenv("DECK_MAX_EXTENSIONS", "3"))
+# Places found by searches are kept in an in-process index, loaded from group_restaurants of all shards every
+# PLACE_INDEX_REFRESH_SECONDS. A search that the index can answer with GROUP_INITIAL_CANDIDATES places seen in the
+# last PLACE_INDEX_FRESH_SECONDS gets them as its first candidates without waiting for Google (which still runs in
+# the background for the rest of the deck). When every nearby search fails, places seen in the last
+# PLACE_INDEX_STALE_SECONDS are used instead; older ones are dropped. The index is off unless
+# PLACE_INDEX_FRESH_SECONDS is above 0 (e.g. 1800).
+PLACE_INDEX_FRESH_SECONDS = float(os.getenv("PLACE_INDEX_FRESH_SECONDS", "0"))
+PLACE_INDEX_STALE_SECONDS = float(os.getenv("PLACE_INDEX_STALE_SECONDS", "604800"))
+PLACE_INDEX_REFRESH_SECONDS = float(os.getenv("PLACE_INDEX_REFRESH_SECONDS", "60"))
+# Place details for cards are reused for PLACE_DETAILS_CACHE_TTL_SECONDS.
+PLACE_DETAILS_CACHE_TTL_SECONDS = float(os.getenv("PLACE_DETAILS_CACHE_TTL_SECONDS", "21600"))
+PLACE_DETAILS_CACHE_MAX_ENTRIES = int(os.getenv("PLACE_DETAILS_CACHE_MAX_ENTRIES", "5000"))
+# PREWARM_LEAD_MINUTES before each peak in PREWARM_PEAKS (local "HH:MM" times at PREWARM_UTC_OFFSET_HOURS), the
+# areas where most groups were created within PREWARM_WINDOW_MINUTES after that peak during the last
+# PREWARM_HISTORY_DAYS are searched and their places enriched, so the index of known places and the details and
+# summary caches are warm. At most PREWARM_MAX_CELLS areas of PREWARM_MIN_GROUPS or more groups are warmed, with
+# at most PREWARM_UPSTREAM_BUDGET Google and Gemini calls per peak and instance, so a fleet spends up to that many
+# times its instance count. Off unless PREWARM_PEAKS is set (e.g. "11:30,18:00").
+PREWARM_PEAKS = [peak.strip() for peak in os.getenv("PREWARM_PEAKS", "").split(",") if peak.strip()]
+PREWARM_UTC_OFFSET_HOURS = float(os.getenv("PREWARM_UTC_OFFSET_HOURS", "9"))
+PREWARM_LEAD_MINUTES = float(os.getenv("PREWARM_LEAD_MINUTES", "15"))
+PREWARM_WINDOW_MINUTES = float(os.getenv("PREWARM_WINDOW_MINUTES", "60"))
+PREWARM_HISTORY_DAYS = int(os.getenv("PREWARM_HISTORY_DAYS", "14"))
+PREWARM_MAX_CELLS = int(os.getenv("PREWARM_MAX_CELLS", "10"))
+PREWARM_MIN_GROUPS = int(os.getenv("PREWARM_MIN_GROUPS", "3"))
+PREWARM_UPSTREAM_BUDGET = int(os.getenv("PREWARM_UPSTREAM_BUDGET", "400"))
+# Time background work gets to finish on shutdown before it is cancelled.
+BACKGROUND_DRAIN_SECONDS = float(os.getenv("BACKGROUND_DRAIN_SECONDS", "5"))
+
+# Point these at backend/scripts/upstream_simulator.py to run without the paid APIs.
+GOOGLE_PLACES_API_URL = os.getenv(
+    "GOOGLE_PLACES_API_URL", "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+)
+GOOGLE_PLACE_DETAILS_URL = os.getenv(
+    "GOOGLE_PLACE_DETAILS_URL", "https://maps.googleapis.com/maps/api/place/details/json"
+)
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash-lite:generateContent"
+)
+# Streamed summaries use the same model's streamGenerateContent method (with alt=sse).
+GEMINI_STREAM_API_URL = os.getenv(
+    "GEMINI_STREAM_API_URL", GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent")
+)
 
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:5173")
 
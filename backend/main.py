@@ -1,12 +1,18 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi.errors import RateLimitExceeded
 from slowapi import _rate_limit_exceeded_handler
 
 from backend.api import router as api_router
 from backend.api.deps import limiter
-from backend.config import ALLOWED_ORIGINS
-from backend.services.database import init_models, shutdown_engine
+from backend.config import ALLOWED_ORIGINS, BACKGROUND_DRAIN_SECONDS, PROFILING_ENABLED
+from backend.observability import metrics
+from backend.observability.middleware import MetricsMiddleware
+from backend.services import background, groups, prewarm, upstream, warmup
+from backend.services.database import check_pool_sizing, init_models, keep_replica_lag_fresh, shutdown_engine
 
 
 app = FastAPI()
@@ -20,6 +26,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if PROFILING_ENABLED:
+    from backend.observability.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+# Added last so it wraps CORS too and times the whole request.
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router)
 
@@ -29,11 +41,35 @@ async def root():
     return {"message": "Food Finder API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readiness() -> JSONResponse:
+    status_code = 200 if warmup.state.ready else 503
+    body = {"status": "ready" if warmup.state.ready else "warming_up", "warmup_seconds": warmup.state.seconds}
+    return JSONResponse(body, status_code=status_code)
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
+    check_pool_sizing()
     await init_models()
+    # Warm-up runs after the server starts accepting requests; point the startup probe at /readyz.
+    app.state.warmup_task = asyncio.create_task(warmup.warm_up())
+    app.state.replica_lag_task = asyncio.create_task(keep_replica_lag_fresh())
+    app.state.known_places_task = asyncio.create_task(groups.keep_known_places_fresh())
+    app.state.prewarm_task = asyncio.create_task(prewarm.keep_warming())
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    app.state.warmup_task.cancel()
+    app.state.replica_lag_task.cancel()
+    app.state.known_places_task.cancel()
+    app.state.prewarm_task.cancel()
+    await background.drain(BACKGROUND_DRAIN_SECONDS)
+    await upstream.close_shared_client()
     await shutdown_engine()
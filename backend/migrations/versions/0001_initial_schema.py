@@ -0,0 +1,95 @@
+"""Initial schema matching the tables previously created by create_all
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2025-10-25 00:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001_initial_schema"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "groups",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("group_name", sa.String(length=50), nullable=True),
+        sa.Column("organizer_id", sa.String(length=64), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("radius", sa.Integer(), nullable=False),
+        sa.Column("min_price", sa.Integer(), nullable=True),
+        sa.Column("max_price", sa.Integer(), nullable=True),
+        sa.Column("types", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "group_members",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("group_id", sa.String(length=32), nullable=False),
+        sa.Column("member_id", sa.String(length=64), nullable=False),
+        sa.Column("joined_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("group_id", "member_id", name="uq_group_member"),
+    )
+    op.create_index("ix_group_members_group_id", "group_members", ["group_id"])
+    op.create_table(
+        "group_restaurants",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("group_id", sa.String(length=32), nullable=False),
+        sa.Column("place_id", sa.String(length=128), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("address", sa.String(length=255), nullable=True),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("price_level", sa.Integer(), nullable=True),
+        sa.Column("photo_url", sa.Text(), nullable=True),
+        sa.Column("photo_urls", sa.JSON(), nullable=True),
+        sa.Column("lat", sa.Float(), nullable=False),
+        sa.Column("lng", sa.Float(), nullable=False),
+        sa.Column("types", sa.JSON(), nullable=True),
+        sa.Column("reviews", sa.JSON(), nullable=True),
+        sa.Column("phone_number", sa.String(length=64), nullable=True),
+        sa.Column("website", sa.String(length=255), nullable=True),
+        sa.Column("google_maps_url", sa.String(length=255), nullable=True),
+        sa.Column("user_ratings_total", sa.Integer(), nullable=True),
+        sa.Column("opening_hours", sa.JSON(), nullable=True),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("group_id", "place_id", name="uq_group_restaurant"),
+    )
+    op.create_index("ix_group_restaurants_group_id", "group_restaurants", ["group_id"])
+    op.create_table(
+        "group_votes",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("group_id", sa.String(length=32), nullable=False),
+        sa.Column("member_id", sa.String(length=64), nullable=False),
+        sa.Column("place_id", sa.String(length=128), nullable=False),
+        sa.Column("value", sa.String(length=10), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["group_id"], ["groups.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("group_id", "member_id", "place_id", name="uq_group_vote"),
+    )
+    op.create_index("ix_group_votes_group_id", "group_votes", ["group_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_group_votes_group_id", table_name="group_votes")
+    op.drop_table("group_votes")
+    op.drop_index("ix_group_restaurants_group_id", table_name="group_restaurants")
+    op.drop_table("group_restaurants")
+    op.drop_index("ix_group_members_group_id", table_name="group_members")
+    op.drop_table("group_members")
+    op.drop_table("groups")
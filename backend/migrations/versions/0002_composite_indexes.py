@@ -0,0 +1,39 @@
+"""Composite indexes for the candidate deck and result aggregation queries
+
+fetch_restaurants filters on group_id and orders by position, so
+(group_id, position) removes the filesort. fetch_votes reads only
+(place_id, value) for a group, which (group_id, place_id, value) answers
+from the index alone. The member vote lookup and candidate_exists are
+already served by the uq_group_vote and uq_group_restaurant prefixes.
+
+Revision ID: 0002_composite_indexes
+Revises: 0001_initial_schema
+Create Date: 2025-10-25 00:00:01.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0002_composite_indexes"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_group_restaurants_group_position",
+        "group_restaurants",
+        ["group_id", "position"],
+    )
+    op.create_index(
+        "ix_group_votes_group_place_value",
+        "group_votes",
+        ["group_id", "place_id", "value"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_group_votes_group_place_value", table_name="group_votes")
+    op.drop_index("ix_group_restaurants_group_position", table_name="group_restaurants")
@@ -0,0 +1,30 @@
+"""Directory of groups moved away from the shard encoded in their id
+
+Revision ID: 0003_group_shard_overrides
+Revises: 0002_composite_indexes
+Create Date: 2025-10-25 00:00:02.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003_group_shard_overrides"
+down_revision: Union[str, None] = "0002_composite_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "group_shard_overrides",
+        sa.Column("group_id", sa.String(length=32), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("moved_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("group_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("group_shard_overrides")
@@ -0,0 +1,30 @@
+"""Token buckets for the shared upstream quota governor
+
+Revision ID: 0004_upstream_quota_buckets
+Revises: 0003_group_shard_overrides
+Create Date: 2025-10-25 00:00:03.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004_upstream_quota_buckets"
+down_revision: Union[str, None] = "0003_group_shard_overrides"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "upstream_quota_buckets",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("tokens", sa.Double(), nullable=False),
+        sa.Column("updated_at", sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("upstream_quota_buckets")
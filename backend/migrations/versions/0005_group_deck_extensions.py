@@ -0,0 +1,24 @@
+"""Count of deck extensions per group
+
+Revision ID: 0005_group_deck_extensions
+Revises: 0004_upstream_quota_buckets
+Create Date: 2025-10-25 00:00:04.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005_group_deck_extensions"
+down_revision: Union[str, None] = "0004_upstream_quota_buckets"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("groups", sa.Column("deck_extensions", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("groups", "deck_extensions")
@@ -0,0 +1,27 @@
+"""Index on groups.created_at
+
+The pre-peak warmer reads the location of every group created during the last
+PREWARM_HISTORY_DAYS to find the busiest areas; the index turns that into a
+range scan.
+
+Revision ID: 0006_groups_created_at_index
+Revises: 0005_group_deck_extensions
+Create Date: 2025-10-25 00:00:05.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0006_groups_created_at_index"
+down_revision: Union[str, None] = "0005_group_deck_extensions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_groups_created_at", "groups", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_groups_created_at", table_name="groups")
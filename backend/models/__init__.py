@@ -1,10 +1,14 @@
 from .base import Base  # noqa: F401
 from .group import GroupMemberModel, GroupModel, GroupRestaurantModel, GroupVoteModel
+from .quota import UpstreamQuotaBucketModel
+from .shard import GroupShardOverrideModel
 
 __all__ = [
     "Base",
     "GroupModel",
     "GroupMemberModel",
     "GroupRestaurantModel",
+    "GroupShardOverrideModel",
     "GroupVoteModel",
+    "UpstreamQuotaBucketModel",
 ]
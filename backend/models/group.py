@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import JSON, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -20,7 +20,8 @@ class GroupModel(Base):
     max_price: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     types: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="voting")
-    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    deck_extensions: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, index=True)
 
 
 class GroupMemberModel(Base):
@@ -35,7 +36,10 @@ class GroupMemberModel(Base):
 
 class GroupRestaurantModel(Base):
     __tablename__ = "group_restaurants"
-    __table_args__ = (UniqueConstraint("group_id", "place_id", name="uq_group_restaurant"),)
+    __table_args__ = (
+        UniqueConstraint("group_id", "place_id", name="uq_group_restaurant"),
+        Index("ix_group_restaurants_group_position", "group_id", "position"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -61,7 +65,10 @@ class GroupRestaurantModel(Base):
 
 class GroupVoteModel(Base):
     __tablename__ = "group_votes"
-    __table_args__ = (UniqueConstraint("group_id", "member_id", "place_id", name="uq_group_vote"),)
+    __table_args__ = (
+        UniqueConstraint("group_id", "member_id", "place_id", name="uq_group_vote"),
+        Index("ix_group_votes_group_place_value", "group_id", "place_id", "value"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[str] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
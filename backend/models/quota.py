@@ -0,0 +1,15 @@
+from sqlalchemy import Double, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class UpstreamQuotaBucketModel(Base):
+    """Token buckets shared by all instances for outbound API quota. Only shard 0 holds rows."""
+
+    __tablename__ = "upstream_quota_buckets"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Double, nullable=False)
+    # Unix time of the last refill; a float so sub-second refills are not lost.
+    updated_at: Mapped[float] = mapped_column(Double, nullable=False)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class GroupShardOverrideModel(Base):
+    """Groups moved off the shard encoded in their id. Only shard 0 holds rows."""
+
+    __tablename__ = "group_shard_overrides"
+
+    group_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    moved_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1 @@
+__all__ = ["llm", "metrics", "middleware", "profiling", "queries", "tracing"]
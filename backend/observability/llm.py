@@ -0,0 +1,98 @@
+"""Token, latency and cost accounting for LLM (Gemini) calls.
+
+``record_call`` is called once per summary that was asked for: with the token
+counts of the Gemini call that produced it, or with ``cache`` set to ``hit`` or
+``stale`` and no tokens when the summary cache answered instead. It feeds the
+metrics, a debug log line per call and any ``record_usage`` block open in the current
+context (including tasks started inside it), which is how group creation
+reports what its summaries cost.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple
+
+from backend.config import GEMINI_INPUT_USD_PER_MILLION_TOKENS, GEMINI_OUTPUT_USD_PER_MILLION_TOKENS
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+LLM_SUMMARIES = metrics.counter(
+    "llm_summaries", "Summaries asked for, by prompt format and cache status (hit, stale, miss)", ("format", "cache")
+)
+LLM_TOKENS = metrics.counter("llm_tokens", "Tokens sent to and returned by Gemini", ("format", "kind"))
+LLM_COST = metrics.counter("llm_cost_usd", "Estimated Gemini cost in US dollars", ("format",))
+LLM_CALL_DURATION = metrics.histogram("llm_call_duration_seconds", "Latency of Gemini calls", ("format",))
+
+
+def cost_usd(prompt_tokens: int, response_tokens: int) -> float:
+    return (
+        prompt_tokens * GEMINI_INPUT_USD_PER_MILLION_TOKENS + response_tokens * GEMINI_OUTPUT_USD_PER_MILLION_TOKENS
+    ) / 1_000_000
+
+
+class Usage:
+    __slots__ = ("calls", "cached", "prompt_tokens", "response_tokens", "seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cached = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.seconds = 0.0
+
+    @property
+    def cost_usd(self) -> float:
+        return cost_usd(self.prompt_tokens, self.response_tokens)
+
+    def describe(self) -> str:
+        return (
+            f"{self.calls} Gemini calls ({self.cached} more from cache), "
+            f"{self.prompt_tokens} prompt + {self.response_tokens} response tokens, "
+            f"{self.seconds:.1f}s, ~${self.cost_usd:.5f}"
+        )
+
+
+_active_usage: ContextVar[Tuple[Usage, ...]] = ContextVar("active_llm_usage", default=())
+
+
+@contextmanager
+def record_usage() -> Iterator[Usage]:
+    """Total the LLM calls made in this context (including tasks it spawns, even after the block)."""
+    usage = Usage()
+    token = _active_usage.set((*_active_usage.get(), usage))
+    try:
+        yield usage
+    finally:
+        _active_usage.reset(token)
+
+
+def record_call(
+    format: str, cache: str, prompt_tokens: int = 0, response_tokens: int = 0, seconds: float = 0.0
+) -> None:
+    LLM_SUMMARIES.labels(format, cache).inc()
+    for usage in _active_usage.get():
+        if cache == "miss":
+            usage.calls += 1
+            usage.prompt_tokens += prompt_tokens
+            usage.response_tokens += response_tokens
+            usage.seconds += seconds
+        else:
+            usage.cached += 1
+    if cache != "miss":
+        logger.debug("Summary (%s) from cache: %s", format, cache)
+        return
+    LLM_TOKENS.labels(format, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(format, "response").inc(response_tokens)
+    LLM_COST.labels(format).inc(cost_usd(prompt_tokens, response_tokens))
+    LLM_CALL_DURATION.labels(format).observe(seconds)
+    logger.debug(
+        "Gemini call (%s): %d prompt + %d response tokens in %.0f ms",
+        format,
+        prompt_tokens,
+        response_tokens,
+        seconds * 1000,
+    )
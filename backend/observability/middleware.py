@@ -0,0 +1,80 @@
+"""ASGI middleware recording per-route latency, status codes and SQL cost.
+
+It is a plain ASGI callable rather than a ``BaseHTTPMiddleware`` so that it adds
+no extra task or memory stream per request; the bookkeeping is a couple of
+``perf_counter`` calls and cached metric-child lookups.
+"""
+
+import logging
+from time import perf_counter
+
+from . import metrics
+from .queries import RequestStats, current_request_stats, normalize_sql
+
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template", ("method", "route")
+)
+HTTP_RESPONSES = metrics.counter(
+    "http_responses", "Responses sent, by route template and status", ("method", "route", "status")
+)
+HTTP_DB_STATEMENTS = metrics.histogram(
+    "http_request_db_statements",
+    "SQL statements executed while serving a request",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 100),
+)
+HTTP_DB_SECONDS = metrics.histogram(
+    "http_request_db_seconds", "Time spent executing SQL while serving a request", ("method", "route")
+)
+HTTP_N_PLUS_ONE = metrics.counter(
+    "http_n_plus_one_queries", "Requests that repeated one query N_PLUS_ONE_THRESHOLD times", ("method", "route")
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request_stats.reset(token)
+            # The router stores the matched route in the shared scope; using its template keeps
+            # label cardinality bounded no matter which ids appear in the path.
+            route = scope.get("route")
+            route_label = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route_label).observe(perf_counter() - started)
+            HTTP_RESPONSES.labels(method, route_label, str(status)).inc()
+            HTTP_DB_STATEMENTS.labels(method, route_label).observe(stats.statements)
+            HTTP_DB_SECONDS.labels(method, route_label).observe(stats.db_seconds)
+            for statement in stats.n_plus_one:
+                HTTP_N_PLUS_ONE.labels(method, route_label).inc()
+                logger.warning(
+                    "Possible N+1 on %s %s: ran %d times: %s",
+                    method,
+                    route_label,
+                    stats.repeats[statement],
+                    normalize_sql(statement),
+                )
@@ -0,0 +1,199 @@
+"""Opt-in sampling profiler for individual requests.
+
+A request is profiled when it carries ``X-Profile-Token: <PROFILING_ADMIN_TOKEN>``
+or is picked by ``PROFILING_SAMPLE_RATE``. While it runs, a helper thread
+samples the request task every ``PROFILING_INTERVAL_MS``:
+
+* if the task is executing, the event loop thread's Python stack is recorded;
+* if it is suspended, the chain of awaiting coroutines is walked down to the
+  future it waits on, so time spent waiting on the database or an upstream API
+  shows up under the code that awaited it.
+
+Two files are written to ``PROFILING_OUTPUT_DIR``, named after the route and the
+request id: ``.collapsed`` (folded stacks for flamegraph.pl, speedscope or
+Inferno) and ``.top.txt`` (functions by self and inclusive samples). The
+middleware is only installed when ``PROFILING_ENABLED`` is set.
+"""
+
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import (
+    PROFILING_ADMIN_TOKEN,
+    PROFILING_INTERVAL_MS,
+    PROFILING_OUTPUT_DIR,
+    PROFILING_SAMPLE_RATE,
+)
+
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+REQUEST_ID_HEADER = b"x-request-id"
+PROFILE_ID_HEADER = b"x-profile-id"
+TOP_FUNCTIONS = 40
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    marker = f"{os.sep}backend{os.sep}"
+    if marker in filename:
+        filename = "backend" + os.sep + filename.split(marker, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _awaitable_frame(awaitable) -> Optional[FrameType]:
+    for attribute in ("cr_frame", "gi_frame", "ag_frame"):
+        frame = getattr(awaitable, attribute, None)
+        if frame is not None:
+            return frame
+    return None
+
+
+def _awaited(awaitable):
+    for attribute in ("cr_await", "gi_yieldfrom", "ag_await"):
+        awaited = getattr(awaitable, attribute, None)
+        if awaited is not None:
+            return awaited
+    return None
+
+
+class TaskSampler:
+    """Samples one asyncio task from a background thread."""
+
+    def __init__(self, task: asyncio.Task, loop_thread_id: int, interval: float) -> None:
+        self.task = task
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                self.samples[stack] += 1
+
+    def _sample(self) -> Optional[Tuple[str, ...]]:
+        if self.task.done():
+            return None
+        frames: List[FrameType] = []
+        leaf: Optional[str] = None
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = _awaitable_frame(awaitable)
+            if frame is None:
+                break
+            frames.append(frame)
+            awaited = _awaited(awaitable)
+            if awaited is not None and _awaitable_frame(awaited) is None:
+                leaf = f"[await {type(awaited).__name__}]"
+                break
+            awaitable = awaited
+        if not frames:
+            return None
+
+        labels = [_frame_label(frame) for frame in frames]
+        if leaf is not None:
+            labels.append(leaf)
+            return tuple(labels)
+
+        # The innermost coroutine is running: add the synchronous calls made beneath it.
+        thread_frame = sys._current_frames().get(self.loop_thread_id)
+        callees: List[str] = []
+        innermost = frames[-1]
+        while thread_frame is not None and thread_frame is not innermost:
+            callees.append(_frame_label(thread_frame))
+            thread_frame = thread_frame.f_back
+        if thread_frame is innermost:
+            labels.extend(reversed(callees))
+        labels.append("[cpu]")
+        return tuple(labels)
+
+
+def write_profile(directory: str, basename: str, samples: Counter, interval: float) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{basename}.collapsed"), "w", encoding="utf-8") as handle:
+        for stack, count in samples.most_common():
+            handle.write(";".join(stack) + f" {count}\n")
+
+    total = sum(samples.values())
+    self_counts: Counter = Counter()
+    inclusive_counts: Counter = Counter()
+    for stack, count in samples.items():
+        # Leaves are "[cpu]" or "[await X]" markers; attribute them to the function they are in.
+        self_counts[" ".join(stack[-2:])] += count
+        for label in set(stack):
+            inclusive_counts[label] += count
+
+    with open(os.path.join(directory, f"{basename}.top.txt"), "w", encoding="utf-8") as handle:
+        handle.write(f"{total} samples, {interval * 1000:g} ms interval (~{total * interval:.3f}s observed)\n")
+        for title, counts in (("self", self_counts), ("inclusive", inclusive_counts)):
+            handle.write(f"\n== {title}\n{'samples':>8} {'share':>7}  function\n")
+            for label, count in counts.most_common(TOP_FUNCTIONS):
+                handle.write(f"{count:>8} {count / total:>7.1%}  {label}\n")
+
+
+def _route_slug(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return re.sub(r"[^A-Za-z0-9]+", "_", f"{scope['method']}_{path}").strip("_")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+        self.interval = PROFILING_INTERVAL_MS / 1000
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILING_ADMIN_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_TOKEN_HEADER:
+                    return hmac.compare_digest(value, PROFILING_ADMIN_TOKEN.encode())
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        request_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1") or uuid.uuid4().hex[:16]
+        request_id = re.sub(r"[^A-Za-z0-9_-]", "", request_id)[:64] or uuid.uuid4().hex[:16]
+
+        async def send_with_profile_id(message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = [*message.get("headers", []), (PROFILE_ID_HEADER, request_id.encode())]
+                message = dict(message, headers=response_headers)
+            await send(message)
+
+        sampler = TaskSampler(asyncio.current_task(), threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            basename = f"{_route_slug(scope)}_{request_id}"
+            await asyncio.to_thread(self._finish, sampler, basename)
+
+    def _finish(self, sampler: TaskSampler, basename: str) -> None:
+        sampler.stop()
+        if sampler.samples:
+            write_profile(PROFILING_OUTPUT_DIR, basename, sampler.samples, self.interval)
@@ -0,0 +1,131 @@
+"""Per-request and per-call SQL accounting.
+
+``record_statement`` is called from the engine's ``after_cursor_execute`` hook
+for every statement. It feeds the current request's totals (set by
+``MetricsMiddleware``), any ``record_queries`` block that is open in the current
+context, the slow-query log and the N+1 detector. Transaction control
+statements (SQLite's explicit ``BEGIN IMMEDIATE``, savepoints) are not counted
+as queries.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+from backend.config import N_PLUS_ONE_THRESHOLD, SLOW_QUERY_THRESHOLD_MS
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = metrics.counter("db_slow_queries", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ("engine",))
+
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s|:\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """Collapse literals, placeholders and IN lists so equivalent queries compare equal."""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "repeats", "n_plus_one")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.repeats: Counter = Counter()
+        self.n_plus_one: List[str] = []
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class QueryLog:
+    def __init__(self) -> None:
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def describe(self) -> str:
+        return "\n".join(
+            f"  {index}. [{duration * 1000:.2f} ms] {normalize_sql(statement)}"
+            for index, (statement, duration) in enumerate(self.statements, start=1)
+        )
+
+
+_active_logs: ContextVar[Tuple[QueryLog, ...]] = ContextVar("active_query_logs", default=())
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryLog]:
+    """Collect every statement executed in this context (including tasks it spawns)."""
+    log = QueryLog()
+    token = _active_logs.set((*_active_logs.get(), log))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[QueryLog]:
+    """Fail with ``QueryBudgetExceeded`` when the block runs more than ``max_queries`` statements.
+
+    Usage::
+
+        with query_budget(2, "submit_vote"):
+            await group_service.submit_vote(group_id, member_id, vote)
+    """
+    with record_queries() as log:
+        yield log
+    if log.count > max_queries:
+        raise QueryBudgetExceeded(f"{label} ran {log.count} queries (budget {max_queries}):\n{log.describe()}")
+
+
+def record_statement(engine_label: str, statement: str, elapsed: float) -> None:
+    if statement.lstrip()[:9].upper().startswith(TRANSACTION_CONTROL):
+        return
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        # SQLAlchemy reuses the compiled string for a query shape, so identical text means
+        # the same query issued again with different parameters.
+        stats.repeats[statement] += 1
+        if stats.repeats[statement] == N_PLUS_ONE_THRESHOLD:
+            stats.n_plus_one.append(statement)
+
+    for log in _active_logs.get():
+        log.statements.append((statement, elapsed))
+
+    if elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        SLOW_QUERIES.labels(engine_label).inc()
+        logger.warning("Slow query on %s (%.1f ms): %s", engine_label, elapsed * 1000, normalize_sql(statement))
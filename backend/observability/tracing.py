@@ -0,0 +1,220 @@
+"""Lightweight in-process tracing with a local file exporter.
+
+Spans nest through a ``ContextVar``, so concurrent requests and tasks started
+with ``asyncio.gather`` each keep their own parent. Finished spans are written to
+``TRACE_EXPORT_PATH`` either as JSON lines or in the Chrome trace event format
+(open it in ``chrome://tracing`` or https://ui.perfetto.dev). With
+``TRACING_ENABLED`` unset, ``traced`` returns functions undecorated and ``span``
+returns a shared no-op, so tracing costs nothing in production.
+"""
+
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO
+
+from backend.config import TRACE_EXPORT_FORMAT, TRACE_EXPORT_PATH, TRACING_ENABLED
+
+
+# Parameters copied onto spans automatically when a traced function accepts them.
+SPAN_ATTRIBUTE_PARAMETERS = ("group_id", "member_id", "place_id", "shard", "target")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns = self.start_ns
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+
+class _NullSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    span = current_span.get()
+    return span.trace_id if span else None
+
+
+class FileExporter:
+    """Appends finished spans to a file and flushes whenever a root span ends."""
+
+    def __init__(self, path: str, fmt: str) -> None:
+        self.path = path
+        self.format = fmt
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        self._thread_ids: Dict[str, int] = {}
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            if self.format == "chrome":
+                self._file.write(json.dumps(self._chrome_event(span), ensure_ascii=False, default=str) + ",\n")
+            else:
+                self._file.write(json.dumps(self._record(span), ensure_ascii=False, default=str) + "\n")
+            if span.parent_id is None:
+                self._file.flush()
+                self._thread_ids.pop(span.trace_id, None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> TextIO:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handle = open(self.path, "a", encoding="utf-8")
+        if self.format == "chrome" and handle.tell() == 0:
+            # The trace viewers accept an array whose closing bracket is missing, which lets
+            # events be appended without rewriting the file.
+            handle.write("[\n")
+        return handle
+
+    @staticmethod
+    def _record(span: Span) -> Dict[str, Any]:
+        return {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start_unix_nano": span.start_ns,
+            "duration_ms": span.duration_ns / 1e6,
+            "attributes": span.attributes,
+            "error": span.error,
+        }
+
+    def _chrome_event(self, span: Span) -> Dict[str, Any]:
+        # One viewer row per trace keeps concurrent requests apart.
+        tid = self._thread_ids.setdefault(span.trace_id, len(self._thread_ids) + 1)
+        args = dict(span.attributes, trace_id=span.trace_id, span_id=span.span_id)
+        if span.error:
+            args["error"] = span.error
+        return {
+            "name": span.name,
+            "cat": span.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": span.duration_ns / 1000,
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": args,
+        }
+
+
+exporter = FileExporter(TRACE_EXPORT_PATH, TRACE_EXPORT_FORMAT)
+
+
+@contextmanager
+def _open_span(name: str, attributes: Dict[str, Any], activate: bool = True) -> Iterator[Span]:
+    span = Span(name, current_span.get(), attributes)
+    token = current_span.set(span) if activate else None
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = type(exc).__name__
+        status_code = getattr(exc, "status_code", None)
+        if status_code is not None:
+            span.attributes["status_code"] = status_code
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        if token is not None:
+            current_span.reset(token)
+        exporter.export(span)
+
+
+@contextmanager
+def _null_span() -> Iterator[_NullSpan]:
+    yield _NULL_SPAN
+
+
+def span(name: str, **attributes: Any):
+    """Context manager opening a child span of whatever span is current."""
+    if not TRACING_ENABLED:
+        return _null_span()
+    return _open_span(name, attributes)
+
+
+def detached_span(name: str, **attributes: Any):
+    """Like ``span``, but the span never becomes current.
+
+    For spans held open across the yields of a generator: the response that drives
+    the generator may resume it in another ``Context``, where a ``ContextVar`` set
+    before the first yield could not be reset.
+    """
+    if not TRACING_ENABLED:
+        return _null_span()
+    return _open_span(name, attributes, activate=False)
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None):
+    """Decorate a sync or async function so every call runs inside a span.
+
+    The span is named ``<module without "backend.">.<function>`` unless ``name`` is
+    given, and records the arguments listed in ``SPAN_ATTRIBUTE_PARAMETERS``.
+    """
+
+    def decorate(target: Callable) -> Callable:
+        if not TRACING_ENABLED:
+            return target
+
+        span_name = name or f"{target.__module__.removeprefix('backend.')}.{target.__name__}"
+        signature = inspect.signature(target)
+        captured = [parameter for parameter in SPAN_ATTRIBUTE_PARAMETERS if parameter in signature.parameters]
+
+        def attributes_for(args, kwargs) -> Dict[str, Any]:
+            if not captured:
+                return {}
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            return {key: bound[key] for key in captured if bound.get(key) is not None}
+
+        if inspect.iscoroutinefunction(target):
+
+            @functools.wraps(target)
+            async def async_wrapper(*args, **kwargs):
+                with _open_span(span_name, attributes_for(args, kwargs)):
+                    return await target(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(target)
+        def sync_wrapper(*args, **kwargs):
+            with _open_span(span_name, attributes_for(args, kwargs)):
+                return target(*args, **kwargs)
+
+        return sync_wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
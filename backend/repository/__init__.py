@@ -1 +1 @@
-__all__ = ["groups"]
+__all__ = ["common", "groups", "quota", "shards"]
@@ -0,0 +1,35 @@
+from typing import Any, Dict, Sequence, Type
+
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Base
+
+
+async def upsert(
+    session: AsyncSession,
+    model: Type[Base],
+    values: Dict[str, Any],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+) -> None:
+    """INSERT that updates ``update_columns`` (or does nothing) when the unique key already exists."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(model).values(**values)
+        # Updating a key column to itself is MySQL's conflict-safe no-op, unlike INSERT IGNORE
+        # which would also swallow unrelated errors.
+        assignments = {column: statement.inserted[column] for column in update_columns or conflict_columns[:1]}
+        statement = statement.on_duplicate_key_update(**assignments)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model).values(**values)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=list(conflict_columns),
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=list(conflict_columns))
+    else:
+        raise NotImplementedError(f"Upsert is not implemented for the {dialect} dialect")
+    await session.execute(statement)
@@ -1,40 +1,71 @@
-from typing import Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, exists, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.models import GroupMemberModel, GroupModel, GroupRestaurantModel, GroupVoteModel
+from backend.observability.tracing import traced
 
+from .common import upsert
 
+
+@traced
 async def group_exists(session: AsyncSession, group_id: str) -> bool:
     return await session.get(GroupModel, group_id) is not None
 
 
+@traced
 async def fetch_group(session: AsyncSession, group_id: str) -> Optional[GroupModel]:
     return await session.get(GroupModel, group_id)
 
 
+@traced
 async def add_group(session: AsyncSession, group: GroupModel) -> GroupModel:
     session.add(group)
     await session.flush()
     return group
 
 
-async def ensure_member(session: AsyncSession, group_id: str, member_id: str) -> GroupMemberModel:
+@traced
+async def fetch_group_origins(session: AsyncSession, since: datetime) -> Sequence[Any]:
+    """Where and what groups created since ``since`` searched, with their creation time."""
     result = await session.execute(
-        select(GroupMemberModel).where(
+        select(
+            GroupModel.latitude,
+            GroupModel.longitude,
+            GroupModel.radius,
+            GroupModel.min_price,
+            GroupModel.max_price,
+            GroupModel.types,
+            GroupModel.created_at,
+        ).where(GroupModel.created_at >= since)
+    )
+    return result.all()
+
+
+@traced
+async def ensure_member(session: AsyncSession, group_id: str, member_id: str) -> None:
+    await upsert(
+        session,
+        GroupMemberModel,
+        {"group_id": group_id, "member_id": member_id},
+        conflict_columns=("group_id", "member_id"),
+    )
+
+
+@traced
+async def member_exists(session: AsyncSession, group_id: str, member_id: str) -> bool:
+    result = await session.execute(
+        select(GroupMemberModel.id).where(
             GroupMemberModel.group_id == group_id,
             GroupMemberModel.member_id == member_id,
         )
     )
-    member = result.scalar_one_or_none()
-    if member is None:
-        member = GroupMemberModel(group_id=group_id, member_id=member_id)
-        session.add(member)
-        await session.flush()
-    return member
+    return result.scalar_one_or_none() is not None
 
 
+@traced
 async def fetch_member_ids(session: AsyncSession, group_id: str) -> List[str]:
     result = await session.execute(
         select(GroupMemberModel.member_id)
@@ -44,6 +75,7 @@ async def fetch_member_ids(session: AsyncSession, group_id: str) -> List[str]:
     return list(result.scalars().all())
 
 
+@traced
 async def add_restaurants(session: AsyncSession, restaurants: Iterable[GroupRestaurantModel]) -> None:
     restaurants = list(restaurants)
     if not restaurants:
@@ -52,6 +84,81 @@ async def add_restaurants(session: AsyncSession, restaurants: Iterable[GroupRest
     await session.flush()
 
 
+@traced
+async def append_restaurants(session: AsyncSession, restaurants: Iterable[GroupRestaurantModel]) -> None:
+    """Insert candidates at the end of a deck, skipping places another writer added first."""
+    columns = [column.name for column in GroupRestaurantModel.__table__.columns if column.name != "id"]
+    for restaurant in restaurants:
+        values = {column: getattr(restaurant, column) for column in columns}
+        await upsert(session, GroupRestaurantModel, values, conflict_columns=("group_id", "place_id"))
+
+
+@traced
+async def fetch_deck_tail(session: AsyncSession, group_id: str, for_update: bool = False) -> Tuple[Set[str], int]:
+    """Place ids already in the group's deck, and the position after its last candidate.
+
+    With ``for_update`` the group row is locked first, so writers appending to the
+    same deck from several instances take their positions one after another. SQLite
+    write transactions are serialized by their BEGIN IMMEDIATE already.
+    """
+    if for_update:
+        await session.execute(select(GroupModel.id).where(GroupModel.id == group_id).with_for_update())
+    result = await session.execute(
+        select(GroupRestaurantModel.place_id, GroupRestaurantModel.position).where(
+            GroupRestaurantModel.group_id == group_id
+        )
+    )
+    rows = result.all()
+    return {row.place_id for row in rows}, max((row.position for row in rows), default=-1) + 1
+
+
+@traced
+async def claim_deck_extension(session: AsyncSession, group_id: str, extensions: int) -> bool:
+    """Count one more deck extension of a voting group that has had ``extensions``; False if it changed since."""
+    result = await session.execute(
+        update(GroupModel)
+        .where(GroupModel.id == group_id, GroupModel.status == "voting", GroupModel.deck_extensions == extensions)
+        .values(deck_extensions=extensions + 1)
+    )
+    return result.rowcount == 1
+
+
+@traced
+async def update_restaurants(session: AsyncSession, group_id: str, updates: Dict[str, Dict[str, Any]]) -> None:
+    """Set columns of several candidates, keyed by place id, in one executemany; all dicts share their keys."""
+    if not updates:
+        return
+    table = GroupRestaurantModel.__table__
+    columns = next(iter(updates.values())).keys()
+    statement = (
+        update(table)
+        .where(table.c.group_id == bindparam("b_group_id"), table.c.place_id == bindparam("b_place_id"))
+        .values({column: bindparam(column) for column in columns})
+    )
+    await session.execute(
+        statement,
+        [{"b_group_id": group_id, "b_place_id": place_id, **values} for place_id, values in updates.items()],
+    )
+
+
+@traced
+async def fetch_known_places(
+    session: AsyncSession, after_id: int, since: datetime, limit: int
+) -> List[Tuple[GroupRestaurantModel, datetime]]:
+    """Candidates stored after row ``after_id`` for groups created since ``since``, with that time, by id."""
+    result = await session.execute(
+        select(GroupRestaurantModel, GroupModel.created_at)
+        .join(GroupModel, GroupModel.id == GroupRestaurantModel.group_id)
+        # An expression rather than the column, so the planner walks candidates by id instead of
+        # ix_groups_created_at, which would read every recent group on each refresh.
+        .where(GroupRestaurantModel.id > after_id, func.coalesce(GroupModel.created_at, since) >= since)
+        .order_by(GroupRestaurantModel.id)
+        .limit(limit)
+    )
+    return [(row[0], row[1]) for row in result.all()]
+
+
+@traced
 async def fetch_restaurants(session: AsyncSession, group_id: str) -> List[GroupRestaurantModel]:
     result = await session.execute(
         select(GroupRestaurantModel)
@@ -61,6 +168,28 @@ async def fetch_restaurants(session: AsyncSession, group_id: str) -> List[GroupR
     return list(result.scalars().all())
 
 
+@traced
+async def fetch_unvoted_restaurants(
+    session: AsyncSession,
+    group_id: str,
+    member_id: Optional[str],
+    start: int,
+    limit: int,
+) -> List[GroupRestaurantModel]:
+    statement = select(GroupRestaurantModel).where(GroupRestaurantModel.group_id == group_id)
+    if member_id:
+        voted = select(GroupVoteModel.place_id).where(
+            GroupVoteModel.group_id == group_id,
+            GroupVoteModel.member_id == member_id,
+        )
+        statement = statement.where(GroupRestaurantModel.place_id.not_in(voted))
+    result = await session.execute(
+        statement.order_by(GroupRestaurantModel.position).offset(start).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+@traced
 async def fetch_member_vote_place_ids(session: AsyncSession, group_id: str, member_id: str) -> List[str]:
     result = await session.execute(
         select(GroupVoteModel.place_id).where(
@@ -71,6 +200,31 @@ async def fetch_member_vote_place_ids(session: AsyncSession, group_id: str, memb
     return list(result.scalars().all())
 
 
+@traced
+async def fetch_vote_context(
+    session: AsyncSession,
+    group_id: str,
+    member_id: str,
+    place_id: str,
+) -> Optional[Tuple[str, bool, bool]]:
+    """Return ``(status, candidate_exists, member_exists)``, or ``None`` when the group is missing."""
+    candidate = exists().where(
+        GroupRestaurantModel.group_id == group_id,
+        GroupRestaurantModel.place_id == place_id,
+    )
+    member = exists().where(
+        GroupMemberModel.group_id == group_id,
+        GroupMemberModel.member_id == member_id,
+    )
+    result = await session.execute(select(GroupModel.status, candidate, member).where(GroupModel.id == group_id))
+    row = result.first()
+    if row is None:
+        return None
+    status, has_candidate, is_member = row
+    return status, bool(has_candidate), bool(is_member)
+
+
+@traced
 async def candidate_exists(session: AsyncSession, group_id: str, place_id: str) -> bool:
     result = await session.execute(
         select(GroupRestaurantModel.id).where(
@@ -81,6 +235,7 @@ async def candidate_exists(session: AsyncSession, group_id: str, place_id: str)
     return result.scalar_one_or_none() is not None
 
 
+@traced
 async def get_vote(
     session: AsyncSession,
     group_id: str,
@@ -97,18 +252,18 @@ async def get_vote(
     return result.scalar_one_or_none()
 
 
-async def create_vote(session: AsyncSession, group_id: str, member_id: str, place_id: str, value: str) -> GroupVoteModel:
-    vote = GroupVoteModel(
-        group_id=group_id,
-        member_id=member_id,
-        place_id=place_id,
-        value=value,
+@traced
+async def upsert_vote(session: AsyncSession, group_id: str, member_id: str, place_id: str, value: str) -> None:
+    await upsert(
+        session,
+        GroupVoteModel,
+        {"group_id": group_id, "member_id": member_id, "place_id": place_id, "value": value},
+        conflict_columns=("group_id", "member_id", "place_id"),
+        update_columns=("value",),
     )
-    session.add(vote)
-    await session.flush()
-    return vote
 
 
+@traced
 async def fetch_votes(session: AsyncSession, group_id: str) -> Sequence[Tuple[str, str]]:
     result = await session.execute(
         select(GroupVoteModel.place_id, GroupVoteModel.value).where(GroupVoteModel.group_id == group_id)
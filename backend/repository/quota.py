@@ -0,0 +1,22 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import UpstreamQuotaBucketModel
+from backend.observability.tracing import traced
+
+from .common import upsert
+
+
+@traced
+async def lock_bucket(session: AsyncSession, name: str, capacity: float, now: float) -> UpstreamQuotaBucketModel:
+    """Return the bucket row locked for update, creating it full on first use."""
+    await upsert(
+        session,
+        UpstreamQuotaBucketModel,
+        {"name": name, "tokens": capacity, "updated_at": now},
+        conflict_columns=("name",),
+    )
+    result = await session.execute(
+        select(UpstreamQuotaBucketModel).where(UpstreamQuotaBucketModel.name == name).with_for_update()
+    )
+    return result.scalar_one()
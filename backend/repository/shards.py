@@ -0,0 +1,160 @@
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import (
+    GroupMemberModel,
+    GroupModel,
+    GroupRestaurantModel,
+    GroupShardOverrideModel,
+    GroupVoteModel,
+)
+from backend.observability.tracing import traced
+
+from .common import upsert
+
+# Parents first; deletes walk the list backwards.
+GROUP_TABLES = (GroupModel, GroupMemberModel, GroupRestaurantModel, GroupVoteModel)
+
+GroupSnapshot = Dict[str, List[Dict[str, Any]]]
+
+
+@traced
+async def fetch_overrides(session: AsyncSession) -> Dict[str, int]:
+    result = await session.execute(select(GroupShardOverrideModel.group_id, GroupShardOverrideModel.shard))
+    return {group_id: shard for group_id, shard in result.all()}
+
+
+@traced
+async def set_override(session: AsyncSession, group_id: str, shard: int) -> None:
+    await upsert(
+        session,
+        GroupShardOverrideModel,
+        {"group_id": group_id, "shard": shard},
+        conflict_columns=("group_id",),
+        update_columns=("shard",),
+    )
+
+
+@traced
+async def delete_override(session: AsyncSession, group_id: str) -> None:
+    await session.execute(delete(GroupShardOverrideModel).where(GroupShardOverrideModel.group_id == group_id))
+
+
+def _group_column(model):
+    return model.id if model is GroupModel else model.group_id
+
+
+@traced
+async def fetch_group_snapshot(session: AsyncSession, group_id: str) -> GroupSnapshot:
+    snapshot: GroupSnapshot = {}
+    for model in GROUP_TABLES:
+        table = model.__table__
+        result = await session.execute(select(table).where(_group_column(model) == group_id))
+        rows = [dict(row) for row in result.mappings().all()]
+        if model is not GroupModel:
+            # Surrogate keys are per database; the target shard assigns its own.
+            for row in rows:
+                row.pop("id")
+        snapshot[table.name] = rows
+    return snapshot
+
+
+@traced
+async def insert_group_snapshot(session: AsyncSession, snapshot: GroupSnapshot) -> None:
+    for model in GROUP_TABLES:
+        rows = snapshot.get(model.__tablename__)
+        if rows:
+            await session.execute(insert(model.__table__), rows)
+
+
+@traced
+async def delete_group_rows(session: AsyncSession, group_id: str) -> None:
+    for model in reversed(GROUP_TABLES):
+        await session.execute(delete(model.__table__).where(_group_column(model) == group_id))
+
+
+@traced
+async def count_groups(session: AsyncSession) -> int:
+    result = await session.execute(select(func.count()).select_from(GroupModel))
+    return int(result.scalar_one())
+
+
+@traced
+async def merge_late_writes(session: AsyncSession, copied: GroupSnapshot, late: GroupSnapshot) -> None:
+    """Apply what reached the source after ``copied`` was taken, as read again in ``late``.
+
+    That is member joins, new and changed votes, candidates appended or enriched,
+    the deck extension count and the finished status. Only rows that differ from
+    the copy are applied, so the target's own writes (from processes that picked
+    up the override) to rows the source left alone are kept. Appended candidates
+    go after the target's last position, in the order the source had them.
+    """
+    for row in _changed_rows(copied, late, GroupMemberModel, ("member_id",)):
+        await upsert(session, GroupMemberModel, row, conflict_columns=("group_id", "member_id"))
+
+    candidates = _rows_by_key(copied, GroupRestaurantModel, ("place_id",))
+    appended = []
+    for row in _changed_rows(copied, late, GroupRestaurantModel, ("place_id",)):
+        before = candidates.get((row["place_id"],))
+        if before is None:
+            appended.append(row)
+            continue
+        changed = [column for column, value in row.items() if column != "position" and value != before[column]]
+        if changed:
+            await upsert(
+                session,
+                GroupRestaurantModel,
+                row,
+                conflict_columns=("group_id", "place_id"),
+                update_columns=changed,
+            )
+    if appended:
+        group_id = appended[0]["group_id"]
+        result = await session.execute(
+            select(func.max(GroupRestaurantModel.position)).where(GroupRestaurantModel.group_id == group_id)
+        )
+        position = result.scalar_one_or_none()
+        position = -1 if position is None else position
+        for row in sorted(appended, key=lambda row: row["position"]):
+            position += 1
+            await upsert(
+                session, GroupRestaurantModel, {**row, "position": position}, conflict_columns=("group_id", "place_id")
+            )
+
+    # Candidates come first so that late votes never point at a missing one.
+    for row in _changed_rows(copied, late, GroupVoteModel, ("member_id", "place_id")):
+        await upsert(
+            session,
+            GroupVoteModel,
+            row,
+            conflict_columns=("group_id", "member_id", "place_id"),
+            update_columns=("value",),
+        )
+
+    copied_groups = _rows_by_key(copied, GroupModel, ("id",))
+    for row in late.get(GroupModel.__tablename__, []):
+        before = copied_groups.get((row["id"],), {})
+        group = await session.get(GroupModel, row["id"])
+        if group is None:
+            continue
+        if row["status"] == "finished":
+            group.status = "finished"
+        if row["deck_extensions"] > before.get("deck_extensions", 0):
+            group.deck_extensions = max(group.deck_extensions, row["deck_extensions"])
+    await session.flush()
+
+
+def _rows_by_key(snapshot: GroupSnapshot, model, key: Tuple[str, ...]) -> Dict[Tuple[Any, ...], Dict[str, Any]]:
+    return {tuple(row[column] for column in key): row for row in snapshot.get(model.__tablename__, [])}
+
+
+def _changed_rows(copied: GroupSnapshot, late: GroupSnapshot, model, key: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Rows of ``model`` in ``late`` that are new or differ from ``copied``."""
+    before = _rows_by_key(copied, model, key)
+    return [
+        row
+        for row in late.get(model.__tablename__, [])
+        if before.get(tuple(row[column] for column in key)) != row
+    ]
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Microbenchmark the pure-Python functions that run on every group request.
+
+Every benchmark works on the same fixed synthetic dataset (``--candidates``
+candidates with five reviews each, ``--members`` members who each voted on every
+candidate), so numbers are comparable between commits:
+
+* ``restaurant_from_model``: ``_restaurant_from_model`` over all candidate rows,
+* ``build_restaurant_models``: ``_build_restaurant_models`` for all candidates,
+* ``rank_results``: vote counting and sorting in ``_rank_results``,
+* ``build_summary_prompt``: fitting reviews to the token budget and formatting
+  them in ``_build_summary_prompt``, paid on summary cache misses,
+* ``summary_cache_key``: the summary cache key, all a cache hit pays per card,
+* ``restaurant_validate`` / ``restaurant_serialize``: pydantic validation and JSON
+  serialization of every ``Restaurant`` (with its ``Review`` list),
+* ``results_serialize``: JSON serialization of a full ``GroupResultsResponse``,
+* ``place_index_query``: a radius, type and price query of ``PlaceIndex`` over
+  all candidates.
+
+For each benchmark the best of ``--repeat`` timed rounds gives ops/sec, and one
+extra call under ``tracemalloc`` gives the peak memory it allocates and the
+number of memory blocks it leaves allocated (its result).
+
+Results are written to ``.benchmarks/latest.json``. ``--save-baseline`` also
+stores them as ``.benchmarks/baseline.json``; later runs compare against it and
+exit with status 1 when a benchmark loses more than ``--threshold`` of its
+ops/sec or allocates that much more memory.
+
+Timings only compare on the same machine, so no baseline is committed. CI checks
+the parent commit out into a worktree and runs both trees in turn, three times
+each, saving every run; a slowdown of the whole machine then hits both sides.
+``--compare`` takes the best of the change's runs, ``--baseline`` (repeatable)
+the best of the parent's, and compares them without running anything.
+
+Usage (from the repository root)::
+
+    python backend/scripts/bench_hot_paths.py --save-baseline   # on main
+    python backend/scripts/bench_hot_paths.py                   # on your branch
+
+    # what CI runs
+    git worktree add --detach /tmp/bench-base HEAD^
+    for run in 1 2 3; do
+        python /tmp/bench-base/backend/scripts/bench_hot_paths.py --repeat 10 --min-time 0.05 \\
+            --save-baseline --baseline /tmp/bench-base-$run.json
+        python backend/scripts/bench_hot_paths.py --repeat 10 --min-time 0.05 \\
+            --save-baseline --baseline /tmp/bench-change-$run.json
+    done
+    python backend/scripts/bench_hot_paths.py --compare /tmp/bench-change-*.json \\
+        $(printf -- '--baseline %s ' /tmp/bench-base-*.json) --threshold 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+RESULTS_DIR = REPO_ROOT / ".benchmarks"
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=60, help="candidates per group")
+    parser.add_argument("--members", type=int, default=100, help="members voting on every candidate")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timed round")
+    parser.add_argument("--only", action="append", default=[], help="run only this benchmark; repeatable")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument(
+        "--baseline",
+        action="append",
+        help="baseline to save or compare with (default .benchmarks/baseline.json); repeat to use the best of several",
+    )
+    parser.add_argument(
+        "--compare", nargs="+", metavar="RESULTS", help="compare the best of these saved runs instead of running"
+    )
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    return parser.parse_args()
+
+
+def build_benchmarks(candidates: int, members: int) -> Dict[str, Callable[[], object]]:
+    from backend.schemas.groups import CandidateResult, GroupResultsResponse
+    from backend.schemas.restaurants import Restaurant, Review
+    from backend.services.groups import _build_restaurant_models, _rank_results, _restaurant_from_model
+    from backend.services.places_index import PlaceIndex
+    from backend.services.restaurants import _build_summary_prompt, _summary_cache_key
+
+    rng = random.Random(42)
+    restaurants = [
+        Restaurant(
+            place_id=f"bench-place-{index:03d}",
+            name=f"ベンチ食堂 {index}",
+            address="東京都千代田区丸の内1-1",
+            rating=round(rng.uniform(3.0, 4.8), 1),
+            price_level=rng.randint(1, 4),
+            photo_url=f"https://example.com/photo/{index}/0",
+            photo_urls=[f"https://example.com/photo/{index}/{n}" for n in range(5)],
+            lat=35.68 + index * 0.0001,
+            lng=139.76 + index * 0.0001,
+            types=["restaurant", "food", "point_of_interest", "establishment"],
+            reviews=[
+                Review(author_name=f"reviewer {n}", rating=rng.randint(1, 5), text="美味しかったです。" * 20, time="1 週間前")
+                for n in range(5)
+            ],
+            phone_number="03-0000-0000",
+            website=f"https://example.com/{index}",
+            google_maps_url=f"https://maps.google.com/?cid={index}",
+            user_ratings_total=rng.randint(10, 2000),
+            opening_hours={"open_now": True, "weekday_text": ["月曜日: 11時00分～22時00分"] * 7},
+            summary="***ランチ***がお得\n落ち着いた雰囲気\nまた行きたいモグ",
+        )
+        for index in range(candidates)
+    ]
+    rows = _build_restaurant_models("bench-group", restaurants)
+    restaurant_map = {restaurant.place_id: restaurant for restaurant in restaurants}
+    vote_rows = [
+        (restaurant.place_id, "like" if rng.random() < 0.4 else "dislike")
+        for _ in range(members)
+        for restaurant in restaurants
+    ]
+    payloads = [restaurant.model_dump(mode="json") for restaurant in restaurants]
+    results = GroupResultsResponse(
+        group_id="bench-group",
+        status="finished",
+        results=[
+            CandidateResult(restaurant=restaurant, score=float(n), likes=n, dislikes=0)
+            for n, restaurant in enumerate(restaurants)
+        ],
+    )
+    reviews = restaurants[0].reviews
+    index = PlaceIndex()
+    index.add_all((restaurant, time.time()) for restaurant in restaurants)
+
+    return {
+        "restaurant_from_model": lambda: [_restaurant_from_model(row) for row in rows],
+        "build_restaurant_models": lambda: _build_restaurant_models("bench-group", restaurants),
+        "rank_results": lambda: _rank_results(restaurant_map, vote_rows),
+        "build_summary_prompt": lambda: _build_summary_prompt(restaurants[0].name, reviews, "card"),
+        "summary_cache_key": lambda: _summary_cache_key(restaurants[0].name, reviews, "card"),
+        "restaurant_validate": lambda: [Restaurant.model_validate(payload) for payload in payloads],
+        "restaurant_serialize": lambda: [restaurant.model_dump_json() for restaurant in restaurants],
+        "results_serialize": lambda: results.model_dump_json(),
+        "place_index_query": lambda: index.query(35.68, 139.76, 1000, ["restaurant", "cafe"], 1, 3, 1800),
+    }
+
+
+def time_benchmark(func: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Best seconds per call over ``repeat`` rounds of at least ``min_time`` each."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 10:
+            break
+        loops *= 10
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+
+def measure_allocations(func: Callable[[], object]) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline_size, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return {"peak_bytes": max(0, peak - baseline_size), "retained_blocks": retained_blocks}
+
+
+def best_of(reports: List[dict]) -> dict:
+    """Per benchmark, the highest ops/sec and the lowest peak memory of ``reports`` (same dataset)."""
+    best = {"dataset": reports[0]["dataset"], "python": reports[0]["python"], "benchmarks": {}}
+    for report in reports:
+        if report["dataset"] != best["dataset"]:
+            raise SystemExit(f"results for {report['dataset']} and {best['dataset']} cannot be combined")
+        for name, stats in report["benchmarks"].items():
+            kept = best["benchmarks"].setdefault(name, dict(stats))
+            if stats["ops_per_second"] > kept["ops_per_second"]:
+                kept.update(ops_per_second=stats["ops_per_second"], us_per_op=stats["us_per_op"])
+            kept["peak_bytes"] = min(kept["peak_bytes"], stats["peak_bytes"])
+    return best
+
+
+def load_reports(paths: List[str]) -> List[dict]:
+    return [json.loads(Path(path).read_text(encoding="utf-8")) for path in paths]
+
+
+def compare(
+    current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    regressions: List[str] = []
+    print(f"\ncompared with baseline (threshold {threshold:.0%}):")
+    print(f"{'benchmark':<26}{'ops/s':>12}{'change':>9}{'peak KiB':>11}{'change':>9}")
+    for name, stats in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<26}{'(new)':>12}")
+            continue
+        speed = stats["ops_per_second"] / before["ops_per_second"] - 1
+        memory = (stats["peak_bytes"] - before["peak_bytes"]) / before["peak_bytes"] if before["peak_bytes"] else 0.0
+        flag = ""
+        if speed < -threshold:
+            regressions.append(f"{name}: {speed:+.1%} ops/s")
+            flag = "  REGRESSION"
+        if memory > threshold:
+            regressions.append(f"{name}: {memory:+.1%} peak memory")
+            flag = "  REGRESSION"
+        print(
+            f"{name:<26}{stats['ops_per_second']:>12,.0f}{speed:>+9.1%}"
+            f"{stats['peak_bytes'] / 1024:>11.1f}{memory:>+9.1%}{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+    baselines = args.baseline or [str(RESULTS_DIR / "baseline.json")]
+    if args.save_baseline and len(baselines) != 1:
+        raise SystemExit("--save-baseline writes a single --baseline")
+    if args.compare:
+        check_regressions(best_of(load_reports(args.compare)), baselines, args.threshold)
+        return
+
+    # The services read configuration on import; nothing here touches the database.
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{Path(tempfile.gettempdir()) / 'bench-hot-paths.db'}")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    add_repo_to_sys_path()
+
+    benchmarks = build_benchmarks(args.candidates, args.members)
+    unknown = set(args.only) - benchmarks.keys()
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    print(f"dataset: {args.candidates} candidates x {args.members} members, Python {sys.version.split()[0]}")
+    print(f"{'benchmark':<26}{'ops/s':>12}{'us/op':>10}{'peak KiB':>11}{'blocks':>9}")
+    current: Dict[str, Dict[str, float]] = {}
+    for name, func in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        seconds = time_benchmark(func, args.repeat, args.min_time)
+        allocations = measure_allocations(func)
+        current[name] = {"ops_per_second": 1 / seconds, "us_per_op": seconds * 1e6, **allocations}
+        print(
+            f"{name:<26}{1 / seconds:>12,.0f}{seconds * 1e6:>10.1f}"
+            f"{allocations['peak_bytes'] / 1024:>11.1f}{allocations['retained_blocks']:>9}"
+        )
+
+    report = {
+        "dataset": {"candidates": args.candidates, "members": args.members},
+        "python": sys.version.split()[0],
+        "benchmarks": current,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    (RESULTS_DIR / "latest.json").write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        Path(baselines[0]).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nsaved baseline to {baselines[0]}")
+        return
+
+    missing = [path for path in baselines if not Path(path).exists()]
+    if missing:
+        print(f"\nno baseline at {', '.join(missing)}; run with --save-baseline to compare against one")
+        return
+    check_regressions(report, baselines, args.threshold)
+
+
+def check_regressions(report: dict, baselines: List[str], threshold: float) -> None:
+    """Compare ``report`` with the best of ``baselines``; exits with status 1 on a regression."""
+    baseline = best_of(load_reports(baselines))
+    if baseline["dataset"] != report["dataset"]:
+        raise SystemExit(f"baseline dataset {baseline['dataset']} differs from {report['dataset']}; re-run with it")
+    regressions = compare(report["benchmarks"], baseline["benchmarks"], threshold)
+    if regressions:
+        print("\nregressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
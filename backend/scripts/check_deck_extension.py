@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Verify that a group's deck grows when its members are about to run out of candidates.
+
+The backend runs in-process against a temporary SQLite database, with Google and
+Gemini answered by ``upstream_simulator`` (Gemini slowed down so extending the
+deck takes a while). A group starts with one page of 20 restaurants and members
+vote through it over the API. The checks verify that:
+
+* listing candidates with more than ``DECK_EXTENSION_REMAINING`` left does not
+  extend the deck, even a page smaller than that, and listing with that many
+  left does, without waiting for it,
+* the new candidates come from the ring of cells around the group's area, are
+  enriched, and are listed after the ones the member has not voted on yet,
+* members reaching the end together cause one extension, and a stale claim
+  (another instance that saw the old count) is refused,
+* a group stops extending after ``DECK_MAX_EXTENSIONS``,
+* overlapping appends to one deck at the same time add every place once, at
+  distinct positions, and appending a place the deck has is skipped.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_deck_extension.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+REMAINING = 10
+EXTENSION_SIZE = 20
+MAX_EXTENSIONS = 2
+GEMINI_LATENCY_MS = 300
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.main import app
+    from backend.repository import groups as group_repo
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.schemas.restaurants import Restaurant
+    from backend.services import background, groups, upstream
+    from backend.services.database import group_session
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    simulator = create_app(profiles)
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check", timeout=30
+    ) as client:
+        response = await client.post(
+            "/api/groups",
+            params={"member_id": "alice"},
+            json={"latitude": 35.68, "longitude": 139.76, "radius": 500, "types": ["restaurant"]},
+        )
+        group_id = response.json()["group_id"]
+        profiles["generate"].latency = parse_latency(f"fixed:{GEMINI_LATENCY_MS}")
+
+        async def unvoted(member_id: str, limit: int = 20) -> list:
+            response = await client.get(
+                f"/api/groups/{group_id}/candidates", params={"member_id": member_id, "limit": limit}
+            )
+            return response.json()
+
+        async def vote(member_id: str, count: int) -> None:
+            for card in (await unvoted(member_id))[:count]:
+                await client.post(
+                    f"/api/groups/{group_id}/vote",
+                    params={"member_id": member_id},
+                    json={"candidate_id": card["place_id"], "value": "dislike"},
+                )
+
+        async def deck() -> list:
+            cards = []
+            while True:
+                response = await client.get(
+                    f"/api/groups/{group_id}/candidates", params={"start": len(cards), "limit": 50}
+                )
+                cards.extend(response.json())
+                if len(response.json()) < 50:
+                    return cards
+
+        async def extensions() -> int:
+            async with group_session(group_id, readonly=True) as session:
+                group = await group_repo.fetch_group(session, group_id)
+                await session.commit()
+            return group.deck_extensions
+
+        original = await deck()
+        searches = simulator.state.stats[("nearby", "ok")]
+        await vote("alice", len(original) - REMAINING - 1)
+        small_page = await unvoted("alice", limit=5)
+        await unvoted("alice")
+        await background.drain(10)
+        expect(
+            f"more than {REMAINING} left: the deck is not extended, even for a page of {len(small_page)}",
+            simulator.state.stats[("nearby", "ok")] == searches and await extensions() == 0,
+        )
+
+        await vote("alice", 1)
+        started = time.perf_counter()
+        cards, _ = await asyncio.gather(unvoted("alice"), unvoted("alice"))
+        elapsed = time.perf_counter() - started
+        expect(
+            f"{REMAINING} left: listing does not wait for the extension",
+            len(cards) == REMAINING and elapsed * 1000 < GEMINI_LATENCY_MS,
+            f"{elapsed * 1000:.0f} ms (a summary takes {GEMINI_LATENCY_MS} ms)",
+        )
+        await background.drain(30)
+
+        grown = await deck()
+        added = grown[len(original) :]
+        cards = await unvoted("alice")
+        area = {card["place_id"].rsplit(":", 1)[0] for card in original}
+        cells = {card["place_id"].rsplit(":", 1)[0] for card in added}
+        expect(
+            "new candidates from the surrounding cells are listed after the unvoted ones",
+            len(added) == EXTENSION_SIZE
+            and not cells & area
+            and all(card["reviews"] and card["summary"] for card in added)
+            and [card["place_id"] for card in cards[REMAINING:]] == [card["place_id"] for card in added[:REMAINING]],
+            f"{len(original)} -> {len(grown)} candidates from {len(cells)} cells",
+        )
+        expect(
+            "two listings at the end extend the deck once",
+            await extensions() == 1 and simulator.state.stats[("nearby", "ok")] - searches == 6,
+            f"{await extensions()} extensions, {simulator.state.stats[('nearby', 'ok')] - searches} nearby calls",
+        )
+        async with group_session(group_id) as session:
+            stale = await group_repo.claim_deck_extension(session, group_id, 0)
+            await session.commit()
+        expect("a claim based on an old extension count is refused", not stale)
+
+        for _ in range(MAX_EXTENSIONS + 1):
+            await vote("alice", 20)
+            await unvoted("alice")
+            await background.drain(30)
+        expect(
+            f"the deck stops growing after {MAX_EXTENSIONS} extensions",
+            await extensions() == MAX_EXTENSIONS
+            and len(await deck()) == len(original) + MAX_EXTENSIONS * EXTENSION_SIZE,
+            f"{await extensions()} extensions, {len(await deck())} candidates",
+        )
+
+        before = await deck()
+        template = Restaurant.model_validate(before[0])
+        batches = [
+            [template.model_copy(update={"place_id": f"concurrent-{n}"}) for n in range(first, first + 6)]
+            for first in (0, 3)
+        ]
+        added = await asyncio.gather(*(groups._append_to_deck(group_id, batch) for batch in batches))
+        async with group_session(group_id) as session:
+            await group_repo.append_restaurants(session, groups._build_restaurant_models(group_id, [template], 0))
+            rows = await group_repo.fetch_restaurants(session, group_id)
+            await session.commit()
+        appended = [row.place_id for row in rows[len(before) :]]
+        expect(
+            "concurrent appends add every place once, at distinct positions after the deck",
+            sum(added) == 9
+            and sorted(appended) == sorted(f"concurrent-{n}" for n in range(9))
+            and len({row.position for row in rows}) == len(rows),
+            f"{added} added, {len(rows) - len(before)} new candidates",
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="deck-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'deck.db'}",
+            GOOGLE_API_KEY="deck-check",
+            NEARBY_SEARCH_MAX_PAGES="1",
+            DECK_EXTENSION_REMAINING=str(REMAINING),
+            DECK_EXTENSION_SIZE=str(EXTENSION_SIZE),
+            DECK_MAX_EXTENSIONS=str(MAX_EXTENSIONS),
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Verify that group creation answers within its deadline and completes candidates later.
+
+``POST /api/groups`` runs in-process against a temporary SQLite database, with
+Google and Gemini answered by ``upstream_simulator``. The checks verify that:
+
+* with Place Details slower than ``GROUP_CREATE_DEADLINE_SECONDS``, the group is
+  still created within the deadline, with candidates from the nearby search,
+* the late details and summaries are written to those candidates in the
+  background once they arrive,
+* a nearby search that cannot finish within the deadline fails with 504 at the
+  deadline instead of hanging,
+* without a deadline (``/api/restaurants/search``) every place is complete.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_group_deadline.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEADLINE_SECONDS = 1.0
+WRITE_RESERVE_SECONDS = 0.2
+SLOW_LATENCY = "fixed:2500"
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import background, upstream
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    upstream.transport = SimulatorTransport(app=create_app(profiles))
+    await app.router.startup()
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check"
+    ) as client:
+
+        async def create(lat: float) -> tuple:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/groups",
+                params={"member_id": "organizer"},
+                json={"latitude": lat, "longitude": 139.76, "types": ["restaurant"]},
+            )
+            return response, time.perf_counter() - started
+
+        async def candidates(group_id: str) -> list:
+            response = await client.get(
+                f"/api/groups/{group_id}/candidates", params={"member_id": "organizer", "limit": 50}
+            )
+            return response.json()
+
+        profiles["details"].latency = parse_latency(SLOW_LATENCY)
+        response, elapsed = await create(35.68)
+        expect(
+            "slow details: group is created within the deadline",
+            response.status_code == 200 and elapsed < DEADLINE_SECONDS + 0.3,
+            f"HTTP {response.status_code} in {elapsed:.2f}s (deadline {DEADLINE_SECONDS}s)",
+        )
+        group_id = response.json().get("group_id", "")
+        cards = await candidates(group_id)
+        expect(
+            "slow details: candidates come from the nearby search",
+            bool(cards) and not any(card["reviews"] or card["summary"] for card in cards),
+            f"{len(cards)} candidates, {sum(bool(card['reviews']) for card in cards)} with reviews",
+        )
+
+        await background.drain(timeout=10)
+        cards = await candidates(group_id)
+        expect(
+            "late details and summaries are stored in the background",
+            bool(cards) and all(card["reviews"] and card["summary"] and card["phone_number"] for card in cards),
+            f"{sum(bool(card['summary']) for card in cards)}/{len(cards)} with summaries",
+        )
+
+        profiles["details"].latency = parse_latency("fixed:5")
+        profiles["nearby"].latency = parse_latency(SLOW_LATENCY)
+        response, elapsed = await create(35.70)
+        expect(
+            "slow nearby search: 504 at the deadline",
+            response.status_code == 504 and elapsed < DEADLINE_SECONDS + 0.3,
+            f"HTTP {response.status_code} in {elapsed:.2f}s",
+        )
+
+        profiles["nearby"].latency = parse_latency("fixed:5")
+        profiles["details"].latency = parse_latency("fixed:300")
+        response = await client.post("/api/restaurants/search", json={"latitude": 35.72, "longitude": 139.76})
+        places = response.json() if response.status_code == 200 else []
+        expect(
+            "no deadline: search waits for every place",
+            bool(places) and all(place["reviews"] for place in places),
+            f"HTTP {response.status_code}, {sum(bool(place['reviews']) for place in places)}/{len(places)} complete",
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="deadline-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'deadline.db'}",
+            GOOGLE_API_KEY="deadline-check",
+            GROUP_CREATE_DEADLINE_SECONDS=str(DEADLINE_SECONDS),
+            GROUP_CREATE_WRITE_RESERVE_SECONDS=str(WRITE_RESERVE_SECONDS),
+            NEARBY_SEARCH_MAX_PAGES="1",
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
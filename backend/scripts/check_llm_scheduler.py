@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Verify that interactive Gemini work keeps a bounded queueing delay behind bulk work.
+
+``PriorityScheduler`` is exercised directly first: a burst of bulk work is
+started with interactive work arriving during it, once with the two classes
+kept apart and once with everything in one bulk queue, as before. Then the
+backend runs in-process (temporary SQLite database, Google and Gemini answered
+by ``upstream_simulator``) with small ``LLM_*`` limits, and ``/summarize`` is
+called while several groups are being created. The checks verify that:
+
+* interactive work waits at most about one slot's hold time during the burst,
+  a fraction of what it waits in a single queue,
+* work is dropped with 504 when its deadline leaves less time than a slot is
+  usually held, or runs out while it waits, and with 503 after
+  ``max_queue_seconds`` in the queue,
+* ``/summarize`` stays close to Gemini's own latency while card summaries for
+  group creation queue behind the bulk cap.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_llm_scheduler.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+HOLD_SECONDS = 0.02
+GEMINI_LATENCY_MS = 150
+GROUPS = 4
+SUMMARIES = 8
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def burst(prioritized: bool) -> List[float]:
+    """Interactive waits, in seconds, for work arriving during a burst of 60 bulk runs."""
+    from backend.services import quota, scheduler
+
+    caps = {quota.INTERACTIVE: 4, quota.BULK: 3 if prioritized else 4}
+    slots = scheduler.PriorityScheduler("burst", 4, caps, {quota.INTERACTIVE: 10.0, quota.BULK: 10.0})
+    waits: List[float] = []
+
+    async def run(priority: str, record: bool) -> None:
+        queued = time.perf_counter()
+        async with slots.slot(priority):
+            if record:
+                waits.append(time.perf_counter() - queued)
+            await asyncio.sleep(HOLD_SECONDS)
+
+    bulk = [asyncio.create_task(run(quota.BULK, False)) for _ in range(60)]
+    interactive = []
+    for _ in range(10):
+        await asyncio.sleep(HOLD_SECONDS * 1.25)
+        interactive.append(asyncio.create_task(run(quota.INTERACTIVE if prioritized else quota.BULK, True)))
+    await asyncio.gather(*bulk, *interactive)
+    return waits
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import background, deadline, quota, scheduler, upstream
+    from backend.services.exceptions import ServiceError
+    from backend.services.restaurants import gemini_scheduler
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def dropped(name: str, reason: str) -> float:
+        return sum(
+            value
+            for _, values, _, value in scheduler.SCHEDULER_DROPPED.samples()
+            if values[0] == name and values[2] == reason
+        )
+
+    prioritized, single_queue = await burst(True), await burst(False)
+    expect(
+        "interactive work waits about one hold time during a bulk burst",
+        max(prioritized) <= HOLD_SECONDS * 2 and statistics.median(single_queue) >= max(prioritized) * 5,
+        f"max {max(prioritized) * 1000:.0f} ms, single queue p50 {statistics.median(single_queue) * 1000:.0f} ms",
+    )
+
+    slots = scheduler.PriorityScheduler(
+        "drops", 1, {quota.INTERACTIVE: 1, quota.BULK: 1}, {quota.INTERACTIVE: 10.0, quota.BULK: 0.05}
+    )
+    for _ in range(5):
+        async with slots.slot():
+            await asyncio.sleep(0.05)
+
+    async def attempt(priority: str, seconds: float) -> int:
+        try:
+            with deadline.budget(seconds):
+                async with slots.slot(priority):
+                    return 200
+        except ServiceError as exc:
+            return exc.status_code
+
+    expect(
+        "work whose deadline is shorter than a usual hold is dropped at once",
+        await attempt(quota.INTERACTIVE, slots.service_seconds / 2) == 504 and dropped("drops", "deadline") == 1,
+        f"usual hold {slots.service_seconds * 1000:.0f} ms",
+    )
+
+    async def hold() -> None:
+        async with slots.slot(quota.INTERACTIVE):
+            await asyncio.sleep(0.5)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    status = await attempt(quota.INTERACTIVE, 0.2)
+    waited = time.perf_counter() - started
+    expect(
+        "queued work is dropped when its deadline comes first",
+        status == 504 and dropped("drops", "deadline") == 2 and waited < 0.2,
+        f"HTTP {status} after {waited * 1000:.0f} ms",
+    )
+    status = await attempt(quota.BULK, 5.0)
+    expect(
+        "queued work is dropped after max_queue_seconds",
+        status == 503 and dropped("drops", "queue_timeout") == 1,
+        f"HTTP {status}",
+    )
+    await holder
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    profiles["generate"].latency = parse_latency(f"fixed:{GEMINI_LATENCY_MS}")
+    upstream.transport = SimulatorTransport(app=create_app(profiles))
+    await app.router.startup()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check", timeout=60
+    ) as client:
+        details = await client.get("/api/restaurants/sim:35.68000:139.76000:0", params={"summary": "false"})
+        reviews = details.json()["reviews"]
+
+        async def create(index: int) -> int:
+            response = await client.post(
+                "/api/groups",
+                params={"member_id": f"organizer-{index}"},
+                json={"latitude": 35.6 + index / 100, "longitude": 139.7, "types": ["restaurant"]},
+            )
+            return response.status_code
+
+        async def summarize(index: int) -> float:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/restaurants/summarize",
+                json={"restaurant_name": f"Interactive {index}", "reviews": reviews, "format": "detail"},
+            )
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        groups = [asyncio.create_task(create(index)) for index in range(GROUPS)]
+        latencies = []
+        await asyncio.sleep(0.3)
+        for index in range(SUMMARIES):
+            latencies.append(await summarize(index))
+            await asyncio.sleep(0.2)
+        statuses = await asyncio.gather(*groups)
+        await background.drain(60)
+
+    bulk_waits = [
+        value
+        for name, values, _, value in scheduler.SCHEDULER_WAIT.samples()
+        if name.endswith("_sum") and values == (gemini_scheduler.name, quota.BULK)
+    ]
+    expect(
+        "/summarize stays near Gemini latency while groups are created",
+        max(latencies) <= GEMINI_LATENCY_MS / 1000 * 2 and all(status == 200 for status in statuses),
+        f"max {max(latencies) * 1000:.0f} ms (Gemini {GEMINI_LATENCY_MS} ms), "
+        f"bulk card summaries waited {sum(bulk_waits):.1f} s in total",
+    )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="scheduler-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'scheduler.db'}",
+            GOOGLE_API_KEY="scheduler-check",
+            LLM_MAX_CONCURRENCY="4",
+            LLM_BULK_MAX_CONCURRENCY="3",
+            NEARBY_SEARCH_MAX_PAGES="1",
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Verify the multi-type, multi-page nearby search behind group creation.
+
+``POST /api/groups`` runs in-process against a temporary SQLite database, with
+Google and Gemini answered by ``upstream_simulator``. Around every location the
+simulator has 60 restaurants (every fifth also a cafe) and 40 more cafes, in
+pages of 20, and refuses a ``next_page_token`` for a while after issuing it. The
+checks verify that:
+
+* a group searches each of its place types in parallel and answers with the best
+  ``GROUP_INITIAL_CANDIDATES`` of the merged results, of both types,
+* creating it takes no longer than a single-type group,
+* the rest of the first pages and the later pages are added to the deck in the
+  background as bulk Gemini work, enriched and without duplicates, retrying
+  tokens that were not ready yet,
+* ``/api/restaurants/search`` honors ``types``.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_nearby_pagination.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PAGE_TOKEN_DELAY_SECONDS = 0.2
+SIMULATOR_PAGE_TOKEN_DELAY_SECONDS = 0.3
+# 60 restaurants and 40 cafe-only places around every location.
+PLACES_AROUND = 100
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.config import GROUP_INITIAL_CANDIDATES
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_profiles
+    from backend.services import background, quota, scheduler, upstream
+    from backend.services.restaurants import gemini_scheduler
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def bulk_summaries() -> float:
+        return sum(
+            value
+            for name, values, _, value in scheduler.SCHEDULER_WAIT.samples()
+            if name.endswith("_count") and values == (gemini_scheduler.name, quota.BULK)
+        )
+
+    simulator = create_app(
+        parse_profiles(latency=["all=fixed:5"]), page_token_delay=SIMULATOR_PAGE_TOKEN_DELAY_SECONDS
+    )
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check", timeout=30
+    ) as client:
+
+        async def create(lat: float, **preferences) -> tuple:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/groups",
+                params={"member_id": "organizer"},
+                json={"latitude": lat, "longitude": 139.76, **preferences},
+            )
+            response.raise_for_status()
+            return response.json()["group_id"], time.perf_counter() - started
+
+        async def deck(group_id: str) -> list:
+            cards = []
+            while True:
+                response = await client.get(
+                    f"/api/groups/{group_id}/candidates", params={"start": len(cards), "limit": 50}
+                )
+                page = response.json()
+                cards.extend(page)
+                if len(page) < 50:
+                    return cards
+
+        def has_type(cards: list, place_type: str) -> int:
+            return sum(place_type in card["types"] for card in cards)
+
+        searches, bulk = simulator.state.stats[("nearby", "ok")], bulk_summaries()
+        group_id, _ = await create(35.68)
+        first = await deck(group_id)
+        expect(
+            "each place type is searched, the best merged results come first",
+            simulator.state.stats[("nearby", "ok")] - searches == 2
+            and len(first) == GROUP_INITIAL_CANDIDATES
+            and has_type(first, "restaurant") > 0
+            and has_type(first, "cafe") > 0,
+            f"{len(first)} candidates, {has_type(first, 'restaurant')} restaurants, {has_type(first, 'cafe')} cafes",
+        )
+
+        await background.drain(30)
+        cards = await deck(group_id)
+        place_ids = [card["place_id"] for card in cards]
+        added = cards[len(first) :]
+        expect(
+            "the rest of the search is added to the deck without duplicates",
+            len(cards) == PLACES_AROUND
+            and len(set(place_ids)) == len(place_ids)
+            and place_ids[: len(first)] == [card["place_id"] for card in first],
+            f"{len(cards)} candidates, {len(set(place_ids))} distinct, {has_type(cards, 'cafe')} cafes",
+        )
+        expect(
+            "added candidates are enriched as bulk work",
+            all(card["reviews"] and card["summary"] for card in added) and bulk_summaries() - bulk == PLACES_AROUND,
+            f"{sum(bool(card['summary']) for card in added)}/{len(added)} summarized, "
+            f"{bulk_summaries() - bulk:.0f} bulk Gemini calls",
+        )
+        pages = 6
+        expect(
+            "page tokens that were not ready yet are retried",
+            simulator.state.stats[("nearby", "ok")] - searches > pages,
+            f"{simulator.state.stats[('nearby', 'ok')] - searches} nearby calls for {pages} pages",
+        )
+
+        _, single = await create(35.70, types=["restaurant"])
+        _, multiple = await create(35.72)
+        expect(
+            "searching two types does not make creation slower",
+            multiple <= single * 1.5 + 0.05,
+            f"{single * 1000:.0f} ms for one type, {multiple * 1000:.0f} ms for two",
+        )
+        await background.drain(30)
+
+        response = await client.post(
+            "/api/restaurants/search", json={"latitude": 35.74, "longitude": 139.76, "types": ["cafe"]}
+        )
+        places = response.json() if response.status_code == 200 else []
+        expect(
+            "search honors types",
+            bool(places) and has_type(places, "cafe") == len(places),
+            f"HTTP {response.status_code}, {has_type(places, 'cafe')}/{len(places)} cafes",
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="pagination-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'pagination.db'}",
+            GOOGLE_API_KEY="pagination-check",
+            NEARBY_PAGE_TOKEN_DELAY_SECONDS=str(PAGE_TOKEN_DELAY_SECONDS),
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
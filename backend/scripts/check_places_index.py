@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Verify the in-process index of known places and the searches it answers.
+
+``PlaceIndex`` is exercised directly first, over ``PLACES`` random places around
+Tokyo, against a brute-force filter of the same places. Then the backend runs
+in-process against a temporary SQLite database, with Google and Gemini answered
+by ``upstream_simulator`` (the nearby search slowed down). The checks verify that:
+
+* radius, type and price queries return exactly the places a full scan finds,
+  best rated first, in microseconds,
+* a group created where enough places were seen within
+  ``PLACE_INDEX_FRESH_SECONDS`` gets them without waiting for Google, and the
+  search then runs in the background without adding duplicates,
+* places seen longer ago are not used, and Google is asked,
+* when every nearby search fails, known places within the radius are used, and
+  without any the error is returned as before,
+* ``refresh_known_places`` rebuilds the index from the candidates stored on the
+  shards, and drops places older than ``PLACE_INDEX_STALE_SECONDS``.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_places_index.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PLACES = 20_000
+QUERIES = 500
+FRESH_SECONDS = 600
+STALE_SECONDS = 3600
+NEARBY_LATENCY_MS = 300
+LOCATION = {"latitude": 35.68, "longitude": 139.76}
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def check_queries(expect) -> None:
+    from backend.schemas.restaurants import Restaurant
+    from backend.services.places_index import PlaceIndex, _distance
+
+    rng = random.Random(7)
+    now = time.time()
+    index = PlaceIndex(clock=lambda: now)
+    places = []
+    for number in range(PLACES):
+        restaurant = Restaurant(
+            place_id=f"index-{number}",
+            name=f"Place {number}",
+            address="",
+            photo_url=None,
+            rating=round(rng.uniform(3.0, 4.8), 1),
+            price_level=rng.choice([None, 1, 2, 3, 4]),
+            lat=35.68 + rng.uniform(-0.2, 0.2),
+            lng=139.76 + rng.uniform(-0.2, 0.2),
+            types=rng.choice([["restaurant"], ["cafe"], ["restaurant", "cafe"], ["bar"]]),
+            user_ratings_total=rng.randint(10, 2000),
+        )
+        seen_at = now - rng.uniform(0, 2 * FRESH_SECONDS)
+        places.append((restaurant, seen_at))
+        index.add(restaurant, seen_at)
+
+    mismatches = 0
+    seconds = []
+    for _ in range(QUERIES):
+        lat, lng = 35.68 + rng.uniform(-0.2, 0.2), 139.76 + rng.uniform(-0.2, 0.2)
+        radius = rng.choice([300, 1000, 3000])
+        types = rng.choice([["restaurant"], ["cafe"], ["restaurant", "cafe"]])
+        min_price, max_price = rng.choice([(0, 4), (1, 2), (3, 4)])
+        started = time.perf_counter()
+        found = index.query(lat, lng, radius, types, min_price, max_price, FRESH_SECONDS)
+        seconds.append(time.perf_counter() - started)
+        expected = {
+            restaurant.place_id
+            for restaurant, seen_at in places
+            if seen_at >= now - FRESH_SECONDS
+            and set(types) & set(restaurant.types)
+            and ((min_price, max_price) == (0, 4) or min_price <= (restaurant.price_level or -1) <= max_price)
+            and _distance(lat, lng, restaurant.lat, restaurant.lng) <= radius
+        }
+        ratings = [restaurant.rating for restaurant in found]
+        mismatches += {restaurant.place_id for restaurant in found} != expected or ratings != sorted(ratings)[::-1]
+    expect(
+        "queries match a full scan",
+        mismatches == 0,
+        f"{mismatches} of {QUERIES} differ",
+    )
+    expect(
+        "queries take microseconds",
+        statistics.median(seconds) < 0.001,
+        f"p50 {statistics.median(seconds) * 1e6:.0f} us, max {max(seconds) * 1e6:.0f} us over {PLACES} places",
+    )
+
+    moved = places[0][0].model_copy(update={"lat": 0.0, "lng": 0.0})
+    index.add(moved, now)
+    index.add(places[0][0], now - 1)
+    expect(
+        "a newer sighting replaces an older one, in its new cell",
+        len(index) == PLACES
+        and [restaurant.place_id for restaurant in index.query(0.0, 0.0, 100)] == [moved.place_id],
+    )
+    dropped = index.prune(FRESH_SECONDS)
+    expect(
+        "prune drops places not seen within max_age",
+        dropped > 0 and len(index) == PLACES - dropped and len(index.query(35.68, 139.76, 50_000)) == len(index) - 1,
+        f"{dropped} dropped, {len(index)} left",
+    )
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.config import GROUP_INITIAL_CANDIDATES
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import background, groups, upstream
+    from backend.services.places_index import PLACE_INDEX_ANSWERS
+    from backend.services.restaurants import known_places
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def answers(reason: str) -> float:
+        return sum(value for _, values, _, value in PLACE_INDEX_ANSWERS.samples() if values == (reason,))
+
+    check_queries(expect)
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    profiles["nearby"].latency = parse_latency(f"fixed:{NEARBY_LATENCY_MS}")
+    simulator = create_app(profiles)
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check", timeout=30
+    ) as client:
+
+        async def create(**preferences) -> tuple:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/groups", params={"member_id": "organizer"}, json={**LOCATION, **preferences}
+            )
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                return None, elapsed, response.status_code
+            group_id = response.json()["group_id"]
+            cards = await client.get(f"/api/groups/{group_id}/candidates", params={"limit": 50})
+            return cards.json(), elapsed, response.status_code
+
+        def nearby_calls() -> int:
+            return simulator.state.stats[("nearby", "ok")] + simulator.state.stats[("nearby", "error")]
+
+        searches = nearby_calls()
+        first, searched, _ = await create(types=["restaurant"])
+        await background.drain(30)
+        expect(
+            "a first group searches Google and its places are indexed",
+            nearby_calls() - searches == 1 and len(known_places) >= GROUP_INITIAL_CANDIDATES,
+            f"{len(known_places)} known places",
+        )
+
+        searches = nearby_calls()
+        second, indexed, _ = await create(types=["restaurant"])
+        await background.drain(30)
+        expect(
+            "a group where enough fresh places are known gets them without waiting for Google",
+            answers("fresh") == 1
+            and len(second) == GROUP_INITIAL_CANDIDATES
+            and all(card["summary"] for card in second)
+            and indexed * 1000 < NEARBY_LATENCY_MS,
+            f"{indexed * 1000:.0f} ms instead of {searched * 1000:.0f} ms",
+        )
+        place_ids = [card["place_id"] for card in second]
+        expect(
+            "the search still runs in the background and adds no duplicates",
+            nearby_calls() - searches == 1 and len(set(place_ids)) == len(place_ids),
+            f"{nearby_calls() - searches} nearby calls",
+        )
+
+        stale_at = time.time() - FRESH_SECONDS * 2
+        places = known_places.query(LOCATION["latitude"], LOCATION["longitude"], 1000)
+        known_places.clear()
+        known_places.add_all((restaurant, stale_at) for restaurant in places)
+        searches = nearby_calls()
+        await create(types=["restaurant"])
+        expect(
+            f"places seen more than {FRESH_SECONDS} s ago are not used while Google answers",
+            nearby_calls() - searches == 1 and answers("fresh") == 1,
+        )
+        await background.drain(30)
+
+        profiles["nearby"].error_rate = 1.0
+        radius = 300
+        nearby = known_places.query(LOCATION["latitude"], LOCATION["longitude"], radius, ["restaurant"])
+        fallback, _, status = await create(types=["restaurant"], radius=radius)
+        expect(
+            "when every nearby search fails, known places within the radius are used",
+            status == 200
+            and answers("fallback") == 1
+            and 0 < len(fallback) < GROUP_INITIAL_CANDIDATES
+            and {card["place_id"] for card in fallback} == {restaurant.place_id for restaurant in nearby},
+            f"HTTP {status}, {len(fallback or [])} candidates",
+        )
+        _, _, status = await create(latitude=34.0, longitude=135.0, types=["restaurant"])
+        expect("without known places the error is returned", status >= 500, f"HTTP {status}")
+        profiles["nearby"].error_rate = 0.0
+        await background.drain(30)
+
+        known_places.clear()
+        groups._known_places_loaded.clear()
+        loaded = await groups.refresh_known_places()
+        stored = len({card["place_id"] for card in first + second})
+        expect(
+            "the index is rebuilt from stored candidates",
+            loaded > 0 and len(known_places) >= stored,
+            f"{loaded} rows, {len(known_places)} places",
+        )
+        expect(
+            "a later refresh only reads new rows",
+            await groups.refresh_known_places() == 0,
+        )
+        forgotten = first[0]["place_id"]
+        old = next(place for place in places if place.place_id == forgotten)
+        known_places.clear()
+        known_places.add(old, time.time() - STALE_SECONDS * 2)
+        await groups.refresh_known_places()
+        expect(
+            f"places not seen for {STALE_SECONDS} s are dropped on refresh",
+            forgotten not in {place.place_id for place in known_places.query(35.68, 139.76, 1000)},
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="places-index-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'places.db'}",
+            GOOGLE_API_KEY="places-index-check",
+            NEARBY_SEARCH_MAX_PAGES="1",
+            DECK_MAX_EXTENSIONS="0",
+            PLACE_INDEX_FRESH_SECONDS=str(FRESH_SECONDS),
+            PLACE_INDEX_STALE_SECONDS=str(STALE_SECONDS),
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
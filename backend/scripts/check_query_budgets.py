@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Fail when a group service function runs more SQL statements than its budget.
+
+Each service call is executed once against a seeded database inside
+``backend.observability.queries.query_budget``. Transaction control statements
+are not counted. When a budget is exceeded the offending statements are printed
+in normalized form and the script exits with status 1, so a change that quietly
+adds a query fails CI. Lower a budget when a query is removed.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_query_budgets.py
+    python backend/scripts/check_query_budgets.py --database-url mysql+aiomysql://...
+
+Without ``--database-url`` a temporary SQLite file is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+GROUP_ID = "budget-check"
+CANDIDATES = 12
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="SQLAlchemy async URL of a disposable database")
+    return parser.parse_args()
+
+
+async def seed() -> None:
+    from backend.models import GroupModel, GroupRestaurantModel
+    from backend.repository import groups as group_repo
+    from backend.services.database import group_session
+
+    async with group_session(GROUP_ID) as session:
+        await group_repo.add_group(
+            session,
+            GroupModel(id=GROUP_ID, organizer_id="alice", latitude=35.0, longitude=139.0, radius=1000),
+        )
+        await group_repo.ensure_member(session, GROUP_ID, "alice")
+        await group_repo.ensure_member(session, GROUP_ID, "bob")
+        await group_repo.add_restaurants(
+            session,
+            [
+                GroupRestaurantModel(
+                    group_id=GROUP_ID, place_id=f"place-{n}", position=n, name=f"Place {n}", lat=35.0, lng=139.0
+                )
+                for n in range(CANDIDATES)
+            ],
+        )
+        await session.commit()
+
+
+async def cleanup() -> None:
+    from backend.repository import shards as shard_repo
+    from backend.services.database import group_session
+
+    async with group_session(GROUP_ID) as session:
+        await shard_repo.delete_group_rows(session, GROUP_ID)
+        await session.commit()
+
+
+async def run_checks() -> int:
+    from backend.observability.queries import QueryBudgetExceeded, query_budget
+    from backend.schemas.groups import VoteRequest
+    from backend.services import groups as group_service
+    from backend.services.database import init_models, shutdown_engine
+
+    await init_models(max_attempts=1)
+    await cleanup()
+    await seed()
+
+    def vote(member_id: str, place_id: str) -> Callable[[], Awaitable[object]]:
+        request = VoteRequest(candidate_id=place_id, value="like")
+        return lambda: group_service.submit_vote(GROUP_ID, member_id, request)
+
+    # (label, budget, call) in the order a group goes through its lifecycle.
+    budgets: List[Tuple[str, int, Callable[[], Awaitable[object]]]] = [
+        ("get_group_info (member)", 2, lambda: group_service.get_group_info(GROUP_ID, "alice")),
+        ("get_group_info (joins)", 3, lambda: group_service.get_group_info(GROUP_ID, "carol")),
+        ("list_group_candidates", 3, lambda: group_service.list_group_candidates(GROUP_ID, "alice", 0, 10)),
+        ("submit_vote (member)", 2, vote("alice", "place-0")),
+        ("submit_vote (joins)", 3, vote("dave", "place-1")),
+        ("submit_vote (changes vote)", 2, vote("alice", "place-0")),
+        ("finish_group", 4, lambda: group_service.finish_group(GROUP_ID, "alice")),
+        ("get_group_results", 3, lambda: group_service.get_group_results(GROUP_ID)),
+    ]
+
+    failures = 0
+    for label, budget, call in budgets:
+        try:
+            with query_budget(budget, label) as log:
+                await call()
+        except QueryBudgetExceeded as exc:
+            failures += 1
+            print(f"FAIL {exc}")
+            continue
+        print(f"  ok {label}: {log.count}/{budget} queries, {log.seconds * 1000:.2f} ms")
+
+    await cleanup()
+    await shutdown_engine()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="query-budgets-") as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'budgets.db'}"
+        # The synthetic groups must not go looking for more candidates in the background.
+        os.environ["DECK_MAX_EXTENSIONS"] = "0"
+        add_repo_to_sys_path()
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
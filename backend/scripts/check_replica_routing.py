@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Verify read-replica session routing against two local SQLite files.
+
+A primary and a replica database are created in a temporary directory. The
+replica is a snapshot of the primary taken with SQLite's backup API, and its
+lag is simulated through ``DATABASE_REPLICA_LAG_QUERY`` reading a heartbeat
+table. The script then drives the group services and checks which engine
+served each statement:
+
+* reads stay on the primary until the replica's lag has been measured,
+* read-only calls then go to the replica,
+* a member who just voted reads from the primary (read-your-writes),
+* every read falls back to the primary once the replica lags too far,
+* a replica that does not answer the lag query in time is treated as unhealthy.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_replica_routing.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def configure_environment(workdir: Path) -> None:
+    """Point the backend at a primary/replica pair of SQLite files."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'primary.db'}"
+    os.environ["DATABASE_REPLICA_URLS"] = f"sqlite+aiosqlite:///{workdir / 'replica.db'}"
+    # ``spin`` makes the heartbeat query count that many rows first, standing in for a replica that hangs.
+    os.environ["DATABASE_REPLICA_LAG_QUERY"] = (
+        "WITH RECURSIVE spin(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM spin"
+        " WHERE n < (SELECT spin FROM replica_heartbeat))"
+        " SELECT (SELECT lag_seconds FROM replica_heartbeat) + 0 * COUNT(*) FROM spin"
+    )
+    os.environ["REPLICA_MAX_LAG_SECONDS"] = "2"
+    os.environ["REPLICA_LAG_CHECK_TIMEOUT_SECONDS"] = "0.5"
+    # The synthetic groups must not go looking for more candidates in the background.
+    os.environ["DECK_MAX_EXTENSIONS"] = "0"
+
+
+def replicate(workdir: Path, lag_seconds: float) -> None:
+    """Copy the primary into the replica and record the simulated lag."""
+    source = sqlite3.connect(workdir / "primary.db")
+    target = sqlite3.connect(workdir / "replica.db")
+    source.backup(target)
+    target.execute("CREATE TABLE IF NOT EXISTS replica_heartbeat (lag_seconds REAL, spin INTEGER)")
+    target.execute("DELETE FROM replica_heartbeat")
+    target.execute("INSERT INTO replica_heartbeat VALUES (?, 0)", (lag_seconds,))
+    target.commit()
+    source.close()
+    target.close()
+
+
+def set_lag(workdir: Path, lag_seconds: float, spin: int = 0) -> None:
+    """Update the simulated replica lag, and how long the lag query takes, without copying data."""
+    target = sqlite3.connect(workdir / "replica.db")
+    target.execute("UPDATE replica_heartbeat SET lag_seconds = ?, spin = ?", (lag_seconds, spin))
+    target.commit()
+    target.close()
+
+
+async def run_checks(workdir: Path) -> int:
+    from sqlalchemy import event
+
+    from backend.models import GroupMemberModel, GroupModel, GroupRestaurantModel
+    from backend.schemas.groups import VoteRequest
+    from backend.services import groups as group_service
+    from backend.services.database import (
+        AsyncSessionLocal,
+        init_models,
+        refresh_replica_lag,
+        shards,
+        shutdown_engine,
+    )
+
+    await init_models(max_attempts=1)
+    async with AsyncSessionLocal() as session:
+        session.add(GroupModel(id="replica-check", organizer_id="alice", latitude=35.0, longitude=139.0, radius=1000))
+        await session.flush()
+        session.add_all(
+            [
+                GroupMemberModel(group_id="replica-check", member_id="alice"),
+                GroupMemberModel(group_id="replica-check", member_id="bob"),
+                GroupRestaurantModel(
+                    group_id="replica-check", place_id="place-1", position=0, name="Place 1", lat=35.0, lng=139.0
+                ),
+            ]
+        )
+        await session.commit()
+    replicate(workdir, lag_seconds=0.0)
+
+    served_by: List[str] = []
+
+    def track(name: str):
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if "replica_heartbeat" not in statement and not statement.startswith("BEGIN"):
+                served_by.append(name)
+
+        return listener
+
+    replica_set = shards[0]
+    event.listen(replica_set.primary.sync_engine, "before_cursor_execute", track("primary"))
+    event.listen(replica_set.replicas[0].sync_engine, "before_cursor_execute", track("replica"))
+
+    failures = 0
+
+    async def expect(label: str, expected: str, call: Callable[[], Awaitable[object]]) -> None:
+        nonlocal failures
+        served_by.clear()
+        await call()
+        engines = sorted(set(served_by))
+        ok = engines == [expected]
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}: served by {', '.join(engines) or 'nothing'} (expected {expected})")
+
+    await expect(
+        "group info before the lag is measured",
+        "primary",
+        lambda: group_service.get_group_info("replica-check", "bob"),
+    )
+    await refresh_replica_lag()
+    await expect("group info read", "replica", lambda: group_service.get_group_info("replica-check", "bob"))
+    await expect(
+        "vote write",
+        "primary",
+        lambda: group_service.submit_vote("replica-check", "bob", VoteRequest(candidate_id="place-1", value="like")),
+    )
+    await expect(
+        "candidates right after voting",
+        "primary",
+        lambda: group_service.list_group_candidates("replica-check", "bob", 0, 20),
+    )
+    await expect(
+        "candidates for another member",
+        "replica",
+        lambda: group_service.list_group_candidates("replica-check", "alice", 0, 20),
+    )
+
+    set_lag(workdir, lag_seconds=30.0)
+    await refresh_replica_lag()
+    await expect(
+        "group info while replica lags",
+        "primary",
+        lambda: group_service.get_group_info("replica-check", "alice"),
+    )
+
+    set_lag(workdir, lag_seconds=0.0)
+    await refresh_replica_lag()
+    set_lag(workdir, lag_seconds=0.0, spin=5_000_000)
+    started = time.perf_counter()
+    await refresh_replica_lag()
+    elapsed = time.perf_counter() - started
+    ok = elapsed < 2.0
+    failures += not ok
+    print(f"{'ok' if ok else 'FAIL':>4} lag check on a blocked replica gave up after {elapsed:.2f}s")
+    await expect(
+        "group info while the replica does not answer",
+        "primary",
+        lambda: group_service.get_group_info("replica-check", "alice"),
+    )
+    # The abandoned measurement still has to close its connection once the slow query returns.
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    await shutdown_engine()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="replica-check-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir)
+        add_repo_to_sys_path()
+        raise SystemExit(asyncio.run(run_checks(workdir)))
+
+
+if __name__ == "__main__":
+    main()
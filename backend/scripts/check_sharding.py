@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Verify group sharding and rebalancing against three local SQLite files.
+
+Shard 0 is ``DATABASE_URL`` and shards 1 and 2 come from ``DATABASE_SHARD_URLS``,
+all in a temporary directory. The script seeds groups through the shard router
+and checks, by opening each file directly, that:
+
+* new group ids encode their shard and their rows live only on that shard,
+* reads and votes go through the router to the right shard,
+* legacy ids without a shard prefix resolve to shard 0,
+* ids naming a missing shard are reported as not found,
+* ``move_group`` relocates every row, and a fresh router (another process)
+  follows the override afterwards,
+* writes a stale process makes to the source during the grace period (a changed
+  vote, an appended and an enriched candidate, a deck extension) are merged into
+  the target, after the candidates the target got meanwhile.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_sharding.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+SHARD_COUNT = 3
+GROUP_TABLES = ("groups", "group_members", "group_restaurants", "group_votes")
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def shard_path(workdir: Path, shard: int) -> Path:
+    return workdir / f"shard{shard}.db"
+
+
+def configure_environment(workdir: Path) -> None:
+    """Point the backend at three SQLite shards."""
+    urls = [f"sqlite+aiosqlite:///{shard_path(workdir, shard)}" for shard in range(SHARD_COUNT)]
+    os.environ["DATABASE_URL"] = urls[0]
+    os.environ["DATABASE_SHARD_URLS"] = ",".join(urls[1:])
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+
+def rows_per_shard(workdir: Path, group_id: str) -> List[Dict[str, int]]:
+    """Count the group's rows in every table of every shard file."""
+    counts: List[Dict[str, int]] = []
+    for shard in range(SHARD_COUNT):
+        conn = sqlite3.connect(shard_path(workdir, shard))
+        shard_counts = {}
+        for table in GROUP_TABLES:
+            column = "id" if table == "groups" else "group_id"
+            query = f"SELECT COUNT(*) FROM {table} WHERE {column} = ?"
+            shard_counts[table] = conn.execute(query, (group_id,)).fetchone()[0]
+        conn.close()
+        counts.append(shard_counts)
+    return counts
+
+
+def shards_holding(workdir: Path, group_id: str) -> List[int]:
+    return [shard for shard, counts in enumerate(rows_per_shard(workdir, group_id)) if any(counts.values())]
+
+
+async def run_checks(workdir: Path) -> int:
+    from sqlalchemy import select
+
+    from backend.models import GroupModel, GroupRestaurantModel, GroupVoteModel
+    from backend.repository import groups as group_repo
+    from backend.schemas.groups import VoteRequest
+    from backend.services import groups as group_service
+    from backend.services.database import (
+        init_models,
+        load_shard_overrides,
+        router,
+        shard_session,
+        shutdown_engine,
+    )
+    from backend.services.exceptions import ServiceError
+    from backend.services.rebalance import move_group
+    from backend.services.sharding import ShardRouter
+
+    await init_models(max_attempts=1)
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    async def seed(group_id: str, shard: int) -> None:
+        async with shard_session(shard) as session:
+            await group_repo.add_group(
+                session,
+                GroupModel(id=group_id, organizer_id="alice", latitude=35.0, longitude=139.0, radius=1000),
+            )
+            await group_repo.ensure_member(session, group_id, "alice")
+            await group_repo.add_restaurants(
+                session,
+                [
+                    GroupRestaurantModel(
+                        group_id=group_id, place_id=f"place-{n}", position=n, name=f"Place {n}", lat=35.0, lng=139.0
+                    )
+                    for n in range(3)
+                ],
+            )
+            await session.commit()
+
+    group_ids = []
+    for shard in range(SHARD_COUNT):
+        async with shard_session(shard) as session:
+            group_id = await group_service._generate_unique_group_id(session, shard)
+        await seed(group_id, shard)
+        group_ids.append(group_id)
+        expect(
+            f"group created on shard {shard}",
+            router.home_shard(group_id) == shard and shards_holding(workdir, group_id) == [shard],
+            f"id {group_id}, rows on shards {shards_holding(workdir, group_id)}",
+        )
+
+    target_id = group_ids[1]
+    await group_service.submit_vote(target_id, "bob", VoteRequest(candidate_id="place-0", value="like"))
+    info = await group_service.get_group_info(target_id, "carol")
+    counts = rows_per_shard(workdir, target_id)[1]
+    expect(
+        "vote and join routed to the group's shard",
+        counts["group_votes"] == 1 and counts["group_members"] == 3 and info.members == ["alice", "bob", "carol"],
+        f"{counts}",
+    )
+
+    await seed("legacyid", 0)
+    info = await group_service.get_group_info("legacyid", None)
+    expect("legacy id without prefix reads from shard 0", info.group_id == "legacyid")
+
+    try:
+        await group_service.get_group_info(f"{SHARD_COUNT}~missing", None)
+        expect("id naming a missing shard", False, "no error raised")
+    except ServiceError as exc:
+        expect("id naming a missing shard", exc.status_code == 404, f"status {exc.status_code}")
+
+    before = rows_per_shard(workdir, target_id)[1]
+    source = await move_group(target_id, 2, grace_seconds=0)
+    after = rows_per_shard(workdir, target_id)
+    expect(
+        "move_group relocates every row",
+        source == 1 and after[2] == before and not any(after[1].values()),
+        f"shard 1 {after[1]}, shard 2 {after[2]}",
+    )
+
+    await group_service.submit_vote(target_id, "carol", VoteRequest(candidate_id="place-1", value="dislike"))
+    results = await group_service.finish_group(target_id, "alice")
+    expect(
+        "writes after the move land on the new shard",
+        shards_holding(workdir, target_id) == [2] and rows_per_shard(workdir, target_id)[2]["group_votes"] == 2,
+        f"{len(results.results)} results",
+    )
+
+    other_process = ShardRouter(SHARD_COUNT, load_shard_overrides)
+    expect("a fresh router follows the override", await other_process.shard_for(target_id) == 2)
+
+    def candidate(place_id: str, position: int) -> GroupRestaurantModel:
+        return GroupRestaurantModel(
+            group_id=target_id, place_id=place_id, position=position, name=place_id, lat=35.0, lng=139.0
+        )
+
+    moving = asyncio.create_task(move_group(target_id, 0, grace_seconds=0.5))
+    while router.lookup(target_id) != 0:
+        await asyncio.sleep(0.01)
+    # A process that has not reloaded the overrides keeps writing to shard 2 ...
+    async with shard_session(2) as session:
+        await group_repo.upsert_vote(session, target_id, "carol", "place-1", "like")
+        await group_repo.add_restaurants(session, [candidate("place-late", 3)])
+        enriched = (await group_repo.fetch_restaurants(session, target_id))[0]
+        enriched.summary = "late summary"
+        group = await group_repo.fetch_group(session, target_id)
+        group.deck_extensions += 1
+        await session.commit()
+    # ... while one that has appends to the target.
+    async with shard_session(0) as session:
+        await group_repo.add_restaurants(session, [candidate("place-target", 3)])
+        await session.commit()
+    await moving
+
+    async with shard_session(0, readonly=True) as session:
+        votes = dict(
+            ((member_id, place_id), value)
+            for member_id, place_id, value in (
+                await session.execute(
+                    select(GroupVoteModel.member_id, GroupVoteModel.place_id, GroupVoteModel.value).where(
+                        GroupVoteModel.group_id == target_id
+                    )
+                )
+            ).all()
+        )
+        candidates = {row.place_id: row for row in await group_repo.fetch_restaurants(session, target_id)}
+        group = await group_repo.fetch_group(session, target_id)
+        await session.commit()
+    expect(
+        "late writes to the source are merged into the target",
+        shards_holding(workdir, target_id) == [0]
+        and votes == {("bob", "place-0"): "like", ("carol", "place-1"): "like"}
+        and candidates["place-late"].position == 4
+        and candidates["place-target"].position == 3
+        and candidates["place-0"].summary == "late summary"
+        and group.deck_extensions == 1,
+        f"votes {votes}, positions {[(place_id, row.position) for place_id, row in candidates.items()]}, "
+        f"{group.deck_extensions} extensions",
+    )
+
+    await move_group(target_id, 1, grace_seconds=0)
+    fresh = ShardRouter(SHARD_COUNT, load_shard_overrides)
+    expect(
+        "moving back home clears the override",
+        shards_holding(workdir, target_id) == [1] and await fresh.shard_for(target_id) == 1,
+    )
+
+    await shutdown_engine()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="shard-check-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir)
+        add_repo_to_sys_path()
+        raise SystemExit(asyncio.run(run_checks(workdir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Verify the token budget of summary prompts and the accounting of Gemini calls.
+
+The prompt builder is exercised directly with long, repetitive and duplicated
+Japanese reviews, then groups are created in-process (temporary SQLite database,
+Google and Gemini answered by ``upstream_simulator``). The checks verify that:
+
+* review text in card and detail prompts stays within its token budget, short
+  reviews are kept whole and long ones are cut at a sentence end,
+* duplicates are dropped, repeated symbols collapsed, and the least informative
+  reviews are the ones left out when the budget is tight,
+* every summary is counted in ``llm_summaries`` and its tokens in ``llm_tokens``,
+* group creation logs a usage summary with calls, tokens and cost, and a group
+  created again at the same place is served from the summary cache.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_summary_prompts.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+LONG_REVIEW = "ランチの定食がとても美味しかったです。店員さんの接客も丁寧で、落ち着いた雰囲気でした。" * 40
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+class Records(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.messages: list = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+async def run_checks() -> int:
+    import httpx
+
+    from backend.config import SUMMARY_CARD_REVIEW_TOKENS, SUMMARY_DETAIL_REVIEW_TOKENS
+    from backend.main import app
+    from backend.observability import llm
+    from backend.schemas.restaurants import Review
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_profiles
+    from backend.services import prompt_builder, upstream
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def review(text: str) -> Review:
+        return Review(author_name="check", rating=4, text=text, time="1 か月前")
+
+    def tokens(reviews: list) -> int:
+        return sum(prompt_builder.estimate_tokens(item.text) for item in reviews)
+
+    long_reviews = [review(f"{n}回目の訪問です。" + LONG_REVIEW) for n in range(5)]
+    for budget, name in ((SUMMARY_CARD_REVIEW_TOKENS, "card"), (SUMMARY_DETAIL_REVIEW_TOKENS, "detail")):
+        fitted = prompt_builder.fit_reviews(long_reviews, budget)
+        expect(
+            f"{name} review text stays within its budget",
+            len(fitted) == 5 and tokens(fitted) <= budget and all(item.text.endswith("。…") for item in fitted),
+            f"{tokens(long_reviews)} -> {tokens(fitted)} tokens (budget {budget})",
+        )
+
+    short = review("カレーが絶品でした。")
+    fitted = prompt_builder.fit_reviews([short, *long_reviews[:2]], 400)
+    expect(
+        "short reviews are kept whole next to trimmed long ones",
+        short.text in [item.text for item in fitted] and tokens(fitted) <= 400,
+        f"{[prompt_builder.estimate_tokens(item.text) for item in fitted]} tokens",
+    )
+
+    noisy = [
+        review("美味しい！！！！！！   最高😋😋😋😋"),
+        review("美味しい！！！！！！ 最高😋😋😋😋"),
+        review("おいしいおいしいおいしいおいしいおいしい"),
+        review("炭火で焼いた鶏肉が香ばしく、自家製のタレもよく合う。ランチは千円以内で、平日でも混むので早めがおすすめ。"),
+    ]
+    fitted = prompt_builder.fit_reviews(noisy, 60)
+    texts = [item.text for item in fitted]
+    expect(
+        "duplicates dropped, repeats collapsed, least informative left out",
+        len(fitted) == 2 and texts[0].startswith("炭火") and "美味しい! 最高😋" in texts,
+        f"{texts}",
+    )
+
+    records = Records()
+    logging.getLogger("backend.services.groups").addHandler(records)
+    logging.getLogger("backend.services.groups").setLevel(logging.INFO)
+
+    def summaries(cache: str) -> float:
+        return sum(value for _, values, _, value in llm.LLM_SUMMARIES.samples() if values[1] == cache)
+
+    def prompt_tokens() -> float:
+        return sum(value for _, values, _, value in llm.LLM_TOKENS.samples() if values[1] == "prompt")
+
+    upstream.transport = SimulatorTransport(app=create_app(parse_profiles(latency=["all=fixed:5"])))
+    await app.router.startup()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://check"
+    ) as client:
+
+        async def create() -> int:
+            response = await client.post(
+                "/api/groups",
+                params={"member_id": "organizer"},
+                json={"latitude": 35.68, "longitude": 139.76, "types": ["restaurant"]},
+            )
+            return response.status_code
+
+        misses, hits, before_tokens = summaries("miss"), summaries("hit"), prompt_tokens()
+        status = await create()
+        created = [message for message in records.messages if message.startswith("Created group")]
+        expect(
+            "group creation logs its Gemini usage",
+            status == 200 and bool(created) and "20 Gemini calls" in created[-1] and "~$" in created[-1],
+            created[-1] if created else f"HTTP {status}, no log",
+        )
+        expect(
+            "every Gemini call is counted with its tokens",
+            summaries("miss") - misses == 20 and prompt_tokens() - before_tokens > 0,
+            f"{summaries('miss') - misses:.0f} calls, {prompt_tokens() - before_tokens:.0f} prompt tokens",
+        )
+
+        status = await create()
+        created = [message for message in records.messages if message.startswith("Created group")]
+        expect(
+            "a second group at the same place is summarized from the cache",
+            status == 200 and "0 Gemini calls (20 more from cache)" in created[-1] and summaries("hit") - hits == 20,
+            created[-1],
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="prompt-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'prompts.db'}",
+            GOOGLE_API_KEY="prompt-check",
+            NEARBY_SEARCH_MAX_PAGES="1",
+            PLACE_INDEX_FRESH_SECONDS="0",
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Verify that hedged upstream calls cut tail latency within their hedge budget.
+
+Place Details calls run against ``upstream_simulator`` with a long-tailed
+(lognormal) latency, first as ordinary calls and then marked idempotent with
+``places_details`` listed in ``HEDGE_UPSTREAMS``. The checks verify that:
+
+* the hedged calls have a clearly lower p99 than the plain ones,
+* hedges stay within ``HEDGE_MAX_RATIO`` of the calls (plus the few saved-up ones),
+* ``upstream_hedges`` reports how many hedges were sent and how many won,
+* a hedge that is quickly answered with a 503 does not beat a slower success,
+* idempotent calls to an upstream not listed in ``HEDGE_UPSTREAMS`` are never hedged.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_upstream_hedging.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CALLS = 1000
+CONCURRENCY = 10
+LATENCY = "lognormal:20:1.0"
+MAX_RATIO = 0.05
+# Wanted drop in p99 latency from hedging; this tail gives about a third, so CI timing noise has room.
+MIN_P99_REDUCTION = 0.2
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_checks() -> int:
+    from backend.config import GOOGLE_PLACE_DETAILS_URL, GOOGLE_PLACES_API_URL, HEDGE_MIN_SAMPLES
+    from backend.observability import metrics
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import hedging, upstream
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def hedges(name: str) -> dict:
+        counts = {"sent": 0.0, "won": 0.0, "lost": 0.0, "skipped": 0.0}
+        for _, values, _, value in metrics.REGISTRY.get("upstream_hedges").samples():
+            if values[0] == name:
+                counts[values[1]] = value
+        return counts
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    profiles["details"].latency = parse_latency(LATENCY)
+    upstream.transport = SimulatorTransport(app=create_app(profiles))
+    client = upstream.shared_client()
+
+    async def run(idempotent: bool) -> list:
+        slots = asyncio.Semaphore(CONCURRENCY)
+
+        async def one(index: int) -> float:
+            async with slots:
+                started = time.perf_counter()
+                response = await upstream.request(
+                    client,
+                    upstream.PLACE_DETAILS,
+                    "GET",
+                    GOOGLE_PLACE_DETAILS_URL,
+                    idempotent=idempotent,
+                    params={"key": "hedging-check", "place_id": f"sim:35.68:139.76:{index}"},
+                )
+                response.raise_for_status()
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(one(index) for index in range(CALLS)))
+
+    plain = await run(idempotent=False)
+    delay = hedging.tracker(upstream.PLACE_DETAILS).delay()
+    hedged = await run(idempotent=True)
+    counts = hedges(upstream.PLACE_DETAILS)
+
+    plain_p99, hedged_p99 = percentile(plain, 0.99), percentile(hedged, 0.99)
+    expect(
+        "hedging cuts the p99 latency",
+        hedged_p99 <= plain_p99 * (1 - MIN_P99_REDUCTION),
+        f"p50 {percentile(plain, 0.5) * 1000:.0f} -> {percentile(hedged, 0.5) * 1000:.0f} ms, "
+        f"p99 {plain_p99 * 1000:.0f} -> {hedged_p99 * 1000:.0f} ms (hedge delay {(delay or 0) * 1000:.0f} ms)",
+    )
+    budget = CALLS * MAX_RATIO + hedging.MAX_SAVED_HEDGES
+    expect(
+        "hedges stay within HEDGE_MAX_RATIO",
+        0 < counts["sent"] <= budget,
+        f"{counts['sent']:.0f} sent for {CALLS} calls (at most {budget:.0f}), {counts['skipped']:.0f} skipped",
+    )
+    expect(
+        "won and lost hedges are counted",
+        counts["won"] > 0 and counts["won"] + counts["lost"] == counts["sent"],
+        f"won {counts['won']:.0f}, lost {counts['lost']:.0f}",
+    )
+
+    # A synthetic upstream whose hedge is answered at once with a 503 while the first attempt succeeds later.
+    for _ in range(max(HEDGE_MIN_SAMPLES, hedging.RECOMPUTE_EVERY)):
+        hedging.observe("synthetic", 0.01)
+    synthetic_delay = hedging.tracker("synthetic").delay() or 0.0
+    for _ in range(int(1 / MAX_RATIO)):
+        hedging._budgets.setdefault("synthetic", hedging.HedgeBudget()).earn()
+
+    async def overloaded_hedge(is_hedge: bool) -> httpx.Response:
+        if is_hedge:
+            return httpx.Response(503)
+        await asyncio.sleep(synthetic_delay * 3)
+        return httpx.Response(200)
+
+    answer = await hedging.hedged("synthetic", overloaded_hedge, upstream._answered)
+    synthetic = hedges("synthetic")
+    expect(
+        "a 503 from the hedge does not win over a slower success",
+        answer.status_code == 200 and synthetic["sent"] == 1 and synthetic["lost"] == 1,
+        f"answered {answer.status_code}, hedge sent {synthetic['sent']:.0f}, lost {synthetic['lost']:.0f}",
+    )
+
+    profiles["nearby"].latency = parse_latency(LATENCY)
+    for _ in range(100):
+        await upstream.request(
+            client,
+            upstream.NEARBY_SEARCH,
+            "GET",
+            GOOGLE_PLACES_API_URL,
+            idempotent=True,
+            params={"key": "hedging-check", "location": "35.68,139.76", "radius": 500},
+        )
+    nearby = hedges(upstream.NEARBY_SEARCH)
+    expect(
+        "upstreams not listed in HEDGE_UPSTREAMS are never hedged",
+        not any(nearby.values()),
+        f"{nearby['sent']:.0f} sent, {nearby['skipped']:.0f} skipped",
+    )
+
+    await upstream.close_shared_client()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="hedging-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'hedging.db'}",
+            GOOGLE_API_KEY="hedging-check",
+            HEDGE_UPSTREAMS="places_details",
+            HEDGE_MAX_RATIO=str(MAX_RATIO),
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Verify the upstream quota governor against an in-memory store and a shared SQLite store.
+
+The checks call ``backend.services.quota`` directly (no upstream requests are
+made) and verify that:
+
+* calls beyond the burst wait for the refill rate instead of failing,
+* queued interactive calls are served before bulk calls that arrived earlier,
+* bulk calls leave the reserved share of the bucket to interactive calls,
+* a call whose deadline passes gets ``ServiceError(503)``,
+* two governors on the database store (two instances) share one bucket,
+* a failing store lets calls through.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_upstream_quota.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+RATE = 20.0
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    from backend.services import quota
+    from backend.services.database import init_models, shutdown_engine
+    from backend.services.exceptions import ServiceError
+
+    await init_models(max_attempts=1)
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def fresh(name: str, store) -> "quota.QuotaGovernor":
+        quota.store = store
+        return quota.QuotaGovernor(name, RATE)
+
+    # Burst is RATE * UPSTREAM_QUOTA_BURST_SECONDS tokens; the rest are paced at RATE per second.
+    governor = fresh("pace", quota.MemoryQuotaStore())
+    extra = 10
+    calls = int(governor.capacity) + extra
+    started = time.perf_counter()
+    await asyncio.gather(*(governor.acquire(quota.INTERACTIVE, 5.0) for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    expected = extra / RATE
+    expect(
+        "calls beyond the burst are paced, not rejected",
+        expected * 0.8 <= elapsed <= expected * 2,
+        f"{calls} calls in {elapsed:.2f}s (expected ~{expected:.2f}s)",
+    )
+
+    governor = fresh("priority", quota.MemoryQuotaStore())
+    for _ in range(int(governor.capacity)):
+        await governor.acquire(quota.INTERACTIVE, 1.0)
+    order: List[str] = []
+
+    async def call(priority: str, label: str) -> None:
+        await governor.acquire(priority, 5.0)
+        order.append(label)
+
+    bulk = [asyncio.create_task(call(quota.BULK, f"bulk-{n}")) for n in range(3)]
+    await asyncio.sleep(0.01)
+    interactive = [asyncio.create_task(call(quota.INTERACTIVE, f"interactive-{n}")) for n in range(3)]
+    await asyncio.gather(*bulk, *interactive)
+    expect(
+        "queued interactive calls go before earlier bulk calls",
+        order[:3] == [f"interactive-{n}" for n in range(3)],
+        ", ".join(order),
+    )
+
+    governor = fresh("reserve", quota.MemoryQuotaStore())
+    reserve = int(governor.bulk_reserve)
+    granted = 0
+    for _ in range(int(governor.capacity)):
+        try:
+            await governor.acquire(quota.BULK, 0.0)
+            granted += 1
+        except ServiceError:
+            break
+    interactive_ok = True
+    try:
+        await governor.acquire(quota.INTERACTIVE, 0.0)
+    except ServiceError:
+        interactive_ok = False
+    expect(
+        "bulk calls leave the reserve to interactive calls",
+        granted == int(governor.capacity) - reserve and interactive_ok,
+        f"bulk got {granted} of {int(governor.capacity)} tokens (reserve {reserve})",
+    )
+
+    governor = fresh("deadline", quota.MemoryQuotaStore())
+    for _ in range(int(governor.capacity)):
+        await governor.acquire(quota.INTERACTIVE, 1.0)
+    try:
+        await governor.acquire(quota.INTERACTIVE, 0.01)
+        status = None
+    except ServiceError as exc:
+        status = exc.status_code
+    expect("a call past its deadline gets 503", status == 503, f"status {status}")
+
+    first = fresh("shared", quota.DatabaseQuotaStore())
+    second = quota.QuotaGovernor("shared", RATE)
+    capacity = int(first.capacity)
+    results = await asyncio.gather(
+        *(governor.acquire(quota.INTERACTIVE, 0.0) for governor in (first, second) for _ in range(capacity)),
+        return_exceptions=True,
+    )
+    granted = sum(not isinstance(result, Exception) for result in results)
+    expect(
+        "instances on the database store share one bucket",
+        capacity <= granted <= capacity + 1,
+        f"{granted} of {2 * capacity} immediate calls granted (capacity {capacity})",
+    )
+
+    class BrokenStore:
+        async def take(self, *args):
+            raise RuntimeError("store unavailable")
+
+    # The fail-open path logs the store error with a traceback; it is expected here.
+    logging.getLogger(quota.__name__).setLevel(logging.ERROR)
+    governor = fresh("broken", BrokenStore())
+    try:
+        await governor.acquire(quota.INTERACTIVE, 0.0)
+        passed = True
+    except ServiceError:
+        passed = False
+    expect("a failing store lets calls through", passed)
+
+    await shutdown_engine()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="quota-check-") as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(tmp) / 'quota.db'}"
+        os.environ["UPSTREAM_QUOTA_BURST_SECONDS"] = "1"
+        add_repo_to_sys_path()
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Verify the upstream circuit breaker, adaptive concurrency limit and summary cache.
+
+The breaker and limiter are first exercised directly, then group-creation searches
+(``fetch_restaurants_from_google``) run against ``upstream_simulator`` while its
+Gemini endpoint is made slow and healed again. The checks verify that:
+
+* the breaker opens on a failure rate or a run of failures, half-opens after ``CIRCUIT_OPEN_SECONDS`` and
+  closes after successful trials (or re-opens on a failed one),
+* the AIMD limit grows on success, backs off once per slowdown, and refuses calls
+  beyond it,
+* with Gemini slow, a search reuses cached summaries, skips the rest instead of
+  waiting for Gemini, and opens the Gemini circuit,
+* once Gemini is healthy again the circuit closes and summaries come back,
+* streamed summaries answered with HTTP 503 are counted as errors and open the
+  circuit too, although the caller raises before reading the body.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_upstream_resilience.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+OPEN_SECONDS = 0.5
+SLOW_CALL_SECONDS = 0.2
+CONSECUTIVE_FAILURES = 3
+# Short enough that the healthy phases stay quick, long enough to count as slow once degraded.
+HEALTHY_LATENCY = "fixed:5"
+DEGRADED_LATENCY = "fixed:2000"
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    from backend.observability import metrics
+    from backend.schemas.groups import SearchPreferences
+    from backend.schemas.restaurants import Review
+    from backend.services.exceptions import ServiceError
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import resilience, restaurants, upstream
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    now = [0.0]
+    breaker = resilience.CircuitBreaker("check", clock=lambda: now[0])
+    for ok in (True, False, False, True, False):
+        breaker.record(ok, breaker.admit())
+    opened = breaker.state == resilience.OPEN and not breaker.allows()
+    now[0] += OPEN_SECONDS
+    half_open = breaker.allows() and breaker.admit() and breaker.state == resilience.HALF_OPEN
+    breaker.record(False, True)
+    reopened = breaker.state == resilience.OPEN
+    now[0] += OPEN_SECONDS
+    trials = [breaker.admit() for _ in range(2)]
+    refused_third = not breaker.allows()
+    for trial in trials:
+        breaker.record(True, trial)
+    expect(
+        "breaker opens, half-opens, re-opens on a failed trial and closes after good ones",
+        opened and half_open and reopened and refused_third and breaker.state == resilience.CLOSED,
+    )
+    for _ in range(15):
+        breaker.record(True, breaker.admit())
+    for _ in range(CONSECUTIVE_FAILURES):
+        breaker.record(False, breaker.admit())
+    expect(
+        "a run of failures opens the breaker despite earlier successes",
+        breaker.state == resilience.OPEN,
+        f"{CONSECUTIVE_FAILURES} failures after 15 successes",
+    )
+
+    limiter = resilience.AdaptiveLimiter("check", clock=lambda: now[0])
+    initial = limiter.limit
+    admitted = sum(limiter.try_acquire() for _ in range(int(initial) + 5))
+    for _ in range(admitted):
+        limiter.on_success()
+    grown = limiter.limit
+    now[0] += 1
+    for _ in range(admitted):
+        limiter.on_failure(started=now[0] - 0.5)
+    after_slowdown = limiter.limit
+    expect(
+        "limiter refuses calls beyond the limit, grows on success and backs off once per slowdown",
+        admitted == int(initial) and grown > initial and after_slowdown == grown * 0.5,
+        f"limit {initial:.1f} -> {grown:.1f} -> {after_slowdown:.1f}, admitted {admitted}",
+    )
+
+    profiles = parse_profiles(latency=[f"all={HEALTHY_LATENCY}"])
+    upstream.transport = SimulatorTransport(app=create_app(profiles))
+    gemini = resilience.guard_for(upstream.GEMINI, SLOW_CALL_SECONDS)
+
+    async def search(lat: float) -> tuple:
+        started = time.perf_counter()
+        found = await restaurants.fetch_restaurants_from_google(SearchPreferences(latitude=lat, longitude=139.76))
+        return found, time.perf_counter() - started
+
+    found, _ = await search(35.68)
+    expect(
+        "healthy Gemini: every card has a summary",
+        all(restaurant.summary for restaurant in found),
+        f"{sum(bool(r.summary) for r in found)}/{len(found)}",
+    )
+
+    profiles["generate"].latency = parse_latency(DEGRADED_LATENCY)
+    found, elapsed = await search(35.68)
+    expect(
+        "slow Gemini: cached summaries are served without waiting for Gemini",
+        all(restaurant.summary for restaurant in found) and elapsed < 1.5,
+        f"{sum(bool(r.summary) for r in found)}/{len(found)} in {elapsed:.2f}s",
+    )
+    expect("slow Gemini: circuit opens", gemini.breaker.state == resilience.OPEN, gemini.breaker.state)
+    expect(
+        "slow Gemini: concurrency limit backs off",
+        gemini.limiter.limit < initial,
+        f"limit {gemini.limiter.limit:.1f}",
+    )
+
+    found, elapsed = await search(35.70)
+    expect(
+        "open circuit: uncached summaries are skipped at once",
+        not any(restaurant.summary for restaurant in found) and elapsed < 1.0,
+        f"{len(found)} cards without summary in {elapsed:.2f}s",
+    )
+
+    profiles["generate"].latency = parse_latency(HEALTHY_LATENCY)
+    await asyncio.sleep(OPEN_SECONDS)
+    # Places are enriched in parallel, so the half-open trials go out with the first search and the
+    # calls beyond them are refused; the search after it runs on a closed circuit.
+    await search(35.72)
+    found, _ = await search(35.74)
+    expect(
+        "recovered Gemini: circuit closes and summaries return",
+        gemini.breaker.state == resilience.CLOSED and all(restaurant.summary for restaurant in found),
+        f"{gemini.breaker.state}, {sum(bool(r.summary) for r in found)}/{len(found)}",
+    )
+
+    transitions = metrics.REGISTRY.get("upstream_circuit_transitions")
+    states = {values[1] for _, values, _, _ in transitions.samples() if values[0] == upstream.GEMINI}
+    expect(
+        "state changes are exported as metrics", states == {"open", "half_open", "closed"}, ", ".join(sorted(states))
+    )
+
+    errors = metrics.REGISTRY.get("upstream_request_errors")
+
+    def gemini_503s() -> float:
+        return sum(value for _, values, _, value in errors.samples() if values == (upstream.GEMINI, "http_503"))
+
+    profiles["generate"].error_rate = 1.0
+    before = gemini_503s()
+    reviews = [Review(author_name=f"check {n}", rating=4, text=f"Review {n} of the stream", time="") for n in range(5)]
+    statuses = []
+    for attempt in range(CONSECUTIVE_FAILURES):
+        try:
+            async for _ in restaurants.stream_summary(f"Streamed {attempt}", reviews):
+                pass
+        except ServiceError as exc:
+            statuses.append(exc.status_code)
+    expect(
+        "streamed 503s: counted as errors and open the circuit",
+        statuses == [503] * CONSECUTIVE_FAILURES
+        and gemini_503s() - before == CONSECUTIVE_FAILURES
+        and gemini.breaker.state == resilience.OPEN,
+        f"{statuses}, {gemini_503s() - before:.0f} recorded, {gemini.breaker.state}",
+    )
+    profiles["generate"].error_rate = 0.0
+
+    upstream.transport = None
+    await upstream.close_shared_client()
+    return 1 if failures else 0
+
+
+def main() -> None:
+    # The services read configuration on import; nothing here touches the database.
+    database = Path(tempfile.gettempdir()) / "resilience-check.db"
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{database}")
+    os.environ.update(
+        GOOGLE_API_KEY="resilience-check",
+        CIRCUIT_MIN_CALLS="5",
+        CIRCUIT_FAILURE_RATE="0.5",
+        CIRCUIT_CONSECUTIVE_FAILURES=str(CONSECUTIVE_FAILURES),
+        CIRCUIT_OPEN_SECONDS=str(OPEN_SECONDS),
+        CIRCUIT_HALF_OPEN_CALLS="2",
+        GEMINI_SLOW_CALL_SECONDS=str(SLOW_CALL_SECONDS),
+        # Every cached summary is immediately stale, so only the fallback path can serve it.
+        SUMMARY_CACHE_TTL_SECONDS="0",
+        # Groups are created at the same place over and over; each has to search and summarize.
+        PLACE_INDEX_FRESH_SECONDS="0",
+    )
+    add_repo_to_sys_path()
+    # Skipped summaries and circuit changes are logged; the checks report them instead.
+    logging.getLogger("backend").setLevel(logging.ERROR)
+    raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
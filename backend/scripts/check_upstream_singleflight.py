@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Verify that identical concurrent upstream calls are coalesced into one.
+
+``get_restaurant_details`` and ``fetch_restaurants_from_google`` run concurrently
+against ``upstream_simulator``, and the calls that reach it are counted from the
+``upstream_request_duration_seconds`` metric. The checks verify that:
+
+* concurrent callers asking for the same place share one Place Details call and
+  get the same result, and ``upstream_coalesced`` counts the ones that joined,
+* callers asking for different places are not coalesced,
+* identical concurrent searches share the nearby search of each place type and
+  the details calls,
+* a failure reaches every caller of the shared call,
+* a caller that is cancelled, or whose own deadline ends, leaves without
+  cancelling the call for the others,
+* the call is cancelled once every caller has left.
+
+Usage (from the repository root)::
+
+    python backend/scripts/check_upstream_singleflight.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CALLERS = 20
+LATENCY_MS = 100
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+async def run_checks() -> int:
+    from backend.observability import metrics
+    from backend.schemas.groups import SearchPreferences
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import deadline, resilience, restaurants, singleflight, upstream
+    from backend.services.exceptions import ServiceError
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def sent(name: str) -> float:
+        """Calls to ``name`` that reached the simulator and finished, successful or not."""
+        return sum(
+            value
+            for sample, values, _, value in metrics.REGISTRY.get("upstream_request_duration_seconds").samples()
+            if sample.endswith("_count") and values[0] == name
+        )
+
+    def coalesced(name: str) -> float:
+        return sum(value for _, values, _, value in singleflight.COALESCED.samples() if values[0] == name)
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    profiles["details"].latency = parse_latency(f"fixed:{LATENCY_MS}")
+    upstream.transport = SimulatorTransport(app=create_app(profiles))
+    details = upstream.PLACE_DETAILS
+    place_id = "sim:35.68000:139.76000:3"
+
+    before, joined = sent(details), coalesced(details)
+    results = await asyncio.gather(*(restaurants.get_restaurant_details(place_id) for _ in range(CALLERS)))
+    expect(
+        "concurrent callers for one place share one details call",
+        sent(details) - before == 1 and coalesced(details) - joined == CALLERS - 1,
+        f"{sent(details) - before:.0f} calls, {coalesced(details) - joined:.0f} coalesced for {CALLERS} callers",
+    )
+    expect(
+        "every caller gets the same result",
+        all(result == results[0] for result in results) and bool(results[0].reviews),
+    )
+
+    before = sent(details)
+    await asyncio.gather(*(restaurants.get_restaurant_details(f"sim:35.68000:139.76000:{i}") for i in range(5)))
+    expect("different places are not coalesced", sent(details) - before == 5, f"{sent(details) - before:.0f} calls")
+
+    nearby = upstream.NEARBY_SEARCH
+    before_nearby, before = sent(nearby), sent(details)
+    preferences = SearchPreferences(latitude=35.70, longitude=139.70)
+    searches = await asyncio.gather(*(restaurants.fetch_restaurants_from_google(preferences) for _ in range(3)))
+    expect(
+        "identical searches share the nearby search and details calls",
+        sent(nearby) - before_nearby == len(preferences.types)
+        and sent(details) - before == len(searches[0])
+        and all(len(found) == len(searches[0]) for found in searches),
+        f"{sent(nearby) - before_nearby:.0f} nearby and {sent(details) - before:.0f} details calls "
+        f"for 3 searches of {len(searches[0])} places",
+    )
+
+    profiles["details"].error_rate = 1.0
+    before = sent(details)
+    outcomes = await asyncio.gather(
+        *(restaurants.get_restaurant_details("sim:35.68000:139.76000:7") for _ in range(5)), return_exceptions=True
+    )
+    profiles["details"].error_rate = 0.0
+    expect(
+        "a failure reaches every caller",
+        sent(details) - before == 1 and all(isinstance(outcome, ServiceError) for outcome in outcomes),
+        f"{sent(details) - before:.0f} calls, outcomes {sorted({type(outcome).__name__ for outcome in outcomes})}",
+    )
+
+    async def impatient(seconds: float) -> None:
+        with deadline.budget(seconds):
+            await restaurants.get_restaurant_details("sim:35.68000:139.76000:8")
+
+    before = sent(details)
+    callers = [asyncio.create_task(restaurants.get_restaurant_details("sim:35.68000:139.76000:8")) for _ in range(4)]
+    await asyncio.sleep(0.01)
+    short = asyncio.create_task(impatient(LATENCY_MS / 1000 / 4))
+    await asyncio.sleep(0.01)
+    callers[0].cancel()
+    outcomes = await asyncio.gather(*callers, short, return_exceptions=True)
+    expect(
+        "cancelled and timed-out callers leave without cancelling the call",
+        isinstance(outcomes[0], asyncio.CancelledError)
+        and all(not isinstance(outcome, BaseException) for outcome in outcomes[1:4])
+        and isinstance(outcomes[4], ServiceError)
+        and outcomes[4].status_code == 504
+        and sent(details) - before == 1,
+        f"outcomes {[type(outcome).__name__ for outcome in outcomes]}, {sent(details) - before:.0f} calls",
+    )
+
+    limiter = resilience.guard_for(details, 0).limiter
+    before = sent(details)
+    callers = [asyncio.create_task(restaurants.get_restaurant_details("sim:35.68000:139.76000:9")) for _ in range(3)]
+    await asyncio.sleep(0.02)
+    inflight = limiter.inflight
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0.01)
+    expect(
+        "the call is cancelled when every caller has left",
+        inflight == 1 and limiter.inflight == 0 and not singleflight._flights and sent(details) - before == 0,
+        f"in flight {inflight} -> {limiter.inflight}",
+    )
+
+    await upstream.close_shared_client()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="singleflight-check-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'singleflight.db'}",
+            GOOGLE_API_KEY="singleflight-check",
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run_checks()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Load-test the full group lifecycle through the HTTP API against simulated upstreams.
+
+Organizers arrive at ``--arrival-rate`` groups per second (Poisson arrivals; 0
+starts them all at once) and at most ``--concurrency`` groups are in flight.
+For every group the organizer creates it with ``POST /api/groups``, then
+``--members`` members (the organizer included) join with
+``GET /api/groups/{id}?member_id=``, page through ``/candidates`` and vote on
+every card. The organizer polls the group until everybody has joined and voted,
+calls ``/finish``, and the members poll ``/results`` until they are ready.
+
+The app runs in-process behind ``httpx.ASGITransport`` and Google Places and
+Gemini are answered by ``upstream_simulator``, so nothing leaves the machine.
+The ``--upstream-*`` options inject latency, errors, timeouts and rate limits
+(see ``upstream_simulator`` for the syntax); use ``--max-failure-rate`` when
+some lifecycles are expected to fail.
+
+The report lists throughput and p50/p95/p99 per endpoint. Save it with
+``--output`` and pass it to ``--compare`` on another commit to see the change.
+
+Usage (from the repository root)::
+
+    python backend/scripts/loadtest.py --groups 50 --members 5 --concurrency 10
+    python backend/scripts/loadtest.py --upstream-latency details=lognormal:40:0.5 --output before.json
+    python backend/scripts/loadtest.py --compare before.json
+
+Without ``--database-url`` a temporary SQLite file is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+CREATE = "POST /api/groups"
+INFO = "GET /api/groups/{group_id}"
+CANDIDATES = "GET /api/groups/{group_id}/candidates"
+VOTE = "POST /api/groups/{group_id}/vote"
+FINISH = "POST /api/groups/{group_id}/finish"
+RESULTS = "GET /api/groups/{group_id}/results"
+ENDPOINTS = (CREATE, INFO, CANDIDATES, VOTE, FINISH, RESULTS)
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    from backend.scripts.upstream_simulator import add_fault_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="SQLAlchemy async URL of a disposable database")
+    parser.add_argument("--groups", type=int, default=20, help="number of group lifecycles")
+    parser.add_argument("--members", type=int, default=4, help="members per group, organizer included")
+    parser.add_argument("--concurrency", type=int, default=8, help="groups in flight at the same time")
+    parser.add_argument("--arrival-rate", type=float, default=0.0, help="new groups per second (0 = all at once)")
+    parser.add_argument("--page-size", type=int, default=10, help="candidates requested per page")
+    parser.add_argument("--like-ratio", type=float, default=0.4, help="share of swipes that are likes")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="seconds between status polls")
+    add_fault_arguments(parser, prefix="upstream-")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for arrivals, locations and swipes")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    parser.add_argument(
+        "--max-failure-rate", type=float, default=0.0, help="share of lifecycles allowed to fail (for fault runs)"
+    )
+    parser.add_argument("--verbose", action="store_true", help="show backend warnings (slow queries, N+1)")
+    return parser.parse_args()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    async def call(self, client, endpoint: str, method: str, url: str, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.latencies[endpoint].append(time.perf_counter() - started)
+            self.statuses[endpoint]["exception"] += 1
+            self.errors[endpoint] += 1
+            raise
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][str(response.status_code)] += 1
+        if response.status_code not in expected:
+            self.errors[endpoint] += 1
+            raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, object]:
+    import httpx
+
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_profiles
+    from backend.services import upstream
+
+    profiles = parse_profiles(
+        args.upstream_latency, args.upstream_error_rate, args.upstream_timeout_rate, args.upstream_rate_limit
+    )
+    simulator = create_app(profiles, seed=args.seed)
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    lifecycle_seconds: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def member_flow(client, group_id: str, member_id: str, voted: asyncio.Event, swipes: random.Random):
+        await recorder.call(client, INFO, "GET", f"/api/groups/{group_id}", params={"member_id": member_id})
+        while True:
+            page = await recorder.call(
+                client,
+                CANDIDATES,
+                "GET",
+                f"/api/groups/{group_id}/candidates",
+                params={"member_id": member_id, "start": 0, "limit": args.page_size},
+            )
+            cards = page.json()
+            if not cards:
+                break
+            for card in cards:
+                value = "like" if swipes.random() < args.like_ratio else "dislike"
+                await recorder.call(
+                    client,
+                    VOTE,
+                    "POST",
+                    f"/api/groups/{group_id}/vote",
+                    params={"member_id": member_id},
+                    json={"candidate_id": card["place_id"], "value": value},
+                )
+        voted.set()
+        while True:
+            response = await recorder.call(
+                client, RESULTS, "GET", f"/api/groups/{group_id}/results", expected=(200, 404)
+            )
+            if response.status_code == 200:
+                return
+            await asyncio.sleep(args.poll_interval)
+
+    async def lifecycle(client, index: int, lat: float, lng: float, swipe_seed: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            organizer = f"organizer-{index}"
+            created = await recorder.call(
+                client,
+                CREATE,
+                "POST",
+                "/api/groups",
+                params={"member_id": organizer},
+                json={"latitude": lat, "longitude": lng, "radius": 1000, "group_name": f"負荷試験 {index}"},
+            )
+            group_id = created.json()["group_id"]
+            members = [organizer, *(f"member-{index}-{n}" for n in range(1, args.members))]
+            voted = {member: asyncio.Event() for member in members}
+            swipes = random.Random(swipe_seed)
+            flows = [
+                asyncio.create_task(
+                    member_flow(client, group_id, member, voted[member], random.Random(swipes.random()))
+                )
+                for member in members
+            ]
+            try:
+                # The organizer sees joins through the group info; votes finishing is the out-of-band "we're done".
+                while True:
+                    info = await recorder.call(
+                        client, INFO, "GET", f"/api/groups/{group_id}", params={"member_id": organizer}
+                    )
+                    if len(info.json()["members"]) >= len(members) and all(event.is_set() for event in voted.values()):
+                        break
+                    if any(flow.done() and flow.exception() for flow in flows):
+                        break
+                    await asyncio.sleep(args.poll_interval)
+                await recorder.call(
+                    client, FINISH, "POST", f"/api/groups/{group_id}/finish", params={"member_id": organizer}
+                )
+                await asyncio.gather(*flows)
+            finally:
+                for flow in flows:
+                    flow.cancel()
+            lifecycle_seconds.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False, client=("127.0.0.1", 40000)),
+        base_url="http://loadtest",
+    ) as client:
+        tasks = []
+        started = time.perf_counter()
+        for index in range(args.groups):
+            if args.arrival_rate > 0 and index:
+                await asyncio.sleep(rng.expovariate(args.arrival_rate))
+            lat = 35.6 + rng.uniform(0, 0.2)
+            lng = 139.6 + rng.uniform(0, 0.2)
+            tasks.append(asyncio.create_task(lifecycle(client, index, lat, lng, rng.randrange(2**32))))
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    await app.router.shutdown()
+    upstream.transport = None
+
+    failures = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    for failure in failures[:5]:
+        print(f"lifecycle failed: {failure!r}", file=sys.stderr)
+
+    return {
+        "settings": {
+            key: getattr(args, key)
+            for key in (
+                "groups",
+                "members",
+                "concurrency",
+                "arrival_rate",
+                "page_size",
+                "upstream_latency",
+                "upstream_error_rate",
+                "upstream_timeout_rate",
+                "upstream_rate_limit",
+            )
+        },
+        "elapsed_seconds": elapsed,
+        "completed_lifecycles": len(lifecycle_seconds),
+        "failed_lifecycles": len(failures),
+        "lifecycle_p50_ms": percentile(lifecycle_seconds, 0.50) * 1000,
+        "lifecycle_p95_ms": percentile(lifecycle_seconds, 0.95) * 1000,
+        "upstream": {
+            f"{endpoint} {outcome}": count for (endpoint, outcome), count in sorted(simulator.state.stats.items())
+        },
+        "endpoints": {
+            endpoint: {
+                "count": len(recorder.latencies[endpoint]),
+                "errors": recorder.errors[endpoint],
+                "statuses": dict(recorder.statuses[endpoint]),
+                "p50_ms": percentile(recorder.latencies[endpoint], 0.50) * 1000,
+                "p95_ms": percentile(recorder.latencies[endpoint], 0.95) * 1000,
+                "p99_ms": percentile(recorder.latencies[endpoint], 0.99) * 1000,
+                "requests_per_second": len(recorder.latencies[endpoint]) / elapsed if elapsed else 0.0,
+            }
+            for endpoint in ENDPOINTS
+            if recorder.latencies[endpoint]
+        },
+    }
+
+
+def _change(current: float, baseline: float) -> str:
+    if not baseline:
+        return "n/a"
+    return f"{(current - baseline) / baseline:+.1%}"
+
+
+def print_report(result: Dict[str, object], baseline: Optional[Dict[str, object]]) -> None:
+    print(
+        f"{result['completed_lifecycles']} lifecycles in {result['elapsed_seconds']:.2f}s,"
+        f" {result['failed_lifecycles']} failed; lifecycle p50 {result['lifecycle_p50_ms']:.1f} ms,"
+        f" p95 {result['lifecycle_p95_ms']:.1f} ms"
+    )
+    print(f"{'endpoint':<40}{'count':>7}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        print(
+            f"{endpoint:<40}{stats['count']:>7}{stats['errors']:>7}{stats['requests_per_second']:>9.1f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+        )
+    if result["upstream"]:
+        print("upstream: " + ", ".join(f"{key} {count}" for key, count in result["upstream"].items()))
+    if baseline is None:
+        return
+
+    print(f"\ncompared with baseline ({baseline['completed_lifecycles']} lifecycles):")
+    print(f"{'endpoint':<40}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if before is None:
+            continue
+        print(
+            f"{endpoint:<40}{_change(stats['requests_per_second'], before['requests_per_second']):>9}"
+            f"{_change(stats['p50_ms'], before['p50_ms']):>9}{_change(stats['p95_ms'], before['p95_ms']):>9}"
+            f"{_change(stats['p99_ms'], before['p99_ms']):>9}"
+        )
+    if baseline.get("settings") != result["settings"]:
+        print("note: the baseline was recorded with different settings", file=sys.stderr)
+
+
+def main() -> None:
+    add_repo_to_sys_path()
+    args = parse_args()
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'loadtest.db'}"
+        # Only the simulator sees this key; it must be set for the backend to call the upstream APIs at all.
+        os.environ["GOOGLE_API_KEY"] = "loadtest"
+        if not args.verbose:
+            logging.getLogger("backend").setLevel(logging.ERROR)
+        result = asyncio.run(run_load(args))
+
+    print_report(result, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    failure_rate = result["failed_lifecycles"] / args.groups if args.groups else 0.0
+    raise SystemExit(1 if failure_rate > args.max_failure_rate else 0)
+
+
+if __name__ == "__main__":
+    main()
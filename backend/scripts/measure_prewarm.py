@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Measure how much warming hot areas before a meal peak lowers first-request latency.
+
+The backend runs in-process against a temporary SQLite database, with Google and
+Gemini answered by ``upstream_simulator`` at realistic latencies. A week of
+history is seeded around a peak ``PREWARM_LEAD_MINUTES`` from now, so the run
+does not depend on the time of day: groups within the hour after it around
+``--areas`` campuses (busier ones first), groups six hours later elsewhere, and a
+few scattered groups. Then, for each campus:
+
+* cold: the first group of the peak is created with empty caches, as without
+  warming,
+* warmed: the caches and the index of known places are emptied again, the warmer
+  runs for the peak as it would ``PREWARM_LEAD_MINUTES`` before it, and the same
+  first group is created.
+
+The report lists both creation times per campus. The run checks that the hot
+areas are the campuses (busiest first, later and scattered groups left out),
+that warming stayed within ``--budget`` upstream calls, that warmed first groups
+were created in less than half the cold time, that
+``prewarm_first_group_seconds`` recorded them, and when the next warming is due.
+
+Usage (from the repository root)::
+
+    python backend/scripts/measure_prewarm.py --areas 3 --budget 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+HISTORY_DAYS = 7
+LEAD_MINUTES = 15
+RADIUS = 1000
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--areas", type=int, default=3, help="campuses with groups around the peak in the history")
+    parser.add_argument("--budget", type=int, default=200, help="PREWARM_UPSTREAM_BUDGET for the run")
+    parser.add_argument("--nearby-latency", default="fixed:200", help="simulated nearby search latency spec, in ms")
+    parser.add_argument("--details-latency", default="fixed:100", help="simulated place details latency spec, in ms")
+    parser.add_argument("--gemini-latency", default="fixed:800", help="simulated Gemini latency spec, in ms")
+    return parser.parse_args()
+
+
+def campus(index: int) -> Dict[str, float]:
+    # In the middle of a cell, so the groups around it share the cell.
+    return {"latitude": 35.605 + index * 0.05, "longitude": 139.705}
+
+
+async def seed_history(peak: datetime, areas: int) -> None:
+    from backend.models import GroupModel
+    from backend.services.database import shard_session
+
+    origins = []
+    for day in range(1, HISTORY_DAYS + 1):
+        start = peak - timedelta(days=day)
+        # Campus i has areas - i groups during the peak every day; one more campus only has groups later.
+        for index in range(areas):
+            for number in range(areas - index):
+                origins.append((campus(index), start + timedelta(minutes=10 + number), 0.001 * number))
+        origins.append((campus(areas), start + timedelta(hours=6), 0.0))
+        # Scattered groups during the peak, one per cell.
+        origins.append(({"latitude": 34.0 + day * 0.1, "longitude": 135.0}, start + timedelta(minutes=30), 0.0))
+
+    async with shard_session(0) as session:
+        for number, (location, created_at, offset) in enumerate(origins):
+            session.add(
+                GroupModel(
+                    id=f"history{number:04d}",
+                    organizer_id="history",
+                    latitude=location["latitude"] + offset,
+                    longitude=location["longitude"] - offset,
+                    radius=RADIUS,
+                    min_price=0,
+                    max_price=4,
+                    types=["restaurant"],
+                    status="finished",
+                    created_at=created_at.astimezone(timezone.utc).replace(tzinfo=None),
+                )
+            )
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> int:
+    import httpx
+
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import background, prewarm, upstream
+    from backend.services.restaurants import details_cache, known_places, summary_cache
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    def upstream_calls() -> int:
+        return sum(count for (_, outcome), count in simulator.state.stats.items() if outcome == "ok")
+
+    def forget() -> None:
+        known_places.clear()
+        details_cache.clear()
+        summary_cache.clear()
+
+    profiles = parse_profiles()
+    profiles["nearby"].latency = parse_latency(args.nearby_latency)
+    profiles["details"].latency = parse_latency(args.details_latency)
+    profiles["generate"].latency = parse_latency(args.gemini_latency)
+    simulator = create_app(profiles)
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+    peak = (datetime.now(prewarm.LOCAL_TIME) + timedelta(minutes=LEAD_MINUTES)).replace(second=0, microsecond=0)
+    await seed_history(peak, args.areas)
+
+    areas = await prewarm.learn_hot_areas(peak.hour * 60 + peak.minute)
+    expected_cells = [prewarm.cell_of(**campus(index)) for index in range(args.areas)]
+    expect(
+        f"the hot areas of the {peak:%H:%M} peak are the campuses, busiest first",
+        [area.cell for area in areas] == expected_cells,
+        ", ".join(f"{area.cell} ({area.groups} groups)" for area in areas),
+    )
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://prewarm", timeout=30
+    ) as client:
+
+        async def first_group(location: Dict[str, float]) -> float:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/groups",
+                params={"member_id": "organizer"},
+                json={**location, "radius": RADIUS, "types": ["restaurant"]},
+            )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - started
+            await background.drain(60)
+            return elapsed
+
+        locations = [
+            {"latitude": area.preferences.latitude + 0.0005, "longitude": area.preferences.longitude}
+            for area in areas
+        ]
+        cold: List[float] = []
+        for location in locations:
+            forget()
+            cold.append(await first_group(location))
+
+        forget()
+        before = upstream_calls()
+        started = time.perf_counter()
+        warmed_areas, budgeted = await prewarm.warm_before(peak)
+        warming = time.perf_counter() - started
+        used = upstream_calls() - before
+        warmed = [await first_group(location) for location in locations]
+        await first_group({"latitude": 33.0, "longitude": 131.0})
+
+    print(f"{'area':<18} {'cold ms':>9} {'warmed ms':>10}")
+    for area, cold_seconds, warm_seconds in zip(areas, cold, warmed):
+        print(f"{str(area.cell):<18} {cold_seconds * 1000:>9.0f} {warm_seconds * 1000:>10.0f}")
+    improvement = 1 - statistics.median(warmed) / statistics.median(cold)
+    print(
+        f"first-request p50 {statistics.median(cold) * 1000:.0f} -> {statistics.median(warmed) * 1000:.0f} ms "
+        f"({improvement:.0%} lower); warming took {warming:.1f} s and {used} upstream calls"
+    )
+
+    expect(
+        f"warming stays within the budget of {args.budget} calls",
+        warmed_areas == len(areas) and used <= budgeted <= args.budget,
+        f"{warmed_areas} areas, {used} calls ({budgeted} budgeted)",
+    )
+    expect("warmed first groups take less than half the cold time", improvement > 0.5, f"{improvement:.0%} lower")
+    first_groups = {
+        values[0]: value
+        for name, values, _, value in prewarm.PREWARM_FIRST_GROUP.samples()
+        if name.endswith("_count")
+    }
+    expect(
+        "prewarm_first_group_seconds tells warmed and cold areas apart",
+        first_groups == {"warmed": len(areas), "cold": 1},
+        str(first_groups),
+    )
+
+    day = datetime(2025, 10, 27, tzinfo=prewarm.LOCAL_TIME)
+    schedule = [
+        prewarm.next_warming(day.replace(hour=hour, minute=minute))
+        for hour, minute in ((9, 0), (11, 15), (12, 0), (18, 30))
+    ]
+    expect(
+        "warming is scheduled PREWARM_LEAD_MINUTES before the next peak",
+        [(peak.day, peak.strftime("%H:%M"), warm_at.strftime("%H:%M")) for peak, warm_at in schedule]
+        == [(27, "11:30", "11:15"), (27, "18:00", "17:45"), (27, "18:00", "17:45"), (28, "11:30", "11:15")],
+    )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="prewarm-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'prewarm.db'}",
+            GOOGLE_API_KEY="prewarm-check",
+            NEARBY_SEARCH_MAX_PAGES="1",
+            DECK_MAX_EXTENSIONS="0",
+            # Only the warmer fills the index here; stored candidates would make the cold runs warm.
+            PLACE_INDEX_FRESH_SECONDS="1800",
+            PLACE_INDEX_REFRESH_SECONDS="3600",
+            PREWARM_PEAKS="11:30,18:00",
+            PREWARM_LEAD_MINUTES=str(LEAD_MINUTES),
+            PREWARM_UTC_OFFSET_HOURS="9",
+            PREWARM_HISTORY_DAYS=str(HISTORY_DAYS),
+            PREWARM_MIN_GROUPS="3",
+            PREWARM_UPSTREAM_BUDGET=str(args.budget),
+        )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Compare time to first byte of buffered and streamed Gemini summaries.
+
+The backend runs in-process against a temporary SQLite database, with Google and
+Gemini answered by ``upstream_simulator`` (Gemini taking ``--gemini-latency`` per
+summary). Through a transport that streams like a socket, each sample measures
+time to first byte and to the last byte of:
+
+* ``summarize``: ``POST /api/restaurants/summarize`` (detail format),
+* ``summarize_stream``: ``POST /api/restaurants/summarize/stream``,
+* ``detail``: ``GET /api/restaurants/{place_id}``, which includes the detail summary,
+* ``detail_stream``: ``GET /api/restaurants/{place_id}?summary=false`` followed by
+  ``GET /api/restaurants/{place_id}/summary/stream``; time to first byte is until
+  the first piece of the summary.
+
+Every sample uses a different restaurant so nothing comes from the summary cache.
+The run then checks that the streamed pieces add up to the ``done`` summary, that
+the finished stream was cached (the buffered endpoint returns it without calling
+Gemini), and that streaming cut time to first byte at least in half. With ``--tracing``
+the same runs with ``TRACING_ENABLED``, and the streamed Gemini calls must also be
+exported as spans without errors.
+
+Usage (from the repository root)::
+
+    python backend/scripts/measure_summary_ttfb.py --samples 5 --gemini-latency fixed:1500
+    python backend/scripts/measure_summary_ttfb.py --samples 1 --tracing
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5, help="restaurants per mode (at most 10, for the rate limits)")
+    parser.add_argument("--gemini-latency", default="fixed:1500", help="simulated Gemini latency spec, in ms")
+    parser.add_argument("--tracing", action="store_true", help="run with TRACING_ENABLED and check the exported spans")
+    return parser.parse_args()
+
+
+def parse_events(body: str) -> List[Tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields.get("data", "{}"))))
+    return events
+
+
+async def run(args: argparse.Namespace) -> int:
+    import httpx
+
+    from backend.main import app
+    from backend.scripts.upstream_simulator import SimulatorTransport, create_app, parse_latency, parse_profiles
+    from backend.services import upstream
+
+    failures = 0
+
+    def expect(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {label}{f': {detail}' if detail else ''}")
+
+    profiles = parse_profiles(latency=["all=fixed:5"])
+    profiles["generate"].latency = parse_latency(args.gemini_latency)
+    simulator = create_app(profiles)
+    upstream.transport = SimulatorTransport(app=simulator)
+    await app.router.startup()
+
+    timings: Dict[str, List[Tuple[float, float]]] = {}
+    streamed: List[Tuple[dict, str]] = []
+
+    async with httpx.AsyncClient(transport=SimulatorTransport(app=app), base_url="http://ttfb", timeout=30) as client:
+
+        async def timed(mode: str, method: str, url: str, **kwargs) -> str:
+            started = time.perf_counter()
+            first_byte = None
+            body = b""
+            async with client.stream(method, url, **kwargs) as response:
+                async for chunk in response.aiter_bytes():
+                    first_byte = first_byte or time.perf_counter() - started
+                    body += chunk
+            response.raise_for_status()
+            timings.setdefault(mode, []).append((first_byte or 0.0, time.perf_counter() - started))
+            return body.decode()
+
+        for index in range(args.samples):
+            place_id = f"sim:35.68000:139.76000:{index}"
+            details = json.loads(await timed("detail", "GET", f"/api/restaurants/{place_id}"))
+            reviews = details["reviews"]
+
+            request = {"restaurant_name": f"TTFB {index}", "reviews": reviews, "format": "detail"}
+            await timed("summarize", "POST", "/api/restaurants/summarize", json=request)
+            request = {"restaurant_name": f"TTFB stream {index}", "reviews": reviews, "format": "detail"}
+            body = await timed("summarize_stream", "POST", "/api/restaurants/summarize/stream", json=request)
+            streamed.append((request, body))
+
+            place_id = f"sim:35.68000:139.76000:{index + 100}"
+            started = time.perf_counter()
+            await client.get(f"/api/restaurants/{place_id}", params={"summary": "false"})
+            before = time.perf_counter() - started
+            await timed("detail_stream", "GET", f"/api/restaurants/{place_id}/summary/stream")
+            first_byte, total = timings["detail_stream"][-1]
+            timings["detail_stream"][-1] = (before + first_byte, before + total)
+
+        print(f"{'mode':<18} {'ttfb p50 ms':>12} {'total p50 ms':>13}")
+        for mode, values in timings.items():
+            first = statistics.median(value[0] for value in values) * 1000
+            total = statistics.median(value[1] for value in values) * 1000
+            print(f"{mode:<18} {first:>12.1f} {total:>13.1f}")
+
+        request, body = streamed[0]
+        events = parse_events(body)
+        deltas = "".join(data["text"] for name, data in events if name == "delta")
+        done = [data["summary"] for name, data in events if name == "done"]
+        expect(
+            "streamed pieces add up to the done summary",
+            bool(done) and deltas.strip() == done[0] and len(events) > 2,
+            f"{len(events) - 1} pieces",
+        )
+
+        generated = simulator.state.stats[("generate", "ok")]
+        response = await client.post("/api/restaurants/summarize", json=request)
+        expect(
+            "a finished stream is cached for the buffered endpoint",
+            response.status_code == 200
+            and response.json().get("summary") == (done[0] if done else None)
+            and simulator.state.stats[("generate", "ok")] == generated,
+            f"HTTP {response.status_code}, {simulator.state.stats[('generate', 'ok')] - generated} new Gemini calls",
+        )
+
+        for buffered, mode in (("summarize", "summarize_stream"), ("detail", "detail_stream")):
+            slow = statistics.median(value[0] for value in timings[buffered])
+            fast = statistics.median(value[0] for value in timings[mode])
+            expect(f"{mode} halves time to first byte", fast * 2 <= slow, f"{slow * 1000:.0f} -> {fast * 1000:.0f} ms")
+
+    if args.tracing:
+        from backend.observability import tracing
+
+        tracing.exporter.close()
+        with open(tracing.exporter.path, encoding="utf-8") as handle:
+            spans = [json.loads(line) for line in handle]
+        streams = [span for span in spans if span["name"] == "upstream.gemini" and span["attributes"].get("stream")]
+        expect(
+            "streamed Gemini calls are traced without errors",
+            len(streams) == 2 * args.samples and not any(span["error"] for span in streams),
+            f"{len(streams)} spans, errors {[span['error'] for span in streams if span['error']]}",
+        )
+
+    await app.router.shutdown()
+    upstream.transport = None
+    return 1 if failures else 0
+
+
+def main() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="ttfb-") as tmp:
+        os.environ.update(
+            DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'ttfb.db'}",
+            GOOGLE_API_KEY="ttfb-check",
+        )
+        if args.tracing:
+            os.environ.update(
+                TRACING_ENABLED="true",
+                TRACE_EXPORT_PATH=str(Path(tmp) / "traces.jsonl"),
+                TRACE_EXPORT_FORMAT="jsonl",
+            )
+        add_repo_to_sys_path()
+        logging.getLogger("backend").setLevel(logging.ERROR)
+        raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
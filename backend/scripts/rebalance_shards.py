@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Move groups between database shards, or report how groups are spread.
+
+The shards are read from ``DATABASE_URL`` and ``DATABASE_SHARD_URLS`` exactly as
+the API server does. A moved group keeps its id; shard 0's
+``group_shard_overrides`` table routes it to the new shard.
+
+Usage (from the repository root)::
+
+    python backend/scripts/rebalance_shards.py --report
+    python backend/scripts/rebalance_shards.py --group-id 1~AbCdEfGh --target 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def add_repo_to_sys_path() -> None:
+    """Ensure the repository root is importable."""
+    repo_path = str(REPO_ROOT)
+    if repo_path not in sys.path:
+        sys.path.insert(0, repo_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--report", action="store_true", help="print the number of groups on each shard")
+    parser.add_argument("--group-id", action="append", default=[], help="group to move; repeatable")
+    parser.add_argument("--target", type=int, help="destination shard index")
+    parser.add_argument(
+        "--grace-seconds",
+        type=float,
+        default=None,
+        help="wait before deleting source rows (default: twice SHARD_OVERRIDE_REFRESH_SECONDS)",
+    )
+    args = parser.parse_args()
+    if args.group_id and args.target is None:
+        parser.error("--group-id requires --target")
+    if not args.group_id and not args.report:
+        parser.error("nothing to do; pass --report or --group-id/--target")
+    return args
+
+
+async def run(args: argparse.Namespace) -> int:
+    from backend.services.database import init_models, shutdown_engine
+    from backend.services.exceptions import ServiceError
+    from backend.services.rebalance import count_groups_per_shard, move_group
+
+    await init_models(max_attempts=1)
+    exit_code = 0
+    for group_id in args.group_id:
+        try:
+            source = await move_group(group_id, args.target, args.grace_seconds)
+        except ServiceError as exc:
+            print(f"FAIL {group_id}: {exc.detail}", file=sys.stderr)
+            exit_code = 1
+            continue
+        if source == args.target:
+            print(f"skip {group_id}: already on shard {source}")
+        else:
+            print(f"  ok {group_id}: shard {source} -> shard {args.target}")
+
+    if args.report:
+        for entry in await count_groups_per_shard():
+            print(f"shard {entry['shard']}: {entry['groups']} groups")
+
+    await shutdown_engine()
+    return exit_code
+
+
+def main() -> None:
+    args = parse_args()
+    add_repo_to_sys_path()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
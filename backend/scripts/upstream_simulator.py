@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Google Places and Gemini APIs with latency and fault injection.
+
+The simulator answers the three calls the backend makes, matched on the URL
+path so it works behind any host name:
+
+* ``nearby``: ``.../place/nearbysearch/json``, places of ``type`` around ``location``
+  in pages of 20, up to three pages through ``next_page_token``. As with Google,
+  a token is refused with ``INVALID_REQUEST`` until ``--page-token-delay`` has
+  passed. Around every location there are 60 restaurants, every fifth of them
+  also a cafe, and 40 more cafes,
+* ``details``: ``.../place/details/json``, details with five reviews for a ``place_id``,
+* ``generate``: ``...:generateContent``, a short three-line summary, or
+  ``...:streamGenerateContent`` for the same summary as server-sent events in
+  ``STREAM_PIECES`` pieces, with the latency spread between them.
+
+Responses are synthetic and deterministic for the same request, or come from
+recorded fixtures in ``--fixtures DIR`` (``nearby.json`` is served for every
+search, ``details.json`` maps place ids to responses, ``generate.json`` is
+served for every prompt). Per endpoint (or ``all``) you can set:
+
+* ``--latency``: ``50`` / ``fixed:50``, ``uniform:20:80``, ``normal:50:10``,
+  ``lognormal:40:0.5`` (median and sigma) or ``exponential:30``, in ms,
+* ``--error-rate``: share answered with ``UNKNOWN_ERROR`` (Places) or HTTP 503 (Gemini),
+* ``--timeout-rate``: share that hangs for ``--hang-seconds`` so the client times out,
+* ``--rate-limit``: requests per second above which Places answers
+  ``OVER_QUERY_LIMIT`` and Gemini HTTP 429.
+
+Faults are drawn from a seeded random generator. ``GET /_simulator/stats``
+returns the outcome counts per endpoint.
+
+Run it as a server and point the backend at it::
+
+    python backend/scripts/upstream_simulator.py --port 8090 \\
+        --latency details=lognormal:40:0.5 --error-rate all=0.02 --rate-limit generate=5
+
+    GOOGLE_PLACES_API_URL=http://127.0.0.1:8090/maps/api/place/nearbysearch/json
+    GOOGLE_PLACE_DETAILS_URL=http://127.0.0.1:8090/maps/api/place/details/json
+    GEMINI_API_URL=http://127.0.0.1:8090/v1/models/gemini-2.5-flash-lite:generateContent
+
+or mount it in-process through ``backend.services.upstream.transport``::
+
+    upstream.transport = SimulatorTransport(create_app(profiles))
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+NEARBY = "nearby"
+DETAILS = "details"
+GENERATE = "generate"
+ENDPOINTS = (NEARBY, DETAILS, GENERATE)
+
+PLACES_PER_PAGE = 20
+MAX_PAGES = 3
+# Around every location, places 0-59 are restaurants (every fifth also a cafe) and 60-99 cafes.
+RESTAURANTS = 60
+CAFES = 40
+CAFE_EVERY = 5
+PAGE_TOKEN_DELAY_SECONDS = 2.0
+STREAM_PIECES = 8
+DISHES = ["焼肉", "ラーメン", "寿司", "カレー", "パスタ", "ハンバーグ", "天ぷら", "餃子", "定食", "ピザ"]
+MOODS = ["落ち着いた雰囲気", "活気のある店内", "コスパ抜群", "接客が丁寧", "ボリューム満点"]
+
+
+@dataclass
+class Latency:
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        elif self.kind == "exponential":
+            value = rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        else:
+            value = self.a
+        return max(0.0, value)
+
+
+LATENCY_ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+
+def parse_latency(spec: str) -> Latency:
+    kind, _, rest = spec.partition(":")
+    if not rest:
+        kind, rest = "fixed", spec
+    values = rest.split(":")
+    if kind not in LATENCY_ARITY or len(values) != LATENCY_ARITY[kind]:
+        raise ValueError(f"invalid latency {spec!r}; expected e.g. 50, uniform:20:80 or lognormal:40:0.5")
+    numbers = [float(value) for value in values]
+    return Latency(kind, *numbers)
+
+
+@dataclass
+class EndpointProfile:
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    rate_limit: float = 0.0
+
+
+def parse_profiles(
+    latency: Iterable[str] = (),
+    error_rate: Iterable[str] = (),
+    timeout_rate: Iterable[str] = (),
+    rate_limit: Iterable[str] = (),
+) -> Dict[str, EndpointProfile]:
+    """Build profiles from ``endpoint=value`` options; ``all=`` applies to every endpoint."""
+    profiles = {endpoint: EndpointProfile() for endpoint in ENDPOINTS}
+    options = (("latency", latency, parse_latency), ("error_rate", error_rate, float))
+    options += (("timeout_rate", timeout_rate, float), ("rate_limit", rate_limit, float))
+    for attribute, items, parse in options:
+        for item in items:
+            endpoint, separator, value = item.partition("=")
+            if not separator or endpoint not in (*ENDPOINTS, "all"):
+                raise ValueError(f"invalid option {item!r}; expected <{'|'.join(ENDPOINTS)}|all>=<value>")
+            for name in ENDPOINTS if endpoint == "all" else (endpoint,):
+                setattr(profiles[name], attribute, parse(value))
+    return profiles
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    for option, help_text in (
+        ("latency", "latency distribution in ms, e.g. details=lognormal:40:0.5"),
+        ("error-rate", "share of error responses, e.g. all=0.02"),
+        ("timeout-rate", "share of requests that hang until the client times out"),
+        ("rate-limit", "requests per second before rate-limit responses, e.g. generate=5"),
+    ):
+        parser.add_argument(
+            f"--{prefix}{option}", action="append", default=[], metavar="ENDPOINT=VALUE", help=help_text
+        )
+
+
+class TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _place_id(lat: float, lng: float, index: int) -> str:
+    return f"sim:{lat:.5f}:{lng:.5f}:{index}"
+
+
+def _parse_place_id(place_id: str) -> Optional[tuple]:
+    parts = place_id.split(":")
+    if len(parts) != 4 or parts[0] != "sim":
+        return None
+    try:
+        return float(parts[1]), float(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+def _place_location(lat: float, lng: float, index: int) -> Dict[str, float]:
+    rng = random.Random(f"{lat}:{lng}:{index}:location")
+    return {"lat": lat + rng.uniform(-0.005, 0.005), "lng": lng + rng.uniform(-0.005, 0.005)}
+
+
+def _place_summary(lat: float, lng: float, index: int) -> Dict[str, Any]:
+    rng = random.Random(f"{lat}:{lng}:{index}")
+    dish = rng.choice(DISHES)
+    return {
+        "place_id": _place_id(lat, lng, index),
+        "name": f"{dish}処 シミュ{index:02d}",
+        "vicinity": f"東京都千代田区丸の内{index + 1}-1",
+        "rating": round(rng.uniform(3.0, 4.8), 1),
+        "price_level": rng.randint(1, 4),
+        "user_ratings_total": rng.randint(10, 2000),
+        "geometry": {"location": _place_location(lat, lng, index)},
+        "types": [*_place_types(index), "food", "point_of_interest", "establishment"],
+        "photos": [{"photo_reference": f"simphoto-{index}-{n}"} for n in range(3)],
+    }
+
+
+def _place_types(index: int) -> List[str]:
+    types = []
+    if index < RESTAURANTS:
+        types.append("restaurant")
+    if index >= RESTAURANTS or index % CAFE_EVERY == 0:
+        types.append("cafe")
+    return types
+
+
+def _reviews(place_id: str) -> List[Dict[str, Any]]:
+    rng = random.Random(place_id + ":reviews")
+    return [
+        {
+            "author_name": f"レビュアー{n}",
+            "rating": rng.randint(2, 5),
+            "text": f"{rng.choice(DISHES)}が美味しかったです。{rng.choice(MOODS)}で、また来たいと思います。" * 3,
+            "relative_time_description": f"{rng.randint(1, 11)} か月前",
+        }
+        for n in range(5)
+    ]
+
+
+def nearby_search(params: Dict[str, str], page_token_delay: float = PAGE_TOKEN_DELAY_SECONDS) -> Dict[str, Any]:
+    invalid = {"status": "INVALID_REQUEST", "results": []}
+    page = 0
+    try:
+        if "pagetoken" in params:
+            _, lat_text, lng_text, place_type, page_text, issued = params["pagetoken"].split(":")
+            if time.time() < float(issued) + page_token_delay:
+                return invalid
+            page = int(page_text)
+        else:
+            lat_text, lng_text = params.get("location", "").split(",")
+            place_type = params.get("type", "")
+        lat, lng = float(lat_text), float(lng_text)
+    except ValueError:
+        return invalid
+
+    indices = [index for index in range(RESTAURANTS + CAFES) if not place_type or place_type in _place_types(index)]
+    indices = indices[: PLACES_PER_PAGE * MAX_PAGES]
+    page_indices = indices[page * PLACES_PER_PAGE : (page + 1) * PLACES_PER_PAGE]
+    results = [_place_summary(lat, lng, index) for index in page_indices]
+    if not results:
+        return {"status": "ZERO_RESULTS", "results": []}
+    response: Dict[str, Any] = {"status": "OK", "results": results}
+    if (page + 1) * PLACES_PER_PAGE < len(indices):
+        response["next_page_token"] = f"simpage:{lat_text}:{lng_text}:{place_type}:{page + 1}:{time.time():.3f}"
+    return response
+
+
+def place_details(params: Dict[str, str]) -> Dict[str, Any]:
+    place_id = params.get("place_id", "")
+    parsed = _parse_place_id(place_id)
+    if parsed is None:
+        return {"status": "NOT_FOUND"}
+    summary = _place_summary(*parsed)
+    return {
+        "status": "OK",
+        "result": {
+            "name": summary["name"],
+            "formatted_address": f"日本、〒100-0005 {summary['vicinity']}",
+            "rating": summary["rating"],
+            "price_level": summary["price_level"],
+            "user_ratings_total": summary["user_ratings_total"],
+            "geometry": summary["geometry"],
+            "types": summary["types"],
+            "photos": summary["photos"] + [{"photo_reference": f"simphoto-{parsed[2]}-detail"}],
+            "reviews": _reviews(place_id),
+            "formatted_phone_number": f"03-0000-{parsed[2]:04d}",
+            "website": f"https://example.com/{parsed[2]}",
+            "url": f"https://maps.google.com/?cid={zlib.crc32(place_id.encode())}",
+            "opening_hours": {"open_now": True, "weekday_text": ["月曜日: 11時00分～22時00分"]},
+        },
+    }
+
+
+def generate_content(payload: Dict[str, Any]) -> Dict[str, Any]:
+    prompt = ""
+    try:
+        prompt = payload["contents"][0]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        pass
+    rng = random.Random(prompt)
+    lines = [f"***{rng.choice(DISHES)}***が人気", f"{rng.choice(MOODS)}", "また行きたくなるお店だモグ"]
+    text = "\n".join(lines)
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+        "usageMetadata": usage_metadata(prompt, text),
+    }
+
+
+def usage_metadata(prompt: str, text: str) -> Dict[str, int]:
+    # One token per character is close enough for the mostly Japanese prompts.
+    return {"promptTokenCount": len(prompt), "candidatesTokenCount": len(text), "totalTokenCount": len(prompt + text)}
+
+
+async def stream_content(response: Dict[str, Any], delay_ms: float) -> AsyncIterator[str]:
+    """Serve a generateContent response as Gemini's ``alt=sse`` stream, one event per piece of its text.
+
+    Like Gemini, every event carries the usage so far, so the last one has the totals.
+    """
+    try:
+        text = response["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        await asyncio.sleep(delay_ms / 1000)
+        yield f"data: {json.dumps(response, ensure_ascii=False)}\r\n\r\n"
+        return
+    size = max(1, math.ceil(len(text) / STREAM_PIECES))
+    pieces = [text[start : start + size] for start in range(0, len(text), size)] or [""]
+    usage = response.get("usageMetadata", {})
+    sent = 0
+    for piece in pieces:
+        await asyncio.sleep(delay_ms / 1000 / len(pieces))
+        sent += len(piece)
+        chunk: Dict[str, Any] = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}}]}
+        if usage:
+            candidates = round(usage.get("candidatesTokenCount", 0) * sent / max(1, len(text)))
+            prompt_tokens = usage.get("promptTokenCount", 0)
+            chunk["usageMetadata"] = usage | {
+                "candidatesTokenCount": candidates,
+                "totalTokenCount": prompt_tokens + candidates,
+            }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n"
+
+
+def load_fixtures(directory: Optional[str]) -> Dict[str, Any]:
+    """Read recorded responses from ``nearby.json``, ``details.json`` and ``generate.json`` when present."""
+    fixtures: Dict[str, Any] = {}
+    if directory:
+        for endpoint in ENDPOINTS:
+            path = Path(directory) / f"{endpoint}.json"
+            if path.exists():
+                fixtures[endpoint] = json.loads(path.read_text(encoding="utf-8"))
+    return fixtures
+
+
+GEMINI_ERRORS = {"rate_limited": (429, "RESOURCE_EXHAUSTED"), "timeout": (504, "DEADLINE_EXCEEDED")}
+
+
+def _error_response(endpoint: str, kind: str) -> JSONResponse:
+    if endpoint == GENERATE:
+        status_code, status = GEMINI_ERRORS.get(kind, (503, "UNAVAILABLE"))
+        body = {"error": {"code": status_code, "status": status, "message": f"Simulated {kind}"}}
+        return JSONResponse(body, status_code=status_code)
+    if kind == "timeout":
+        return JSONResponse({"status": "UNKNOWN_ERROR", "error_message": "Simulated timeout"}, status_code=504)
+    # Places reports quota and transient failures in the body of an HTTP 200 response.
+    status = "OVER_QUERY_LIMIT" if kind == "rate_limited" else "UNKNOWN_ERROR"
+    return JSONResponse({"status": status, "error_message": f"Simulated {kind}", "results": []})
+
+
+def create_app(
+    profiles: Optional[Dict[str, EndpointProfile]] = None,
+    fixtures: Optional[Dict[str, Any]] = None,
+    seed: int = 0,
+    hang_seconds: float = 30.0,
+    page_token_delay: float = PAGE_TOKEN_DELAY_SECONDS,
+) -> Starlette:
+    profiles = {endpoint: EndpointProfile() for endpoint in ENDPOINTS} | (profiles or {})
+    fixtures = fixtures or {}
+    rng = random.Random(seed)
+    buckets = {name: TokenBucket(profile.rate_limit) for name, profile in profiles.items() if profile.rate_limit}
+    stats: Counter = Counter()
+
+    def respond(endpoint: str, request: Request, payload: Any) -> Dict[str, Any]:
+        params = dict(request.query_params)
+        if endpoint == NEARBY:
+            return fixtures[NEARBY] if NEARBY in fixtures else nearby_search(params, page_token_delay)
+        if endpoint == DETAILS:
+            recorded = fixtures.get(DETAILS, {}).get(params.get("place_id", ""))
+            return recorded if recorded is not None else place_details(params)
+        return fixtures[GENERATE] if GENERATE in fixtures else generate_content(payload)
+
+    async def handle(request: Request) -> Response:
+        path = request.url.path
+        streamed = False
+        if path.endswith("/place/nearbysearch/json"):
+            endpoint = NEARBY
+        elif path.endswith("/place/details/json"):
+            endpoint = DETAILS
+        elif path.endswith(":generateContent"):
+            endpoint = GENERATE
+        elif path.endswith(":streamGenerateContent"):
+            endpoint, streamed = GENERATE, True
+        else:
+            return JSONResponse({"error": {"code": 404, "message": f"No simulated API at {path}"}}, status_code=404)
+        payload = await request.json() if endpoint == GENERATE else None
+
+        profile = profiles[endpoint]
+        delay_ms = profile.latency.sample_ms(rng)
+        roll = rng.random()
+        if endpoint in buckets and not buckets[endpoint].take():
+            outcome = "rate_limited"
+        elif roll < profile.timeout_rate:
+            outcome, delay_ms = "timeout", hang_seconds * 1000
+        elif roll < profile.timeout_rate + profile.error_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        stats[(endpoint, outcome)] += 1
+
+        if streamed and outcome == "ok":
+            return StreamingResponse(
+                stream_content(respond(endpoint, request, payload), delay_ms), media_type="text/event-stream"
+            )
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if outcome != "ok":
+            return _error_response(endpoint, outcome)
+        return JSONResponse(respond(endpoint, request, payload))
+
+    async def stats_endpoint(request: Request) -> JSONResponse:
+        body: Dict[str, Dict[str, int]] = {endpoint: {} for endpoint in ENDPOINTS}
+        for (endpoint, outcome), count in stats.items():
+            body[endpoint][outcome] = count
+        return JSONResponse(body)
+
+    app = Starlette(
+        routes=[
+            Route("/_simulator/stats", stats_endpoint, methods=["GET"]),
+            Route("/{path:path}", handle, methods=["GET", "POST"]),
+        ]
+    )
+    app.state.stats = stats
+    return app
+
+
+class SimulatorTransport(httpx.AsyncBaseTransport):
+    """In-process transport for the simulator (or any ASGI app) that streams like a socket.
+
+    Unlike ``httpx.ASGITransport``, which returns only once the app has finished, the
+    response comes back as soon as the app sends its headers and the body is read as
+    the app writes it, so streamed responses and time to first byte behave as they
+    would over the network. The client's read timeout applies to the headers and to
+    each body chunk, so injected hangs raise ``ReadTimeout``.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = request.extensions.get("timeout", {}).get("read")
+        body = await request.aread()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(key.lower(), value) for key, value in request.headers.raw],
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "server": (request.url.host, request.url.port),
+            "client": ("127.0.0.1", 123),
+            "root_path": "",
+        }
+        start: asyncio.Future = asyncio.get_running_loop().create_future()
+        chunks: asyncio.Queue = asyncio.Queue()
+        closed = asyncio.Event()
+        received = False
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal received
+            if received:
+                await closed.wait()
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.set_result(message)
+            elif message["type"] == "http.response.body":
+                if message.get("body"):
+                    chunks.put_nowait(message["body"])
+                if not message.get("more_body", False):
+                    chunks.put_nowait(None)
+
+        async def run() -> None:
+            try:
+                await self.app(scope, receive, send)
+            except Exception as exc:
+                if not start.done():
+                    start.set_exception(exc)
+                chunks.put_nowait(exc)
+
+        task = asyncio.create_task(run())
+        stream = _ResponseStream(request, chunks, task, closed, timeout)
+        try:
+            message = await asyncio.wait_for(asyncio.shield(start), timeout)
+        except asyncio.TimeoutError:
+            await stream.aclose()
+            raise httpx.ReadTimeout("Simulated upstream timed out", request=request) from None
+        except BaseException:
+            await stream.aclose()
+            raise
+        return httpx.Response(message["status"], headers=message.get("headers", []), stream=stream)
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        request: httpx.Request,
+        chunks: asyncio.Queue,
+        task: asyncio.Task,
+        closed: asyncio.Event,
+        timeout: Optional[float],
+    ) -> None:
+        self._request = request
+        self._chunks = chunks
+        self._task = task
+        self._closed = closed
+        self._timeout = timeout
+        self._complete = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(self._chunks.get(), self._timeout)
+            except asyncio.TimeoutError:
+                raise httpx.ReadTimeout("Simulated upstream timed out", request=self._request) from None
+            if chunk is None:
+                self._complete = True
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    async def aclose(self) -> None:
+        self._closed.set()
+        if not self._complete:
+            # The caller stopped reading early, as a disconnecting client would.
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fixtures", help="directory with recorded nearby.json / details.json / generate.json")
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency and fault sampling")
+    parser.add_argument("--hang-seconds", type=float, default=30.0, help="how long injected timeouts hang")
+    parser.add_argument(
+        "--page-token-delay",
+        type=float,
+        default=PAGE_TOKEN_DELAY_SECONDS,
+        help="seconds before a next_page_token is accepted",
+    )
+    add_fault_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    import uvicorn
+
+    args = parse_args()
+    try:
+        profiles = parse_profiles(args.latency, args.error_rate, args.timeout_rate, args.rate_limit)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    app = create_app(profiles, load_fixtures(args.fixtures), args.seed, args.hang_seconds, args.page_token_delay)
+
+    base = f"http://{args.host}:{args.port}"
+    print("Point the backend at the simulator with:")
+    print(f"  GOOGLE_PLACES_API_URL={base}/maps/api/place/nearbysearch/json")
+    print(f"  GOOGLE_PLACE_DETAILS_URL={base}/maps/api/place/details/json")
+    print(f"  GEMINI_API_URL={base}/v1/models/gemini-2.5-flash-lite:generateContent")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
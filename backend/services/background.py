@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Set
+
+from backend.observability import metrics
+
+
+logger = logging.getLogger(__name__)
+
+_tasks: Set[asyncio.Task] = set()
+
+BACKGROUND_TASKS = metrics.gauge("background_tasks", "Background tasks still running after their request")
+BACKGROUND_FAILURES = metrics.counter("background_task_failures", "Background tasks that raised", ("name",))
+BACKGROUND_TASKS.labels().set_function(lambda: len(_tasks))
+
+
+def spawn(coro: Awaitable[None], name: str) -> asyncio.Task:
+    """Run ``coro`` without the caller awaiting it; failures are logged rather than raised.
+
+    The task starts from an empty context, so the request's deadline, query
+    accounting and trace do not follow it. It is referenced here until it finishes,
+    so it is not garbage-collected mid-flight, and ``drain`` waits for it on shutdown.
+    ``name`` labels the failure metric, so it should name the kind of work, not one item.
+    """
+    task = asyncio.create_task(_run(coro, name), name=name, context=contextvars.Context())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def _run(coro: Awaitable[None], name: str) -> None:
+    try:
+        await coro
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        BACKGROUND_FAILURES.labels(name).inc()
+        logger.exception("Background task %s failed", name)
+
+
+async def drain(timeout: float) -> None:
+    """Wait up to ``timeout`` seconds for background tasks, then cancel the ones left."""
+    if not _tasks:
+        return
+    _, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning("Cancelled %d background tasks on shutdown", len(pending))
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from backend.observability import metrics
+
+
+V = TypeVar("V")
+
+CACHE_REQUESTS = metrics.counter("cache_requests", "In-process cache lookups, by outcome", ("cache", "outcome"))
+
+
+class TTLCache(Generic[V]):
+    """In-process LRU cache whose entries are fresh for ``ttl`` seconds.
+
+    Expired entries are kept for ``stale_ttl`` more seconds and returned only when
+    the caller asks for them with ``allow_stale`` (e.g. because the upstream failed).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_entries: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+        stored_at, value = entry
+        age = self._clock() - stored_at
+        if age < self.ttl:
+            self._entries.move_to_end(key)
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return value
+        if age >= self.ttl + self.stale_ttl:
+            del self._entries[key]
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+        if not allow_stale:
+            CACHE_REQUESTS.labels(self.name, "expired").inc()
+            return None
+        CACHE_REQUESTS.labels(self.name, "stale").inc()
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
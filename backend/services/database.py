@@ -1,15 +1,207 @@
+import ast
 import asyncio
-from typing import AsyncGenerator
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncGenerator, AsyncIterator, Dict, List, Optional, Sequence
 
-from sqlalchemy.exc import OperationalError
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
-from backend.config import DATABASE_URL
-from backend.models import Base
+from backend.config import (
+    DATABASE_REPLICA_LAG_QUERY,
+    DATABASE_SHARD_REPLICA_URLS,
+    DATABASE_SHARD_URLS,
+    FAST_START,
+    READ_YOUR_WRITES_SECONDS,
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    REPLICA_LAG_CHECK_TIMEOUT_SECONDS,
+    REPLICA_MAX_LAG_SECONDS,
+)
+from backend.repository import shards as shard_repo
 
+from .pool import check_pool_capacity, create_engine
+from .sharding import ShardRouter
 
-engine = create_async_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI_PATH = Path(__file__).resolve().parents[1] / "alembic.ini"
+MIGRATION_VERSIONS_PATH = Path(__file__).resolve().parents[1] / "migrations" / "versions"
+BASELINE_REVISION = "0001_initial_schema"
+
+
+class ReplicaSet:
+    """Routes read-only sessions to replicas and everything else to the primary.
+
+    A replica is skipped while its measured lag exceeds ``REPLICA_MAX_LAG_SECONDS``,
+    and members who wrote within ``READ_YOUR_WRITES_SECONDS`` keep reading from the
+    primary so they always see their own votes.
+
+    Lag is measured off the request path by ``keep_replica_lag_fresh``; until a replica
+    has been measured its lag is ``inf`` and reads stay on the primary. The recent-writer
+    table lives in this process only: with several instances, a member whose next read
+    lands on another instance may read from a replica at most ``REPLICA_MAX_LAG_SECONDS``
+    behind, so keep that bound below the time a member takes to vote again.
+    """
+
+    def __init__(self, primary: AsyncEngine, replicas: Sequence[AsyncEngine]) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._primary_sessions = async_sessionmaker(primary, expire_on_commit=False)
+        self._primary_read_sessions = _read_sessionmaker(primary)
+        self._replica_sessions = [_read_sessionmaker(replica) for replica in self.replicas]
+        self._replica_lag: List[float] = [math.inf] * len(self.replicas)
+        self._round_robin = itertools.count()
+        self._recent_writers: Dict[str, float] = {}
+
+    def mark_write(self, member_id: Optional[str]) -> None:
+        if not member_id or not self.replicas:
+            return
+        now = time.monotonic()
+        self._recent_writers[member_id] = now + READ_YOUR_WRITES_SECONDS
+        if len(self._recent_writers) > 10_000:
+            self._recent_writers = {key: until for key, until in self._recent_writers.items() if until > now}
+
+    def is_sticky(self, member_id: Optional[str]) -> bool:
+        if not member_id:
+            return False
+        until = self._recent_writers.get(member_id)
+        return until is not None and until > time.monotonic()
+
+    async def session_factory(self, readonly: bool, member_id: Optional[str]) -> async_sessionmaker:
+        if not readonly:
+            return self._primary_sessions
+        if not self.replicas or self.is_sticky(member_id):
+            return self._primary_read_sessions
+
+        healthy = [index for index, lag in enumerate(self._replica_lag) if lag <= REPLICA_MAX_LAG_SECONDS]
+        if not healthy:
+            return self._primary_read_sessions
+        return self._replica_sessions[healthy[next(self._round_robin) % len(healthy)]]
+
+    async def refresh_lag(self) -> None:
+        self._replica_lag = list(await asyncio.gather(*(_measure_with_timeout(replica) for replica in self.replicas)))
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.dispose()
+        await self.primary.dispose()
+
+
+def _read_sessionmaker(bind: AsyncEngine) -> async_sessionmaker:
+    # The readonly execution option lets dialect hooks (SQLite's BEGIN mode) tell reads from writes.
+    return async_sessionmaker(bind.execution_options(readonly=True), expire_on_commit=False)
+
+
+async def measure_replica_lag(replica: AsyncEngine) -> float:
+    """Seconds the replica is behind its source; ``inf`` when it cannot be determined."""
+    try:
+        async with replica.execution_options(readonly=True).connect() as conn:
+            if DATABASE_REPLICA_LAG_QUERY:
+                lag = (await conn.execute(text(DATABASE_REPLICA_LAG_QUERY))).scalar()
+                return float(lag) if lag is not None else math.inf
+            if conn.dialect.name != "mysql":
+                return 0.0
+            row = (await conn.exec_driver_sql("SHOW REPLICA STATUS")).mappings().first()
+            if row is None:
+                return 0.0
+            lag = row.get("Seconds_Behind_Source")
+            return float(lag) if lag is not None else math.inf
+    except Exception:
+        return math.inf
+
+
+async def _measure_with_timeout(replica: AsyncEngine) -> float:
+    measurement = asyncio.ensure_future(measure_replica_lag(replica))
+    done, _ = await asyncio.wait({measurement}, timeout=REPLICA_LAG_CHECK_TIMEOUT_SECONDS)
+    if measurement in done:
+        return measurement.result()
+    # Not awaited: closing the connection can queue behind the hung query, and wait_for would wait for that too.
+    measurement.cancel()
+    return math.inf
+
+
+async def refresh_replica_lag() -> None:
+    """Measure the lag of every replica once; a replica that does not answer in time counts as ``inf``."""
+    await asyncio.gather(*(replica_set.refresh_lag() for replica_set in shards if replica_set.replicas))
+
+
+async def keep_replica_lag_fresh() -> None:
+    """Re-measure replica lag every ``REPLICA_LAG_CHECK_INTERVAL_SECONDS`` until cancelled."""
+    if not any(replica_set.replicas for replica_set in shards):
+        return
+    while True:
+        try:
+            await refresh_replica_lag()
+        except Exception:
+            logger.exception("Measuring replica lag failed")
+        await asyncio.sleep(REPLICA_LAG_CHECK_INTERVAL_SECONDS)
+
+
+def _engine_label(shard: int, role: str) -> str:
+    # A single-shard deployment keeps the plain "primary"/"replica-N" metric labels.
+    return role if len(DATABASE_SHARD_URLS) == 1 else f"shard{shard}-{role}"
+
+
+shards: List[ReplicaSet] = [
+    ReplicaSet(
+        create_engine(url, _engine_label(shard, "primary")),
+        [
+            create_engine(replica_url, _engine_label(shard, f"replica-{index}"))
+            for index, replica_url in enumerate(DATABASE_SHARD_REPLICA_URLS[shard])
+        ],
+    )
+    for shard, url in enumerate(DATABASE_SHARD_URLS)
+]
+
+# Shard 0 also holds the group_shard_overrides directory.
+engine = shards[0].primary
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+_directory_sessions = _read_sessionmaker(engine)
+
+
+async def load_shard_overrides() -> Dict[str, int]:
+    async with _directory_sessions() as session:
+        return await shard_repo.fetch_overrides(session)
+
+
+router = ShardRouter(len(shards), load_shard_overrides)
+
+
+@asynccontextmanager
+async def shard_session(
+    shard: int, readonly: bool = False, member_id: Optional[str] = None
+) -> AsyncIterator[AsyncSession]:
+    factory = await shards[shard].session_factory(readonly, member_id)
+    async with factory() as session:
+        yield session
+
+
+@asynccontextmanager
+async def group_session(
+    group_id: str, readonly: bool = False, member_id: Optional[str] = None
+) -> AsyncIterator[AsyncSession]:
+    shard = await router.shard_for(group_id)
+    async with shard_session(shard, readonly, member_id) as session:
+        yield session
+
+
+def mark_member_write(group_id: str, member_id: Optional[str]) -> None:
+    shards[router.lookup(group_id)].mark_write(member_id)
+
+
+def check_pool_sizing() -> None:
+    for shard, replica_set in enumerate(shards):
+        check_pool_capacity(replica_set.primary, _engine_label(shard, "primary"))
+        for index, replica in enumerate(replica_set.replicas):
+            check_pool_capacity(replica, _engine_label(shard, f"replica-{index}"))
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -26,8 +218,9 @@ async def init_models(max_attempts: int = 5, delay_seconds: float = 2.0) -> None
     attempt = 0
     while True:
         try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+            for replica_set in shards:
+                async with replica_set.primary.begin() as conn:
+                    await conn.run_sync(_upgrade_schema)
             return
         except OperationalError as exc:
             attempt += 1
@@ -36,5 +229,63 @@ async def init_models(max_attempts: int = 5, delay_seconds: float = 2.0) -> None
             await asyncio.sleep(delay_seconds * attempt)
 
 
+@lru_cache(maxsize=1)
+def head_revision() -> Optional[str]:
+    """Read the head revision from the migration files without importing alembic.
+
+    Returns None when it cannot be determined (e.g. a merge revision), so callers
+    fall back to running the migrations.
+    """
+    parents: Dict[str, Optional[str]] = {}
+    for path in MIGRATION_VERSIONS_PATH.glob("*.py"):
+        values: Dict[str, object] = {}
+        for node in ast.parse(path.read_text(encoding="utf-8")).body:
+            if isinstance(node, ast.AnnAssign):
+                target = node.target
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+            else:
+                continue
+            if isinstance(target, ast.Name) and isinstance(node.value, ast.Constant):
+                values[target.id] = node.value.value
+        if isinstance(values.get("revision"), str):
+            parents[values["revision"]] = values.get("down_revision")
+    heads = set(parents) - set(parents.values())
+    return heads.pop() if len(heads) == 1 else None
+
+
+def _schema_is_current(connection: Connection) -> bool:
+    head = head_revision()
+    if head is None:
+        return False
+    try:
+        stored = connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all()
+    except DBAPIError:
+        return False
+    return stored == [head]
+
+
+def _upgrade_schema(connection: Connection) -> None:
+    # One SELECT instead of alembic's import, catalog inspection and migration walk.
+    if FAST_START and _schema_is_current(connection):
+        logger.info("Schema is at %s; skipping migrations", head_revision())
+        return
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI_PATH))
+    config.attributes["connection"] = connection
+
+    # Databases created by the old create_all() bootstrap have the baseline tables but no
+    # alembic_version row yet; stamp them so only the later revisions are applied.
+    table_names = set(inspect(connection).get_table_names())
+    if "groups" in table_names and "alembic_version" not in table_names:
+        command.stamp(config, BASELINE_REVISION)
+
+    command.upgrade(config, "head")
+
+
 async def shutdown_engine() -> None:
-    await engine.dispose()
+    for replica_set in shards:
+        await replica_set.dispose()
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .exceptions import ServiceError
+
+
+# Absolute time.monotonic() by which the current request must be answered; None means no limit.
+current: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def budget(seconds: float) -> Iterator[None]:
+    """Give the code in the block ``seconds`` at most, or less if an outer budget ends sooner."""
+    deadline = time.monotonic() + seconds
+    outer = current.get()
+    token = current.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+@contextmanager
+def detached(seconds: float) -> Iterator[None]:
+    """Give the block its own budget regardless of the request's, for work that may outlive it.
+
+    Tasks created inside the block keep this budget after the block exits.
+    """
+    token = current.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def remaining(reserve: float = 0.0) -> Optional[float]:
+    """Seconds left in the budget after setting ``reserve`` aside (never negative), or None without one."""
+    deadline = current.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic() - reserve)
+
+
+def timeout(default: float) -> float:
+    """``default`` capped to what is left of the budget."""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def check(action: str) -> None:
+    if remaining() == 0.0:
+        raise ServiceError(504, f"Request deadline exceeded before {action}")
@@ -1,10 +1,25 @@
+import asyncio
+import logging
 import secrets
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from urllib.parse import quote
 
 from sqlalchemy.exc import IntegrityError
 
-from backend.config import FRONTEND_BASE_URL
+from backend.config import (
+    DECK_EXTENSION_REMAINING,
+    DECK_EXTENSION_SIZE,
+    DECK_MAX_EXTENSIONS,
+    FRONTEND_BASE_URL,
+    GOOGLE_API_KEY,
+    PLACE_INDEX_FRESH_SECONDS,
+    PLACE_INDEX_REFRESH_SECONDS,
+    PLACE_INDEX_STALE_SECONDS,
+)
+from backend.observability import llm
+from backend.observability.tracing import traced
 from backend.repository import groups as group_repo
 from backend.schemas.groups import (
     CandidateResult,
@@ -19,18 +34,84 @@ from backend.schemas.restaurants import Restaurant, Review
 
 from backend.models import GroupModel, GroupRestaurantModel
 
+from . import background, prewarm, quota
 from . import restaurants as restaurant_service
-from .database import AsyncSessionLocal
+from .database import group_session, mark_member_write, router, shard_session
 from .exceptions import ServiceError
 
 
+logger = logging.getLogger(__name__)
+
+# Groups whose deck this instance is adding candidates to.
+_growing_decks: Set[str] = set()
+# Highest group_restaurants id added to the index of known places, per shard.
+_known_places_loaded: Dict[int, int] = {}
+KNOWN_PLACES_BATCH = 1000
+
+# Candidate columns filled in by the details and summary calls, which may finish after the group is stored.
+ENRICHED_COLUMNS = (
+    "photo_url",
+    "photo_urls",
+    "reviews",
+    "phone_number",
+    "website",
+    "google_maps_url",
+    "user_ratings_total",
+    "summary",
+)
+
+
+@traced
 async def create_group(group_request: GroupCreateRequest, member_id: str) -> GroupCreateResponse:
+    started = perf_counter()
     preferences = _create_preferences_from_request(group_request)
-    restaurants = await restaurant_service.fetch_restaurants_from_google(preferences)
+    pending: Dict[str, "asyncio.Task[Restaurant]"] = {}
+    backlog = restaurant_service.SearchBacklog()
+    try:
+        # Late enrichments started in here keep adding to ``usage`` after the block.
+        with llm.record_usage() as usage:
+            restaurants = await restaurant_service.fetch_restaurants_from_google(preferences, pending, backlog)
+        group_id = await _insert_group(group_request, preferences, member_id, restaurants)
+    except BaseException:
+        # Nobody will store the late details of a group that was not created.
+        for task in pending.values():
+            task.cancel()
+        raise
+
+    mark_member_write(group_id, member_id)
+    prewarm.observe_group_creation(preferences.latitude, preferences.longitude, perf_counter() - started)
+    logger.info(
+        "Created group %s with %d candidates (%d still enriching): %s",
+        group_id,
+        len(restaurants),
+        len(pending),
+        usage.describe(),
+    )
+    if pending:
+        background.spawn(_store_late_enrichments(group_id, pending, usage), "late_enrichment")
+    if backlog:
+        background.spawn(_append_candidates(group_id, backlog), "more_candidates")
+
+    base_url = FRONTEND_BASE_URL.rstrip("/")
+    invite_url = f"{base_url}/group/{group_id}"
+    organizer_join_url = f"{invite_url}?memberId={quote(member_id)}"
+
+    return GroupCreateResponse(
+        group_id=group_id,
+        invite_url=invite_url,
+        organizer_id=member_id,
+        organizer_join_url=organizer_join_url,
+        group_name=group_request.group_name,
+    )
+
 
-    async with AsyncSessionLocal() as session:
+async def _insert_group(
+    group_request: GroupCreateRequest, preferences: SearchPreferences, member_id: str, restaurants: List[Restaurant]
+) -> str:
+    shard = router.pick_shard()
+    async with shard_session(shard) as session:
         try:
-            group_id = await _generate_unique_group_id(session)
+            group_id = await _generate_unique_group_id(session, shard)
             group = GroupModel(
                 id=group_id,
                 group_name=group_request.group_name,
@@ -57,30 +138,136 @@ async def create_group(group_request: GroupCreateRequest, member_id: str) -> Gro
         except Exception as exc:
             await session.rollback()
             raise ServiceError(500, "Failed to create group") from exc
+    return group_id
+
+
+async def _store_late_enrichments(
+    group_id: str, pending: Dict[str, "asyncio.Task[Restaurant]"], usage: llm.Usage
+) -> None:
+    """Wait for candidates that missed the creation deadline and write their details and summaries."""
+    await asyncio.wait(pending.values())
+    logger.info("Late enrichment of group %s finished; creation total: %s", group_id, usage.describe())
+    updates: Dict[str, Dict[str, Any]] = {}
+    for place_id, task in pending.items():
+        if task.cancelled():
+            continue
+        if task.exception() is not None:
+            logger.warning("Late enrichment of %s failed", place_id, exc_info=task.exception())
+            continue
+        model = _build_restaurant_models(group_id, [task.result()])[0]
+        updates[place_id] = {column: getattr(model, column) for column in ENRICHED_COLUMNS}
+    if not updates:
+        return
+    async with group_session(group_id) as session:
+        await group_repo.update_restaurants(session, group_id, updates)
+        await session.commit()
+    logger.info("Stored late details for %d of %d candidates of group %s", len(updates), len(pending), group_id)
+
+
+async def _append_candidates(group_id: str, backlog: restaurant_service.SearchBacklog) -> None:
+    """Add the rest of the group's search to the end of its deck, a batch at a time, as bulk work."""
+    added = 0
+    _growing_decks.add(group_id)
+    try:
+        with quota.priority(quota.BULK):
+            async for restaurants in restaurant_service.fetch_more_restaurants(backlog):
+                added += await _append_to_deck(group_id, restaurants)
+    finally:
+        _growing_decks.discard(group_id)
+    logger.info("Added %d more candidates to group %s", added, group_id)
+
+
+def _extend_deck_soon(group: GroupModel) -> None:
+    if (
+        not GOOGLE_API_KEY
+        or group.status != "voting"
+        or group.deck_extensions >= DECK_MAX_EXTENSIONS
+        or group.id in _growing_decks
+    ):
+        return
+    _growing_decks.add(group.id)
+    preferences = _preferences_from_group_model(group)
+    background.spawn(_extend_deck(group.id, preferences, group.deck_extensions), "deck_extension")
+
+
+async def _extend_deck(group_id: str, preferences: SearchPreferences, extensions: int) -> None:
+    """Search the next ring of cells around the group and append what is new, unless another instance is at it."""
+    try:
+        async with group_session(group_id) as session:
+            if not await group_repo.claim_deck_extension(session, group_id, extensions):
+                return
+            seen, _ = await group_repo.fetch_deck_tail(session, group_id)
+            await session.commit()
+        with quota.priority(quota.BULK):
+            restaurants = await restaurant_service.fetch_extension(
+                preferences, extensions + 1, seen, DECK_EXTENSION_SIZE
+            )
+        added = await _append_to_deck(group_id, restaurants)
+        logger.info("Extended the deck of group %s by %d candidates (extension %d)", group_id, added, extensions + 1)
+    finally:
+        _growing_decks.discard(group_id)
 
-    base_url = FRONTEND_BASE_URL.rstrip("/")
-    invite_url = f"{base_url}/group/{group_id}"
-    organizer_join_url = f"{invite_url}?memberId={quote(member_id)}"
 
-    return GroupCreateResponse(
-        group_id=group_id,
-        invite_url=invite_url,
-        organizer_id=member_id,
-        organizer_join_url=organizer_join_url,
-        group_name=group_request.group_name,
-    )
+async def _append_to_deck(group_id: str, restaurants: List[Restaurant]) -> int:
+    async with group_session(group_id) as session:
+        seen, position = await group_repo.fetch_deck_tail(session, group_id, for_update=True)
+        fresh = [restaurant for restaurant in restaurants if restaurant.place_id not in seen]
+        await group_repo.append_restaurants(session, _build_restaurant_models(group_id, fresh, position))
+        await session.commit()
+    return len(fresh)
 
 
+async def keep_known_places_fresh() -> None:
+    """Refresh the index of known places every ``PLACE_INDEX_REFRESH_SECONDS`` until cancelled."""
+    if not restaurant_service.KNOWN_PLACES_ENABLED:
+        return
+    while True:
+        try:
+            loaded = await refresh_known_places()
+        except Exception:
+            logger.exception("Refreshing known places failed")
+        else:
+            if loaded:
+                known = len(restaurant_service.known_places)
+                logger.info("Indexed %d stored candidates; %d known places", loaded, known)
+        await asyncio.sleep(PLACE_INDEX_REFRESH_SECONDS)
+
+
+async def refresh_known_places() -> int:
+    """Index the candidates stored on every shard since the last refresh and drop places too old to be used."""
+    max_age = max(PLACE_INDEX_FRESH_SECONDS, PLACE_INDEX_STALE_SECONDS)
+    # created_at is stored as naive UTC.
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=max_age)
+    loaded = 0
+    for shard in range(router.shard_count):
+        while True:
+            async with shard_session(shard, readonly=True) as session:
+                rows = await group_repo.fetch_known_places(
+                    session, _known_places_loaded.get(shard, 0), since, KNOWN_PLACES_BATCH
+                )
+                await session.commit()
+            # A candidate counts as seen when its group was created, which is when the search ran.
+            restaurant_service.known_places.add_all(
+                (_restaurant_from_model(model), created_at.replace(tzinfo=timezone.utc).timestamp())
+                for model, created_at in rows
+            )
+            loaded += len(rows)
+            if rows:
+                _known_places_loaded[shard] = rows[-1][0].id
+            if len(rows) < KNOWN_PLACES_BATCH:
+                break
+    restaurant_service.known_places.prune(max_age)
+    return loaded
+
+
+@traced
 async def get_group_info(group_id: str, member_id: Optional[str]) -> GroupInfoResponse:
-    async with AsyncSessionLocal() as session:
+    async with group_session(group_id, readonly=True, member_id=member_id) as session:
         try:
             group = await group_repo.fetch_group(session, group_id)
             if not group:
                 raise ServiceError(404, "Group not found")
 
-            if member_id:
-                await group_repo.ensure_member(session, group_id, member_id)
-
             members = await group_repo.fetch_member_ids(session, group_id)
 
             preferences = _preferences_from_group_model(group)
@@ -92,6 +279,10 @@ async def get_group_info(group_id: str, member_id: Optional[str]) -> GroupInfoRe
             await session.rollback()
             raise ServiceError(500, "Failed to get group information") from exc
 
+    if member_id and member_id not in members:
+        await _join_group(group_id, member_id)
+        members = sorted([*members, member_id])
+
     return GroupInfoResponse(
         group_id=group.id,
         status=group.status,
@@ -103,33 +294,29 @@ async def get_group_info(group_id: str, member_id: Optional[str]) -> GroupInfoRe
     )
 
 
+@traced
 async def list_group_candidates(
     group_id: str,
     member_id: Optional[str],
     start: int,
     limit: int,
 ) -> List[Restaurant]:
-    async with AsyncSessionLocal() as session:
+    needs_join = False
+    async with group_session(group_id, readonly=True, member_id=member_id) as session:
         try:
             group = await group_repo.fetch_group(session, group_id)
             if not group:
                 raise ServiceError(404, "Group not found")
 
-            voted_place_ids: set[str] = set()
             if member_id:
-                await group_repo.ensure_member(session, group_id, member_id)
-                voted_place_ids = set(await group_repo.fetch_member_vote_place_ids(session, group_id, member_id))
-
-            restaurant_rows = await group_repo.fetch_restaurants(session, group_id)
-
-            restaurants = [_restaurant_from_model(row) for row in restaurant_rows]
-            if voted_place_ids:
-                restaurants = [
-                    restaurant for restaurant in restaurants if restaurant.place_id not in voted_place_ids
-                ]
+                needs_join = not await group_repo.member_exists(session, group_id, member_id)
 
-            slice_end = start + limit
-            response = restaurants[start:slice_end]
+            # Votes imply membership, so filtering by member_id is correct before the join too. Reading one
+            # row past DECK_EXTENSION_REMAINING tells how much of the deck is left, whatever the page size.
+            restaurant_rows = await group_repo.fetch_unvoted_restaurants(
+                session, group_id, member_id, start, max(limit, DECK_EXTENSION_REMAINING + 1)
+            )
+            response = [_restaurant_from_model(row) for row in restaurant_rows[:limit]]
 
             await session.commit()
         except ServiceError:
@@ -139,29 +326,30 @@ async def list_group_candidates(
             await session.rollback()
             raise ServiceError(500, "Failed to get group candidates") from exc
 
+    if needs_join:
+        await _join_group(group_id, member_id)
+    if member_id and len(restaurant_rows) <= DECK_EXTENSION_REMAINING:
+        _extend_deck_soon(group)
+
     return response
 
 
+@traced
 async def submit_vote(group_id: str, member_id: str, vote_request: VoteRequest) -> None:
-    async with AsyncSessionLocal() as session:
+    async with group_session(group_id) as session:
         try:
-            group = await group_repo.fetch_group(session, group_id)
-            if not group:
+            context = await group_repo.fetch_vote_context(session, group_id, member_id, vote_request.candidate_id)
+            if context is None:
                 raise ServiceError(404, "Group not found")
-            if group.status != "voting":
+            status, candidate_exists, is_member = context
+            if status != "voting":
                 raise ServiceError(400, "Group is not accepting votes")
-
-            await group_repo.ensure_member(session, group_id, member_id)
-
-            if not await group_repo.candidate_exists(session, group_id, vote_request.candidate_id):
+            if not candidate_exists:
                 raise ServiceError(404, "Candidate not found")
 
-            existing_vote = await group_repo.get_vote(session, group_id, member_id, vote_request.candidate_id)
-
-            if existing_vote:
-                existing_vote.value = vote_request.value
-            else:
-                await group_repo.create_vote(session, group_id, member_id, vote_request.candidate_id, vote_request.value)
+            if not is_member:
+                await group_repo.ensure_member(session, group_id, member_id)
+            await group_repo.upsert_vote(session, group_id, member_id, vote_request.candidate_id, vote_request.value)
 
             await session.commit()
         except ServiceError:
@@ -171,9 +359,12 @@ async def submit_vote(group_id: str, member_id: str, vote_request: VoteRequest)
             await session.rollback()
             raise ServiceError(500, "Failed to submit vote") from exc
 
+    mark_member_write(group_id, member_id)
+
 
+@traced
 async def finish_group(group_id: str, member_id: str) -> GroupResultsResponse:
-    async with AsyncSessionLocal() as session:
+    async with group_session(group_id) as session:
         try:
             group = await group_repo.fetch_group(session, group_id)
             if not group:
@@ -193,7 +384,8 @@ async def finish_group(group_id: str, member_id: str) -> GroupResultsResponse:
             await session.rollback()
             raise ServiceError(500, "Failed to finish group") from exc
 
-    results = await _calculate_group_results(group_id)
+    mark_member_write(group_id, member_id)
+    results = await _calculate_group_results(group_id, member_id)
 
     return GroupResultsResponse(
         group_id=group_id,
@@ -202,8 +394,9 @@ async def finish_group(group_id: str, member_id: str) -> GroupResultsResponse:
     )
 
 
+@traced
 async def get_group_results(group_id: str) -> GroupResultsResponse:
-    async with AsyncSessionLocal() as session:
+    async with group_session(group_id, readonly=True) as session:
         try:
             group = await group_repo.fetch_group(session, group_id)
             if not group:
@@ -227,8 +420,9 @@ async def get_group_results(group_id: str) -> GroupResultsResponse:
     )
 
 
-async def _calculate_group_results(group_id: str) -> List[CandidateResult]:
-    async with AsyncSessionLocal() as session:
+@traced
+async def _calculate_group_results(group_id: str, member_id: Optional[str] = None) -> List[CandidateResult]:
+    async with group_session(group_id, readonly=True, member_id=member_id) as session:
         try:
             restaurant_rows = await group_repo.fetch_restaurants(session, group_id)
 
@@ -237,54 +431,7 @@ async def _calculate_group_results(group_id: str) -> List[CandidateResult]:
             }
 
             vote_rows = await group_repo.fetch_votes(session, group_id)
-
-            counts: Dict[str, Dict[str, int]] = {}
-            for place_id, value in vote_rows:
-                if place_id not in restaurant_map:
-                    continue
-                place_counts = counts.setdefault(place_id, {"like": 0, "dislike": 0})
-                if value == "like":
-                    place_counts["like"] += 1
-                elif value == "dislike":
-                    place_counts["dislike"] += 1
-
-            results: List[CandidateResult] = []
-            for place_id, restaurant in restaurant_map.items():
-                place_counts = counts.get(place_id, {"like": 0, "dislike": 0})
-                likes = place_counts["like"]
-                dislikes = place_counts["dislike"]
-                if likes == 0 and dislikes == 0:
-                    continue
-
-                score = likes - dislikes
-                results.append(
-                    CandidateResult(
-                        restaurant=restaurant,
-                        score=float(score),
-                        likes=likes,
-                        dislikes=dislikes,
-                    )
-                )
-
-            if not results:
-                for restaurant in list(restaurant_map.values())[:5]:
-                    results.append(
-                        CandidateResult(
-                            restaurant=restaurant,
-                            score=0.0,
-                            likes=0,
-                            dislikes=0,
-                        )
-                    )
-
-            results.sort(
-                key=lambda item: (
-                    item.score,
-                    item.likes,
-                    item.restaurant.rating or 0.0,
-                ),
-                reverse=True,
-            )
+            results = _rank_results(restaurant_map, vote_rows)
 
             await session.commit()
         except Exception as exc:
@@ -294,15 +441,30 @@ async def _calculate_group_results(group_id: str) -> List[CandidateResult]:
     return results
 
 
+@traced
+async def _join_group(group_id: str, member_id: str) -> None:
+    async with group_session(group_id) as session:
+        try:
+            await group_repo.ensure_member(session, group_id, member_id)
+            await session.commit()
+        except Exception as exc:
+            await session.rollback()
+            raise ServiceError(500, "Failed to join group") from exc
+
+    mark_member_write(group_id, member_id)
+
+
 def _create_preferences_from_request(group_request: GroupCreateRequest) -> SearchPreferences:
     data = group_request.model_dump(exclude={"group_name"})
     return SearchPreferences(**data)
 
 
-async def _generate_unique_group_id(session) -> str:
+@traced
+async def _generate_unique_group_id(session, shard: int) -> str:
     while True:
-        candidate = secrets.token_urlsafe(6)
-        if not await group_repo.group_exists(session, candidate):
+        candidate = router.encode(shard, secrets.token_urlsafe(6))
+        # An id whose group was rebalanced elsewhere stays routed there, so it cannot be reused.
+        if router.lookup(candidate) == shard and not await group_repo.group_exists(session, candidate):
             return candidate
 
 
@@ -343,9 +505,11 @@ def _restaurant_from_model(model: GroupRestaurantModel) -> Restaurant:
     )
 
 
-def _build_restaurant_models(group_id: str, restaurants: List[Restaurant]) -> List[GroupRestaurantModel]:
+def _build_restaurant_models(
+    group_id: str, restaurants: List[Restaurant], first_position: int = 0
+) -> List[GroupRestaurantModel]:
     models: List[GroupRestaurantModel] = []
-    for index, restaurant in enumerate(restaurants):
+    for index, restaurant in enumerate(restaurants, first_position):
         review_payload = None
         if restaurant.reviews:
             review_payload = [review.model_dump(mode="python") for review in restaurant.reviews]
@@ -374,3 +538,56 @@ def _build_restaurant_models(group_id: str, restaurants: List[Restaurant]) -> Li
             )
         )
     return models
+
+
+def _rank_results(
+    restaurant_map: Dict[str, Restaurant], vote_rows: Iterable[Tuple[str, str]]
+) -> List[CandidateResult]:
+    counts: Dict[str, Dict[str, int]] = {}
+    for place_id, value in vote_rows:
+        if place_id not in restaurant_map:
+            continue
+        place_counts = counts.setdefault(place_id, {"like": 0, "dislike": 0})
+        if value == "like":
+            place_counts["like"] += 1
+        elif value == "dislike":
+            place_counts["dislike"] += 1
+
+    results: List[CandidateResult] = []
+    for place_id, restaurant in restaurant_map.items():
+        place_counts = counts.get(place_id, {"like": 0, "dislike": 0})
+        likes = place_counts["like"]
+        dislikes = place_counts["dislike"]
+        if likes == 0 and dislikes == 0:
+            continue
+
+        score = likes - dislikes
+        results.append(
+            CandidateResult(
+                restaurant=restaurant,
+                score=float(score),
+                likes=likes,
+                dislikes=dislikes,
+            )
+        )
+
+    if not results:
+        for restaurant in list(restaurant_map.values())[:5]:
+            results.append(
+                CandidateResult(
+                    restaurant=restaurant,
+                    score=0.0,
+                    likes=0,
+                    dislikes=0,
+                )
+            )
+
+    results.sort(
+        key=lambda item: (
+            item.score,
+            item.likes,
+            item.restaurant.rating or 0.0,
+        ),
+        reverse=True,
+    )
+    return results
@@ -0,0 +1,135 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from backend.config import (
+    HEDGE_MAX_RATIO,
+    HEDGE_MIN_DELAY_MS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGE_WINDOW,
+)
+from backend.observability import metrics
+
+
+T = TypeVar("T")
+
+# Hedge tokens a quiet upstream can save up, so a burst after a lull is not hedged wholesale.
+MAX_SAVED_HEDGES = 10.0
+# The percentile is re-sorted after this many new samples rather than on every call.
+RECOMPUTE_EVERY = 16
+
+HEDGES = metrics.counter(
+    "upstream_hedges",
+    "Hedged calls: sent, won (the hedge answered first), lost, or skipped for lack of hedge budget",
+    ("upstream", "outcome"),
+)
+HEDGE_DELAY = metrics.gauge("upstream_hedge_delay_seconds", "Wait before a call is hedged", ("upstream",))
+
+
+class LatencyTracker:
+    """Recent successful-call latencies of one upstream and the hedge delay derived from them."""
+
+    def __init__(self, name: str) -> None:
+        self._samples: Deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self._since_recompute = 0
+        self._delay: Optional[float] = None
+        HEDGE_DELAY.labels(name).set_function(lambda: self._delay or 0.0)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_recompute += 1
+        if self._since_recompute >= RECOMPUTE_EVERY and len(self._samples) >= HEDGE_MIN_SAMPLES:
+            ordered = sorted(self._samples)
+            index = min(len(ordered) - 1, int(HEDGE_PERCENTILE * len(ordered)))
+            self._delay = max(HEDGE_MIN_DELAY_MS / 1000, ordered[index])
+            self._since_recompute = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough calls have been seen."""
+        return self._delay
+
+
+class HedgeBudget:
+    """Every eligible call earns ``HEDGE_MAX_RATIO`` of a hedge; sending one costs a whole one."""
+
+    def __init__(self) -> None:
+        self._tokens = 0.0
+
+    def earn(self) -> None:
+        self._tokens = min(MAX_SAVED_HEDGES, self._tokens + HEDGE_MAX_RATIO)
+
+    def spend(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_budgets: Dict[str, HedgeBudget] = {}
+
+
+def tracker(upstream: str) -> LatencyTracker:
+    found = _trackers.get(upstream)
+    if found is None:
+        found = _trackers[upstream] = LatencyTracker(upstream)
+    return found
+
+
+def observe(upstream: str, seconds: float) -> None:
+    tracker(upstream).observe(seconds)
+
+
+async def hedged(
+    upstream: str, attempt: Callable[[bool], Awaitable[T]], accept: Callable[[T], bool] = lambda _: True
+) -> T:
+    """Run ``attempt(False)``; if it is still running after the hedge delay, race ``attempt(True)`` against it.
+
+    The first attempt to return a result that ``accept`` takes wins and the other is
+    cancelled. If one fails or returns a rejected result, the other is still awaited;
+    when neither is accepted, the first rejected result is returned, and the first
+    failure is raised only when both fail.
+    """
+    budget = _budgets.setdefault(upstream, HedgeBudget())
+    budget.earn()
+    primary = asyncio.ensure_future(attempt(False))
+    delay = tracker(upstream).delay()
+    if delay is None:
+        return await primary
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        return primary.result()
+    if not budget.spend():
+        HEDGES.labels(upstream, "skipped").inc()
+        return await primary
+
+    HEDGES.labels(upstream, "sent").inc()
+    hedge = asyncio.ensure_future(attempt(True))
+    attempts = [primary, hedge]
+    try:
+        errors = []
+        rejected = []
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=attempts.index):
+                error = task.exception()
+                if error is not None:
+                    errors.append(error)
+                elif accept(task.result()):
+                    HEDGES.labels(upstream, "won" if task is hedge else "lost").inc()
+                    return task.result()
+                else:
+                    rejected.append(task.result())
+        if rejected:
+            return rejected[0]
+        raise errors[0]
+    finally:
+        for task in attempts:
+            task.cancel()
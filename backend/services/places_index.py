@@ -0,0 +1,145 @@
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.observability import metrics
+from backend.schemas.restaurants import Restaurant
+
+
+PLACE_INDEX_ENTRIES = metrics.gauge("place_index_entries", "Known places held by the in-process spatial index")
+PLACE_INDEX_ANSWERS = metrics.counter(
+    "place_index_answers", "Nearby searches answered from known places instead of Google, by reason", ("reason",)
+)
+
+# Metres per degree of latitude; a degree of longitude shrinks with cos(latitude).
+METRES_PER_DEGREE = 111_320.0
+EARTH_RADIUS_METRES = 6_371_000.0
+PRICE_LEVELS = (0, 4)
+
+
+class PlaceIndex:
+    """Grid of known places for radius, price and type queries without calling Google.
+
+    Places are bucketed into cells of ``cell_degrees`` by their location; a query
+    only looks at the cells its circle overlaps. Each place keeps the wall-clock
+    time it was last seen in a search, and queries skip places older than their
+    ``max_age``.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01, clock: Callable[[], float] = time.time) -> None:
+        self.cell_degrees = cell_degrees
+        self._clock = clock
+        self._columns = round(360.0 / cell_degrees)
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, Restaurant]]] = {}
+        self._locations: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def add(self, restaurant: Restaurant, seen_at: Optional[float] = None) -> None:
+        """Index ``restaurant`` as seen at ``seen_at`` (now by default); older sightings do not replace newer ones."""
+        seen_at = self._clock() if seen_at is None else seen_at
+        place_id = restaurant.place_id
+        cell = self._cell(restaurant.lat, restaurant.lng)
+        previous = self._locations.get(place_id)
+        if previous is not None:
+            previous_seen_at, _ = self._cells[previous][place_id]
+            if previous_seen_at > seen_at:
+                return
+            if previous != cell:
+                self._discard(place_id)
+        self._cells.setdefault(cell, {})[place_id] = (seen_at, restaurant)
+        self._locations[place_id] = cell
+        PLACE_INDEX_ENTRIES.set(len(self._locations))
+
+    def add_all(self, sightings: Iterable[Tuple[Restaurant, float]]) -> None:
+        for restaurant, seen_at in sightings:
+            self.add(restaurant, seen_at)
+
+    def prune(self, max_age: float) -> int:
+        """Drop places not seen for ``max_age`` seconds; returns how many were dropped."""
+        oldest = self._clock() - max_age
+        stale = [
+            place_id
+            for places in self._cells.values()
+            for place_id, (seen_at, _) in places.items()
+            if seen_at < oldest
+        ]
+        for place_id in stale:
+            self._discard(place_id)
+        PLACE_INDEX_ENTRIES.set(len(self._locations))
+        return len(stale)
+
+    def query(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        types: Optional[Iterable[str]] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        max_age: float = math.inf,
+    ) -> List[Restaurant]:
+        """Places within ``radius`` metres seen in the last ``max_age`` seconds, best rated first.
+
+        Like the nearby search, ``types`` matches places with any of them and the
+        price range applies only when both ends are given. Places without a price
+        level match only the full range.
+        """
+        wanted = set(types or ())
+        price_range = None
+        if min_price is not None and max_price is not None and (min_price, max_price) != PRICE_LEVELS:
+            price_range = (min_price, max_price)
+        oldest = self._clock() - max_age
+        lat_span = radius / METRES_PER_DEGREE
+        lng_span = radius / (METRES_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        first_row, first_column = self._cell(lat - lat_span, lng - lng_span)
+        last_row, last_column = self._cell(lat + lat_span, lng + lng_span)
+        if last_column < first_column:
+            last_column += self._columns
+        columns = min(last_column - first_column + 1, self._columns)
+
+        matches: List[Restaurant] = []
+        for row in range(first_row, last_row + 1):
+            for offset in range(columns):
+                places = self._cells.get((row, (first_column + offset) % self._columns))
+                if not places:
+                    continue
+                for seen_at, restaurant in places.values():
+                    if seen_at < oldest:
+                        continue
+                    if wanted and wanted.isdisjoint(restaurant.types or ()):
+                        continue
+                    if price_range is not None and (
+                        restaurant.price_level is None
+                        or not price_range[0] <= restaurant.price_level <= price_range[1]
+                    ):
+                        continue
+                    if _distance(lat, lng, restaurant.lat, restaurant.lng) <= radius:
+                        matches.append(restaurant)
+        matches.sort(key=lambda restaurant: (-(restaurant.rating or 0.0), -(restaurant.user_ratings_total or 0)))
+        return matches
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._locations.clear()
+        PLACE_INDEX_ENTRIES.set(0)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor((lng + 180.0) / self.cell_degrees) % self._columns
+
+    def _discard(self, place_id: str) -> None:
+        cell = self._locations.pop(place_id)
+        places = self._cells[cell]
+        del places[place_id]
+        if not places:
+            del self._cells[cell]
+
+
+def _distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_lat = (phi2 - phi1) / 2
+    half_lng = math.radians(lng2 - lng1) / 2
+    a = math.sin(half_lat) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_lng) ** 2
+    return 2 * EARTH_RADIUS_METRES * math.asin(min(1.0, math.sqrt(a)))
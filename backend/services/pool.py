@@ -0,0 +1,231 @@
+import json
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from backend.config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_PRE_PING_IDLE_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    SERVER_CONCURRENCY,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KIB,
+    SQLITE_MMAP_SIZE_BYTES,
+    SQLITE_SYNCHRONOUS,
+)
+from backend.observability import metrics
+from backend.observability.queries import record_statement
+
+
+logger = logging.getLogger(__name__)
+
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including connects",
+    ("engine",),
+)
+POOL_CONNECTION_HOLD = metrics.histogram(
+    "db_pool_connection_hold_seconds",
+    "Time a connection stayed checked out before being returned",
+    ("engine",),
+)
+POOL_IN_USE = metrics.gauge("db_pool_connections_in_use", "Connections currently checked out", ("engine",))
+POOL_OVERFLOW = metrics.gauge("db_pool_overflow", "Connections open beyond pool_size", ("engine",))
+POOL_SIZE = metrics.gauge("db_pool_size", "Configured pool_size", ("engine",))
+POOL_OPEN = metrics.gauge("db_pool_connections_open", "DBAPI connections currently open", ("engine",))
+POOL_CONNECTIONS_OPENED = metrics.counter("db_pool_connections_opened", "New DBAPI connections", ("engine",))
+POOL_OVERFLOW_EVENTS = metrics.counter(
+    "db_pool_overflow_connections_opened", "Connections opened beyond pool_size", ("engine",)
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "db_pool_checkout_timeouts", "Checkouts that gave up after pool_timeout", ("engine",)
+)
+POOL_PINGS = metrics.counter("db_pool_pre_pings", "Liveness pings issued on checkout", ("engine", "result"))
+POOL_INVALIDATIONS = metrics.counter("db_pool_invalidations", "Connections invalidated by the pool", ("engine",))
+DB_STATEMENT_DURATION = metrics.histogram(
+    "db_statement_duration_seconds", "Time spent executing a SQL statement", ("engine",)
+)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait to obtain a connection."""
+
+    metrics_label = "primary"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+def _json_serializer(value: Any) -> str:
+    # Store JSON columns identically on MySQL and SQLite: UTF-8 text rather than ASCII escapes.
+    return json.dumps(value, ensure_ascii=False)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": False, "json_serializer": _json_serializer}
+    database = make_url(url).database
+    if url.startswith("sqlite") and database in (None, "", ":memory:"):
+        # Every connection to an in-memory database would see its own empty copy.
+        options["poolclass"] = StaticPool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING == "always",
+    )
+    return options
+
+
+def create_engine(url: str, label: str) -> AsyncEngine:
+    engine = create_async_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine)
+    instrument_pool(engine, label)
+    instrument_statements(engine, label)
+    return engine
+
+
+def configure_sqlite(engine: AsyncEngine) -> None:
+    """Apply WAL pragmas and take the write lock up front for read-write transactions.
+
+    pysqlite would otherwise start transactions lazily, and a transaction that reads
+    before it writes fails with SQLITE_BUSY instead of waiting when another writer
+    committed in between. Sessions opened with ``readonly=True`` keep a deferred BEGIN
+    so readers never block each other.
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_BYTES}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _on_begin(conn) -> None:
+        if conn.get_execution_options().get("readonly"):
+            conn.exec_driver_sql("BEGIN")
+        else:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def instrument_pool(engine: AsyncEngine, label: str) -> None:
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    size = None
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        size = pool.size()
+        pool.metrics_label = label
+        POOL_SIZE.labels(label).set(size)
+        POOL_OVERFLOW.labels(label).set_function(lambda: max(pool.overflow(), 0))
+    POOL_IN_USE.labels(label).set_function(pool.checkedout)
+    open_connections = POOL_OPEN.labels(label)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        open_connections.inc()
+        POOL_CONNECTIONS_OPENED.labels(label).inc()
+        if size is not None and open_connections.get() > size:
+            POOL_OVERFLOW_EVENTS.labels(label).inc()
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record) -> None:
+        open_connections.dec()
+
+    @event.listens_for(pool, "close_detached")
+    def _on_close_detached(dbapi_connection) -> None:
+        open_connections.dec()
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        now = time.monotonic()
+        last_checkin = connection_record.info.get("last_checkin")
+        if (
+            DB_POOL_PRE_PING == "idle"
+            and last_checkin is not None
+            and now - last_checkin > DB_POOL_PRE_PING_IDLE_SECONDS
+        ):
+            try:
+                sync_engine.dialect.do_ping(dbapi_connection)
+            except Exception as exc:
+                POOL_PINGS.labels(label, "failed").inc()
+                # The pool discards this connection and retries the checkout with a fresh one.
+                raise DisconnectionError() from exc
+            POOL_PINGS.labels(label, "ok").inc()
+        connection_record.info["checked_out_at"] = now
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        now = time.monotonic()
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            POOL_CONNECTION_HOLD.labels(label).observe(now - checked_out_at)
+        connection_record.info["last_checkin"] = now
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        POOL_INVALIDATIONS.labels(label).inc()
+
+
+def instrument_statements(engine: AsyncEngine, label: str) -> None:
+    statement_duration = DB_STATEMENT_DURATION.labels(label)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info["statement_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop("statement_started_at", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        statement_duration.observe(elapsed)
+        record_statement(label, statement, elapsed)
+
+
+def check_pool_capacity(engine: AsyncEngine, label: str) -> None:
+    if SERVER_CONCURRENCY <= 0:
+        return
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedAsyncQueuePool):
+        return
+    capacity = pool.size() + max(DB_MAX_OVERFLOW, 0)
+    if capacity < SERVER_CONCURRENCY:
+        logger.warning(
+            "Database pool %s holds at most %d connections (pool_size=%d, max_overflow=%d) but the server "
+            "accepts %d concurrent requests; requests will queue on checkout for up to %gs",
+            label,
+            capacity,
+            pool.size(),
+            DB_MAX_OVERFLOW,
+            SERVER_CONCURRENCY,
+            DB_POOL_TIMEOUT_SECONDS,
+        )
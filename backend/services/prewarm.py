@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import math
+import statistics
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from backend.config import (
+    GOOGLE_API_KEY,
+    GROUP_INITIAL_CANDIDATES,
+    PREWARM_HISTORY_DAYS,
+    PREWARM_LEAD_MINUTES,
+    PREWARM_MAX_CELLS,
+    PREWARM_MIN_GROUPS,
+    PREWARM_PEAKS,
+    PREWARM_UPSTREAM_BUDGET,
+    PREWARM_UTC_OFFSET_HOURS,
+    PREWARM_WINDOW_MINUTES,
+)
+from backend.observability import metrics
+from backend.repository import groups as group_repo
+from backend.schemas.groups import SearchPreferences
+
+from . import quota
+from . import restaurants as restaurant_service
+from .database import router, shard_session
+
+
+logger = logging.getLogger(__name__)
+
+PREWARM_AREAS = metrics.counter("prewarm_areas", "Areas warmed before a meal peak", ("peak",))
+PREWARM_CALLS = metrics.counter(
+    "prewarm_upstream_calls", "Google and Gemini calls budgeted for warming before a meal peak", ("peak",)
+)
+PREWARM_FIRST_GROUP = metrics.histogram(
+    "prewarm_first_group_seconds",
+    "Creation time of the first group in an area around a meal peak, by whether the area was warmed",
+    ("area",),
+)
+
+# Areas are cells of this many degrees (about 1 km), the same size as the index of known places.
+CELL_DEGREES = 0.01
+MINUTES_PER_DAY = 24 * 60
+LOCAL_TIME = timezone(timedelta(hours=PREWARM_UTC_OFFSET_HOURS))
+
+Cell = Tuple[int, int]
+
+
+class HotArea(NamedTuple):
+    cell: Cell
+    groups: int
+    preferences: SearchPreferences
+
+
+class PrewarmState:
+    """The peak this instance warmed for last, what it warmed, and the areas that have had a group since."""
+
+    def __init__(self) -> None:
+        self.peak: Optional[datetime] = None
+        self.warmed: Set[Cell] = set()
+        self.created: Set[Cell] = set()
+
+
+state = PrewarmState()
+
+
+def peak_minutes(peak: str) -> int:
+    hours, _, minutes = peak.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def cell_of(latitude: float, longitude: float) -> Cell:
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+def hot_areas(origins: Sequence[Any], minutes: int) -> List[HotArea]:
+    """The busiest cells among groups created within ``PREWARM_WINDOW_MINUTES`` after ``minutes`` local time.
+
+    Each area searches from the mean location of its groups with their median
+    radius and their most common place types and price range.
+    """
+    by_cell: Dict[Cell, List[Any]] = {}
+    for origin in origins:
+        created_at = origin.created_at.replace(tzinfo=timezone.utc).astimezone(LOCAL_TIME)
+        if (created_at.hour * 60 + created_at.minute - minutes) % MINUTES_PER_DAY >= PREWARM_WINDOW_MINUTES:
+            continue
+        by_cell.setdefault(cell_of(origin.latitude, origin.longitude), []).append(origin)
+
+    busiest = sorted(by_cell.items(), key=lambda item: -len(item[1]))
+    areas = []
+    for cell, group_origins in busiest[:PREWARM_MAX_CELLS]:
+        if len(group_origins) < PREWARM_MIN_GROUPS:
+            break
+        types = Counter(tuple(origin.types or ()) for origin in group_origins).most_common(1)[0][0]
+        prices = Counter((origin.min_price, origin.max_price) for origin in group_origins).most_common(1)[0][0]
+        preferences = SearchPreferences(
+            latitude=statistics.fmean(origin.latitude for origin in group_origins),
+            longitude=statistics.fmean(origin.longitude for origin in group_origins),
+            radius=int(statistics.median(origin.radius for origin in group_origins)),
+            min_price=prices[0],
+            max_price=prices[1],
+            types=list(types) or None,
+        )
+        areas.append(HotArea(cell, len(group_origins), preferences))
+    return areas
+
+
+async def learn_hot_areas(minutes: int, now: Optional[datetime] = None) -> List[HotArea]:
+    """``hot_areas`` of the groups created on every shard during the last ``PREWARM_HISTORY_DAYS``.
+
+    ``now`` is naive UTC, like the stored ``created_at`` it is compared with.
+    """
+    since = (now or datetime.now(timezone.utc).replace(tzinfo=None)) - timedelta(days=PREWARM_HISTORY_DAYS)
+    origins: List[Any] = []
+    for shard in range(router.shard_count):
+        async with shard_session(shard, readonly=True) as session:
+            origins.extend(await group_repo.fetch_group_origins(session, since))
+            await session.commit()
+    return hot_areas(origins, minutes)
+
+
+def warming_limit(preferences: SearchPreferences, budget: int) -> Tuple[int, int]:
+    """How many places of an area to enrich within ``budget`` upstream calls, and the calls that takes.
+
+    Warming an area costs one nearby search per place type, then a details call
+    and a card summary for each enriched place.
+    """
+    searches = len(set(preferences.types or ())) or 1
+    limit = max(0, min(GROUP_INITIAL_CANDIDATES, (budget - searches) // 2))
+    return limit, searches + 2 * limit if limit else 0
+
+
+async def warm_before(peak: datetime) -> Tuple[int, int]:
+    """Warm the hot areas of ``peak`` (local time) within ``PREWARM_UPSTREAM_BUDGET``; returns (areas, calls)."""
+    label = peak.strftime("%H:%M")
+    areas = await learn_hot_areas(peak.hour * 60 + peak.minute)
+    state.peak, state.warmed, state.created = peak, set(), set()
+    budget = PREWARM_UPSTREAM_BUDGET
+    for area in areas:
+        limit, cost = warming_limit(area.preferences, budget)
+        if not limit:
+            break
+        budget -= cost
+        PREWARM_CALLS.labels(label).inc(cost)
+        with quota.priority(quota.BULK):
+            enriched = await restaurant_service.warm_area(area.preferences, limit)
+        PREWARM_AREAS.labels(label).inc()
+        state.warmed.add(area.cell)
+        logger.info("Warmed %d places in %s for the %s peak (%d groups)", enriched, area.cell, label, area.groups)
+    calls = PREWARM_UPSTREAM_BUDGET - budget
+    logger.info(
+        "Warmed %d of %d hot areas for the %s peak with up to %d upstream calls",
+        len(state.warmed),
+        len(areas),
+        label,
+        calls,
+    )
+    return len(state.warmed), calls
+
+
+def next_warming(now: datetime) -> Tuple[datetime, datetime]:
+    """The next peak (local time) and when to warm for it, ``PREWARM_LEAD_MINUTES`` before."""
+    candidates = []
+    for peak in PREWARM_PEAKS:
+        minutes = peak_minutes(peak)
+        at = now.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+        if at - timedelta(minutes=PREWARM_LEAD_MINUTES) <= now:
+            at += timedelta(days=1)
+        candidates.append((at - timedelta(minutes=PREWARM_LEAD_MINUTES), at))
+    warm_at, at = min(candidates)
+    return at, warm_at
+
+
+async def keep_warming() -> None:
+    """Warm the hot areas before every peak in ``PREWARM_PEAKS`` until cancelled."""
+    if not PREWARM_PEAKS or not GOOGLE_API_KEY or PREWARM_UPSTREAM_BUDGET <= 0:
+        return
+    while True:
+        now = datetime.now(LOCAL_TIME)
+        peak, warm_at = next_warming(now)
+        await asyncio.sleep((warm_at - now).total_seconds())
+        try:
+            await warm_before(peak)
+        except Exception:
+            logger.exception("Warming for the %s peak failed", peak.strftime("%H:%M"))
+
+
+def observe_group_creation(latitude: float, longitude: float, seconds: float, now: Optional[datetime] = None) -> None:
+    """Record how long the first group in an area took to create, from warming until the peak window ends."""
+    if state.peak is None:
+        return
+    now = now or datetime.now(LOCAL_TIME)
+    start = state.peak - timedelta(minutes=PREWARM_LEAD_MINUTES)
+    if not start <= now < state.peak + timedelta(minutes=PREWARM_WINDOW_MINUTES):
+        return
+    cell = cell_of(latitude, longitude)
+    if cell in state.created:
+        return
+    state.created.add(cell)
+    PREWARM_FIRST_GROUP.labels("warmed" if cell in state.warmed else "cold").observe(seconds)
@@ -0,0 +1,90 @@
+import math
+import re
+import unicodedata
+from typing import List
+
+from backend.config import SUMMARY_CARD_REVIEW_TOKENS, SUMMARY_DETAIL_REVIEW_TOKENS
+from backend.schemas.restaurants import Review
+
+
+REVIEW_TOKEN_BUDGETS = {"card": SUMMARY_CARD_REVIEW_TOKENS, "detail": SUMMARY_DETAIL_REVIEW_TOKENS}
+
+# Gemini spends about one token per kana/kanji character and one per ~4 characters of other text.
+_WIDE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]")
+_WHITESPACE = re.compile(r"\s+")
+# Runs of the same symbol or emoji ("!!!!", "😋😋😋") carry no more than one of them.
+_REPEATS = re.compile(r"([^\w\s])\1{2,}")
+_SENTENCE_END = re.compile(r"[。！？!?.]")
+# A review cut shorter than this reads as noise rather than as a shortened review.
+MIN_REVIEW_TOKENS = 24
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    if text.isascii():
+        return math.ceil(len(text) / 4)
+    wide = len(_WIDE.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def normalize_review_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    text = _REPEATS.sub(r"\1", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def informativeness(text: str) -> int:
+    """Distinct word characters in ``text``: long reviews score high, repetitive or empty ones low."""
+    return sum(1 for char in set(text) if char.isalnum())
+
+
+def fit_reviews(reviews: List[Review], budget: int) -> List[Review]:
+    """Normalize review texts and trim them so together they take about ``budget`` tokens at most.
+
+    Duplicates and empty reviews are dropped and the rest are ordered by
+    ``informativeness``. Reviews that fit in an even share of the budget are kept
+    whole, and what they leave over is shared among the longer ones, which are cut
+    at a sentence end where possible. Reviews that would get fewer than
+    ``MIN_REVIEW_TOKENS`` are left out, the least informative first.
+    """
+    seen = set()
+    candidates = []
+    for review in reviews:
+        text = normalize_review_text(review.text)
+        if text and text not in seen:
+            seen.add(text)
+            candidates.append(review if text == review.text else review.model_copy(update={"text": text}))
+    candidates.sort(key=lambda review: informativeness(review.text), reverse=True)
+    while len(candidates) > 1 and budget / len(candidates) < MIN_REVIEW_TOKENS:
+        candidates.pop()
+
+    tokens = [estimate_tokens(review.text) for review in candidates]
+    if sum(tokens) <= budget:
+        return candidates
+    allowances = {}
+    remaining, left = budget, len(candidates)
+    for index in sorted(range(len(candidates)), key=tokens.__getitem__):
+        allowances[index] = min(tokens[index], remaining // left)
+        remaining -= allowances[index]
+        left -= 1
+    return [
+        review if tokens[index] <= allowances[index] else _truncate(review, allowances[index])
+        for index, review in enumerate(candidates)
+    ]
+
+
+def _truncate(review: Review, tokens: int) -> Review:
+    text = review.text
+    # Binary search for the longest prefix within the allowance.
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) + 1 <= tokens:
+            low = middle
+        else:
+            high = middle - 1
+    cut = text[:low]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] >= len(cut) // 2:
+        cut = cut[: sentence_ends[-1]]
+    return review.model_copy(update={"text": cut.rstrip() + ELLIPSIS})
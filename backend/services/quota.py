@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.config import (
+    UPSTREAM_QUOTA_BULK_RESERVE,
+    UPSTREAM_QUOTA_BURST_SECONDS,
+    UPSTREAM_QUOTA_MAX_WAIT_SECONDS,
+    UPSTREAM_QUOTA_STORE,
+)
+from backend.observability import metrics
+from backend.repository import quota as quota_repo
+
+from . import deadline
+from .database import AsyncSessionLocal
+from .exceptions import ServiceError
+
+
+logger = logging.getLogger(__name__)
+
+# Interactive calls (detail views, group creation, /summarize) are served before bulk ones (group card summaries).
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_ORDER = {INTERACTIVE: 0, BULK: 1}
+
+QUOTA_GRANTED = metrics.counter(
+    "upstream_quota_tokens_granted", "Quota tokens consumed by outbound calls", ("upstream", "priority")
+)
+QUOTA_WAIT = metrics.histogram(
+    "upstream_quota_wait_seconds", "Time outbound calls waited for a quota token", ("upstream", "priority")
+)
+QUOTA_REJECTED = metrics.counter(
+    "upstream_quota_rejected", "Calls that reached their deadline while waiting for quota", ("upstream", "priority")
+)
+QUOTA_QUEUE_DEPTH = metrics.gauge("upstream_quota_queue_depth", "Calls waiting for a quota token", ("upstream",))
+QUOTA_STORE_ERRORS = metrics.counter(
+    "upstream_quota_store_errors", "Quota store failures; the call is let through", ("upstream",)
+)
+
+current_priority: ContextVar[str] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """Run outbound calls made inside the block with priority ``name``."""
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def take_tokens(
+    tokens: float, updated_at: float, now: float, requested: int, rate: float, capacity: float, reserve: float
+) -> Tuple[float, int, float]:
+    """Refill a bucket and take up to ``requested`` whole tokens while keeping ``reserve`` in it.
+
+    Returns the remaining tokens, the number granted and, when none were, the seconds
+    until one can be.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    granted = max(0, min(requested, int(tokens - reserve)))
+    if granted:
+        return tokens - granted, granted, 0.0
+    return tokens, 0, (reserve + 1 - tokens) / rate
+
+
+class MemoryQuotaStore:
+    """Buckets local to this process."""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(
+        self, name: str, requested: int, rate: float, capacity: float, reserve: float
+    ) -> Tuple[int, float]:
+        now = time.time()
+        tokens, updated_at = self._buckets.get(name, (capacity, now))
+        tokens, granted, wait = take_tokens(tokens, updated_at, now, requested, rate, capacity, reserve)
+        self._buckets[name] = (tokens, now)
+        return granted, wait
+
+
+class DatabaseQuotaStore:
+    """Buckets in shard 0's ``upstream_quota_buckets`` table, shared by every instance."""
+
+    async def take(
+        self, name: str, requested: int, rate: float, capacity: float, reserve: float
+    ) -> Tuple[int, float]:
+        async with AsyncSessionLocal() as session:
+            now = time.time()
+            bucket = await quota_repo.lock_bucket(session, name, capacity, now)
+            bucket.tokens, granted, wait = take_tokens(
+                bucket.tokens, bucket.updated_at, now, requested, rate, capacity, reserve
+            )
+            bucket.updated_at = max(bucket.updated_at, now)
+            await session.commit()
+        return granted, wait
+
+
+STORES = {"memory": MemoryQuotaStore, "database": DatabaseQuotaStore}
+if UPSTREAM_QUOTA_STORE not in STORES:
+    raise ValueError(f"UPSTREAM_QUOTA_STORE must be one of {', '.join(STORES)}, got {UPSTREAM_QUOTA_STORE!r}")
+
+# Any object with the same ``take`` coroutine can be assigned here (e.g. a Redis-backed store).
+store = STORES[UPSTREAM_QUOTA_STORE]()
+
+
+class QuotaGovernor:
+    """Hands out one upstream's tokens to queued callers, highest priority first.
+
+    Callers wait in a priority queue until a token is granted or their deadline
+    passes. One dispatcher task per governor asks the store for as many tokens as
+    there are waiters of the head's priority, so a shared store sees one request per
+    batch rather than per call.
+    """
+
+    def __init__(self, name: str, rate: float) -> None:
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1.0, rate * UPSTREAM_QUOTA_BURST_SECONDS)
+        self.bulk_reserve = self.capacity * UPSTREAM_QUOTA_BULK_RESERVE
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        QUOTA_QUEUE_DEPTH.labels(name).set_function(lambda: len(self._queue))
+
+    def _reserve(self, priority_rank: int) -> float:
+        return 0.0 if priority_rank == PRIORITY_ORDER[INTERACTIVE] else self.bulk_reserve
+
+    async def _take(self, requested: int, reserve: float) -> Tuple[int, float]:
+        try:
+            return await store.take(self.name, requested, self.rate, self.capacity, reserve)
+        except Exception:
+            QUOTA_STORE_ERRORS.labels(self.name).inc()
+            logger.warning("Quota store failed for %s; letting the call through", self.name, exc_info=True)
+            return requested, 0.0
+
+    async def acquire(self, priority_name: str, timeout: float) -> float:
+        """Wait for a token and return the seconds spent waiting."""
+        started = time.perf_counter()
+        rank = PRIORITY_ORDER[priority_name]
+        if not self._queue:
+            granted, _ = await self._take(1, self._reserve(rank))
+            if granted:
+                QUOTA_GRANTED.labels(self.name, priority_name).inc()
+                QUOTA_WAIT.labels(self.name, priority_name).observe(0.0)
+                return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        if not self._queue or rank < self._queue[0][0]:
+            # A more urgent caller may be served with tokens the current head is not allowed to use.
+            self._wakeup.set()
+        heapq.heappush(self._queue, (rank, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await asyncio.wait_for(future, max(0.0, timeout - (time.perf_counter() - started)))
+        except asyncio.TimeoutError:
+            QUOTA_REJECTED.labels(self.name, priority_name).inc()
+            raise ServiceError(503, f"Upstream quota for {self.name} is exhausted; try again later") from None
+        waited = time.perf_counter() - started
+        QUOTA_GRANTED.labels(self.name, priority_name).inc()
+        QUOTA_WAIT.labels(self.name, priority_name).observe(waited)
+        return waited
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Drop callers that timed out or were cancelled.
+            while self._queue and self._queue[0][2].done():
+                heapq.heappop(self._queue)
+            if not self._queue:
+                return
+
+            head_rank = self._queue[0][0]
+            requested = sum(1 for rank, _, future in self._queue if rank == head_rank and not future.done())
+            granted, wait = await self._take(requested, self._reserve(head_rank))
+            while granted and self._queue:
+                _, _, future = heapq.heappop(self._queue)
+                if not future.done():
+                    future.set_result(None)
+                    granted -= 1
+            if granted == 0 and wait > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+
+_governors: Dict[str, QuotaGovernor] = {}
+
+
+async def acquire(upstream: str, rate: float, timeout: Optional[float] = None) -> float:
+    """Wait for quota to call ``upstream`` at the current priority; ``rate`` <= 0 means unlimited.
+
+    Raises ``ServiceError(503)`` when no token is granted within ``timeout`` seconds
+    (``UPSTREAM_QUOTA_MAX_WAIT_SECONDS`` or the rest of the request's deadline by default).
+    """
+    if rate <= 0:
+        return 0.0
+    governor = _governors.get(upstream)
+    if governor is None:
+        governor = _governors[upstream] = QuotaGovernor(upstream, rate)
+    if timeout is None:
+        timeout = deadline.timeout(UPSTREAM_QUOTA_MAX_WAIT_SECONDS)
+    return await governor.acquire(current_priority.get(), timeout)
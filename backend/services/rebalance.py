@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from backend.config import SHARD_OVERRIDE_REFRESH_SECONDS
+from backend.observability.tracing import traced
+from backend.repository import shards as shard_repo
+
+from .database import router, shard_session, shards
+from .exceptions import ServiceError
+
+
+logger = logging.getLogger(__name__)
+
+
+@traced
+async def move_group(group_id: str, target: int, grace_seconds: Optional[float] = None) -> int:
+    """Move every row of ``group_id`` to shard ``target`` and return the source shard.
+
+    1. copy the group's rows to the target inside one transaction,
+    2. point the override directory (shard 0) at the target,
+    3. wait until every process has reloaded the overrides,
+    4. merge what stale processes wrote to the source meanwhile: joins, votes,
+       appended or enriched candidates, deck extensions and the finished status,
+    5. delete the source rows.
+
+    Writes that land on the source between steps 4 and 5 are lost, so the grace
+    period should comfortably exceed ``SHARD_OVERRIDE_REFRESH_SECONDS``.
+    """
+    if not 0 <= target < len(shards):
+        raise ServiceError(400, f"Shard {target} does not exist")
+    if grace_seconds is None:
+        grace_seconds = SHARD_OVERRIDE_REFRESH_SECONDS * 2
+
+    await router.refresh(force=True)
+    source = router.lookup(group_id)
+    if source == target:
+        return source
+
+    async with shard_session(source) as session:
+        snapshot = await shard_repo.fetch_group_snapshot(session, group_id)
+        await session.commit()
+    if not snapshot["groups"]:
+        raise ServiceError(404, "Group not found")
+
+    async with shard_session(target) as session:
+        # A previous attempt may have died after copying; start from a clean slate.
+        await shard_repo.delete_group_rows(session, group_id)
+        await shard_repo.insert_group_snapshot(session, snapshot)
+        await session.commit()
+
+    override = None if target == router.home_shard(group_id) else target
+    async with shard_session(0) as session:
+        if override is None:
+            await shard_repo.delete_override(session, group_id)
+        else:
+            await shard_repo.set_override(session, group_id, override)
+        await session.commit()
+    router.set_local_override(group_id, override)
+    logger.info(
+        "Group %s now routed to shard %d; removing its shard %d rows in %gs",
+        group_id,
+        target,
+        source,
+        grace_seconds,
+    )
+
+    await asyncio.sleep(grace_seconds)
+
+    async with shard_session(source) as session:
+        late_snapshot = await shard_repo.fetch_group_snapshot(session, group_id)
+        await session.commit()
+    async with shard_session(target) as session:
+        await shard_repo.merge_late_writes(session, snapshot, late_snapshot)
+        await session.commit()
+    async with shard_session(source) as session:
+        await shard_repo.delete_group_rows(session, group_id)
+        await session.commit()
+
+    return source
+
+
+@traced
+async def count_groups_per_shard() -> List[Dict[str, int]]:
+    counts: List[Dict[str, int]] = []
+    for shard in range(len(shards)):
+        async with shard_session(shard, readonly=True) as session:
+            counts.append({"shard": shard, "groups": await shard_repo.count_groups(session)})
+            await session.commit()
+    return counts
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from backend.config import (
+    CIRCUIT_CONSECUTIVE_FAILURES,
+    CIRCUIT_FAILURE_RATE,
+    CIRCUIT_HALF_OPEN_CALLS,
+    CIRCUIT_MIN_CALLS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_WINDOW,
+    UPSTREAM_CONCURRENCY_BACKOFF,
+    UPSTREAM_CONCURRENCY_INITIAL,
+    UPSTREAM_CONCURRENCY_MAX,
+    UPSTREAM_CONCURRENCY_MIN,
+)
+from backend.observability import metrics
+
+from .exceptions import ServiceError
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.gauge(
+    "upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",)
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "upstream_circuit_transitions", "Circuit breaker state changes, by new state", ("upstream", "state")
+)
+CONCURRENCY_LIMIT = metrics.gauge("upstream_concurrency_limit", "Adaptive concurrency limit", ("upstream",))
+INFLIGHT = metrics.gauge("upstream_inflight", "Calls currently in flight", ("upstream",))
+QUEUED = metrics.gauge("upstream_concurrency_queue", "Calls waiting for a concurrency slot", ("upstream",))
+REJECTED = metrics.counter(
+    "upstream_rejected", "Calls refused without reaching the upstream", ("upstream", "reason")
+)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over the verdicts of the last ``CIRCUIT_WINDOW`` calls.
+
+    Once ``CIRCUIT_MIN_CALLS`` verdicts are in and at least ``CIRCUIT_FAILURE_RATE`` of
+    them are failures, or after ``CIRCUIT_CONSECUTIVE_FAILURES`` failures in a row, the
+    breaker opens and refuses calls for ``CIRCUIT_OPEN_SECONDS``.
+    It then admits ``CIRCUIT_HALF_OPEN_CALLS`` trial calls: if they all succeed it
+    closes, and the first failure opens it again.
+    """
+
+    def __init__(self, name: str, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.state = CLOSED
+        self._clock = clock
+        self._verdicts: Deque[bool] = deque(maxlen=CIRCUIT_WINDOW)
+        self._opened_at = -math.inf
+        self._consecutive_failures = 0
+        self._trials = 0
+        self._trial_successes = 0
+        CIRCUIT_STATE.labels(name).set_function(lambda: STATE_VALUES[self.state])
+
+    def allows(self) -> bool:
+        """Whether a call would be admitted right now; does not admit it."""
+        if self.state == OPEN:
+            return self._clock() - self._opened_at >= CIRCUIT_OPEN_SECONDS
+        if self.state == HALF_OPEN:
+            return self._trials < CIRCUIT_HALF_OPEN_CALLS
+        return True
+
+    def admit(self) -> bool:
+        """Admit a call that ``allows`` accepted; returns whether it is a half-open trial."""
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self._trials += 1
+            return True
+        return False
+
+    def record(self, ok: Optional[bool], trial: bool) -> None:
+        """Record a call's verdict; ``None`` means it ended without one (e.g. it was cancelled)."""
+        if trial:
+            if self.state != HALF_OPEN:
+                return
+            if ok is None:
+                self._trials -= 1
+            elif not ok:
+                self._transition(OPEN)
+            else:
+                self._trial_successes += 1
+                if self._trial_successes >= CIRCUIT_HALF_OPEN_CALLS:
+                    self._transition(CLOSED)
+            return
+        # Calls admitted before the breaker opened say nothing about the half-open trials.
+        if ok is None or self.state != CLOSED:
+            return
+        self._verdicts.append(ok)
+        self._consecutive_failures = 0 if ok else self._consecutive_failures + 1
+        if self._consecutive_failures >= CIRCUIT_CONSECUTIVE_FAILURES:
+            self._transition(OPEN)
+        elif len(self._verdicts) >= CIRCUIT_MIN_CALLS:
+            if self._verdicts.count(False) / len(self._verdicts) >= CIRCUIT_FAILURE_RATE:
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == OPEN:
+            self._opened_at = self._clock()
+        elif state == HALF_OPEN:
+            self._trials = self._trial_successes = 0
+        else:
+            self._verdicts.clear()
+            self._consecutive_failures = 0
+        log = logger.info if state == HALF_OPEN else logger.warning
+        log("Circuit for %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls to one upstream.
+
+    A call judged successful raises the limit by ``1 / limit`` (about +1 per limit's
+    worth of calls) while the limit is in use; a failed or slow one multiplies it by
+    ``UPSTREAM_CONCURRENCY_BACKOFF``. Calls that started before the last decrease do
+    not decrease it again, so one slowdown backs off once rather than once per call.
+    Callers over the limit wait in FIFO order for a slot.
+    """
+
+    def __init__(self, name: str, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.limit = float(UPSTREAM_CONCURRENCY_INITIAL)
+        self.inflight = 0
+        self._clock = clock
+        self._last_decrease = -math.inf
+        self._waiters: Deque[asyncio.Future] = deque()
+        CONCURRENCY_LIMIT.labels(name).set_function(lambda: int(self.limit))
+        INFLIGHT.labels(name).set_function(lambda: self.inflight)
+        QUEUED.labels(name).set_function(lambda: len(self._waiters))
+
+    def try_acquire(self) -> bool:
+        if self.inflight >= int(self.limit) or self._waiters:
+            return False
+        self.inflight += 1
+        return True
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to ``timeout`` seconds for one; False if none freed up."""
+        if self.try_acquire():
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait ended; pass it on.
+                self.release()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return False
+        return True
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        while self._waiters and self.inflight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def on_success(self) -> None:
+        if self.inflight * 2 >= self.limit:
+            self.limit = min(float(UPSTREAM_CONCURRENCY_MAX), self.limit + 1 / self.limit)
+            self._hand_over()
+
+    def on_failure(self, started: float) -> None:
+        if started < self._last_decrease:
+            return
+        self._last_decrease = self._clock()
+        self.limit = max(float(UPSTREAM_CONCURRENCY_MIN), self.limit * UPSTREAM_CONCURRENCY_BACKOFF)
+
+
+class Call:
+    __slots__ = ("started", "trial", "verdict", "timer")
+
+    def __init__(self, started: float, trial: bool) -> None:
+        self.started = started
+        self.trial = trial
+        self.verdict: Optional[bool] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class UpstreamGuard:
+    """Circuit breaker plus adaptive concurrency limit in front of one upstream.
+
+    A call still running after ``slow_call_seconds`` is judged a failure at that
+    moment, so a hanging upstream opens the breaker without waiting for timeouts.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float) -> None:
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.breaker = CircuitBreaker(name)
+        self.limiter = AdaptiveLimiter(name)
+
+    def check(self) -> None:
+        """Fail fast while the breaker is open, before spending quota on the call."""
+        if not self.breaker.allows():
+            self._reject("circuit_open", f"Upstream {self.name} is unavailable; try again later")
+
+    async def admit(self, timeout: float) -> Call:
+        """Wait up to ``timeout`` for a concurrency slot and start a call."""
+        self.check()
+        if not await self.limiter.acquire(timeout):
+            self._reject("concurrency", f"Too many concurrent calls to upstream {self.name}; try again later")
+        if not self.breaker.allows():
+            # The breaker opened while this call was queued.
+            self.limiter.release()
+            self.check()
+        call = Call(time.monotonic(), self.breaker.admit())
+        call.timer = asyncio.get_running_loop().call_later(self.slow_call_seconds, self._judge, call, False)
+        return call
+
+    def finish(self, call: Call, ok: Optional[bool]) -> None:
+        """Release ``call``; ``ok`` is None when it ended without a verdict (e.g. cancelled)."""
+        if call.timer is not None:
+            call.timer.cancel()
+        if ok is None:
+            if call.verdict is None:
+                self.breaker.record(None, call.trial)
+        else:
+            self._judge(call, ok)
+        self.limiter.release()
+
+    def _judge(self, call: Call, ok: bool) -> None:
+        if call.verdict is not None:
+            return
+        call.verdict = ok
+        self.breaker.record(ok, call.trial)
+        if ok:
+            self.limiter.on_success()
+        else:
+            self.limiter.on_failure(call.started)
+
+    def _reject(self, reason: str, detail: str) -> None:
+        REJECTED.labels(self.name, reason).inc()
+        raise ServiceError(503, detail)
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def guard_for(upstream: str, slow_call_seconds: float) -> UpstreamGuard:
+    guard = _guards.get(upstream)
+    if guard is None:
+        guard = _guards[upstream] = UpstreamGuard(upstream, slow_call_seconds)
+    return guard
@@ -1,4 +1,10 @@
-from typing import List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import math
+from time import monotonic, perf_counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 import httpx
 
@@ -9,29 +15,310 @@ from backend.constants import (
 )
 from backend.config import (
     GEMINI_API_URL,
+    GEMINI_SLOW_CALL_SECONDS,
+    GEMINI_STREAM_API_URL,
     GOOGLE_API_KEY,
     GOOGLE_PLACE_DETAILS_URL,
     GOOGLE_PLACES_API_URL,
+    GROUP_CREATE_WRITE_RESERVE_SECONDS,
+    GROUP_INITIAL_CANDIDATES,
+    LLM_BULK_MAX_CONCURRENCY,
+    LLM_BULK_MAX_QUEUE_SECONDS,
+    LLM_INTERACTIVE_MAX_QUEUE_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    NEARBY_PAGE_TOKEN_DELAY_SECONDS,
+    NEARBY_PAGE_TOKEN_RETRIES,
+    NEARBY_SEARCH_MAX_PAGES,
+    PLACE_DETAILS_CACHE_MAX_ENTRIES,
+    PLACE_DETAILS_CACHE_TTL_SECONDS,
+    PLACE_INDEX_FRESH_SECONDS,
+    PLACE_INDEX_STALE_SECONDS,
+    RESTAURANT_ENRICHMENT_DEADLINE_SECONDS,
+    SUMMARY_CACHE_MAX_ENTRIES,
+    SUMMARY_CACHE_STALE_SECONDS,
+    SUMMARY_CACHE_TTL_SECONDS,
 )
+from backend.observability import llm
+from backend.observability.tracing import traced
 from backend.schemas.groups import SearchPreferences
 from backend.schemas.restaurants import Restaurant, Review, SummarizeRequest
 
+from . import deadline, places_index, prompt_builder, quota, scheduler, singleflight, upstream
+from .cache import TTLCache
 from .exceptions import ServiceError
 
 
+logger = logging.getLogger(__name__)
+
+summary_cache: TTLCache[str] = TTLCache(
+    "summaries", SUMMARY_CACHE_TTL_SECONDS, SUMMARY_CACHE_STALE_SECONDS, SUMMARY_CACHE_MAX_ENTRIES
+)
+details_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    "place_details", PLACE_DETAILS_CACHE_TTL_SECONDS, max_entries=PLACE_DETAILS_CACHE_MAX_ENTRIES
+)
+# Every Gemini call holds one of these slots; card summaries for group creation run as bulk work.
+gemini_scheduler = scheduler.PriorityScheduler(
+    upstream.GEMINI,
+    LLM_MAX_CONCURRENCY,
+    {quota.INTERACTIVE: LLM_MAX_CONCURRENCY, quota.BULK: LLM_BULK_MAX_CONCURRENCY},
+    {quota.INTERACTIVE: LLM_INTERACTIVE_MAX_QUEUE_SECONDS, quota.BULK: LLM_BULK_MAX_QUEUE_SECONDS},
+)
+# Searched when the preferences name no place type.
+DEFAULT_PLACE_TYPE = "restaurant"
+# Every enriched place, and the stored candidates of all shards (see groups.refresh_known_places).
+known_places = places_index.PlaceIndex()
+KNOWN_PLACES_ENABLED = PLACE_INDEX_FRESH_SECONDS > 0
+
+
+@traced
 async def search_restaurants(preferences: SearchPreferences) -> List[Restaurant]:
     return await fetch_restaurants_from_google(preferences)
 
 
-async def fetch_restaurants_from_google(preferences: SearchPreferences) -> List[Restaurant]:
+class SearchBacklog:
+    """What a search found beyond its first candidates, for ``fetch_more_restaurants`` to go on with.
+
+    ``places`` are ranked results that were not enriched yet, ``page_tokens`` the
+    ``next_page_token`` of each place type's last page, and ``seen`` every place id
+    found so far. ``preferences`` is set when the first candidates came from
+    ``known_places`` and the search itself is still to be run.
+    """
+
+    def __init__(self) -> None:
+        self.preferences: Optional[SearchPreferences] = None
+        self.places: List[Dict[str, Any]] = []
+        self.page_tokens: Dict[str, str] = {}
+        self.pages = 1
+        self.fetched_at = 0.0
+        self.seen: Set[str] = set()
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.preferences is not None
+            or self.places
+            or (self.page_tokens and self.pages < NEARBY_SEARCH_MAX_PAGES)
+        )
+
+
+@traced
+async def fetch_restaurants_from_google(
+    preferences: SearchPreferences,
+    pending: Optional[Dict[str, "asyncio.Task[Restaurant]"]] = None,
+    backlog: Optional[SearchBacklog] = None,
+) -> List[Restaurant]:
+    """Search nearby places of each preferred type in parallel and enrich the best ones.
+
+    The results are merged by place id and ranked, and the first
+    ``GROUP_INITIAL_CANDIDATES`` get their details and summary, fetched in parallel.
+    The other places and the next page tokens are left in ``backlog``.
+
+    When ``known_places`` has enough places seen within ``PLACE_INDEX_FRESH_SECONDS``
+    they are returned instead, and the search is left in ``backlog`` to run later.
+    When every search fails, known places up to ``PLACE_INDEX_STALE_SECONDS`` old
+    are returned if there are any.
+
+    Inside a ``deadline.budget``, places that are not complete when the budget (less
+    ``GROUP_CREATE_WRITE_RESERVE_SECONDS``) runs out are returned with the nearby
+    search data only. Their enrichment keeps running under its own budget and is
+    added to ``pending`` by place id for the caller to store later; without
+    ``pending`` it is cancelled.
+    """
     if not GOOGLE_API_KEY:
         raise ServiceError(500, "Google API key not configured")
 
+    types = _search_types(preferences)
+    known = _known_nearby(preferences, types, PLACE_INDEX_FRESH_SECONDS)
+    if len(known) >= GROUP_INITIAL_CANDIDATES:
+        places_index.PLACE_INDEX_ANSWERS.labels("fresh").inc()
+        restaurants = known[:GROUP_INITIAL_CANDIDATES]
+        if backlog is not None:
+            backlog.preferences = preferences
+            backlog.seen = {restaurant.place_id for restaurant in restaurants}
+        return restaurants
+
+    client = upstream.shared_client()
+    searches = await asyncio.gather(
+        *(_nearby_page(client, _nearby_params(preferences, place_type)) for place_type in types),
+        return_exceptions=True,
+    )
+    pages = _successful_pages(types, searches)
+    if not pages:
+        known = _known_nearby(preferences, types, PLACE_INDEX_STALE_SECONDS)
+        if not known:
+            raise searches[0]
+        places_index.PLACE_INDEX_ANSWERS.labels("fallback").inc()
+        logger.warning("Nearby search failed (%s); answering with %d known places", searches[0].detail, len(known))
+        return known[:GROUP_INITIAL_CANDIDATES]
+
+    ranked = _rank_places([results for results, _ in pages.values()])
+    places = ranked[:GROUP_INITIAL_CANDIDATES]
+    if backlog is not None:
+        backlog.places = ranked[GROUP_INITIAL_CANDIDATES:]
+        backlog.page_tokens = {place_type: token for place_type, (_, token) in pages.items() if token}
+        backlog.fetched_at = monotonic()
+        backlog.seen = {place["place_id"] for place in ranked}
+
+    with deadline.detached(RESTAURANT_ENRICHMENT_DEADLINE_SECONDS):
+        tasks = [asyncio.create_task(_enrich_place(client, place)) for place in places]
+    try:
+        if tasks:
+            await asyncio.wait(tasks, timeout=deadline.remaining(reserve=GROUP_CREATE_WRITE_RESERVE_SECONDS))
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    late = sum(not task.done() for task in tasks)
+    if late:
+        logger.info("Deadline reached with %d of %d places still being enriched", late, len(places))
+
+    restaurants: List[Restaurant] = []
+    for place, task in zip(places, tasks):
+        if task.done():
+            restaurants.append(task.result())
+            continue
+        restaurants.append(_restaurant_from_place(place))
+        if pending is not None:
+            pending[place["place_id"]] = task
+        else:
+            task.cancel()
+
+    return restaurants
+
+
+async def fetch_more_restaurants(backlog: SearchBacklog) -> AsyncIterator[List[Restaurant]]:
+    """Yield the rest of a search, enriched, one batch at a time.
+
+    The first batch is the places left over from the first pages, found by running
+    the search first if the first candidates came from known places. Then the next
+    page of every type is fetched in parallel as soon as its token can be used,
+    until ``NEARBY_SEARCH_MAX_PAGES``; places already seen are skipped.
+    """
+    client = upstream.shared_client()
+    if backlog.preferences is not None:
+        preferences, backlog.preferences = backlog.preferences, None
+        types = _search_types(preferences)
+        searches = await asyncio.gather(
+            *(_nearby_page(client, _nearby_params(preferences, place_type)) for place_type in types),
+            return_exceptions=True,
+        )
+        pages = _successful_pages(types, searches)
+        backlog.fetched_at = monotonic()
+        backlog.page_tokens = {place_type: token for place_type, (_, token) in pages.items() if token}
+        backlog.places = [
+            place
+            for place in _rank_places([results for results, _ in pages.values()])
+            if place["place_id"] not in backlog.seen
+        ]
+        backlog.seen.update(place["place_id"] for place in backlog.places)
+
+    if backlog.places:
+        places, backlog.places = backlog.places, []
+        yield await _enrich_places(client, places)
+
+    while backlog.page_tokens and backlog.pages < NEARBY_SEARCH_MAX_PAGES:
+        await asyncio.sleep(max(0.0, backlog.fetched_at + NEARBY_PAGE_TOKEN_DELAY_SECONDS - monotonic()))
+        types = list(backlog.page_tokens)
+        searches = await asyncio.gather(
+            *(_nearby_page(client, {"key": GOOGLE_API_KEY, "pagetoken": backlog.page_tokens[t]}) for t in types),
+            return_exceptions=True,
+        )
+        pages = _successful_pages(types, searches)
+        backlog.pages += 1
+        backlog.fetched_at = monotonic()
+        backlog.page_tokens = {place_type: token for place_type, (_, token) in pages.items() if token}
+
+        places = [
+            place
+            for place in _rank_places([results for results, _ in pages.values()])
+            if place["place_id"] not in backlog.seen
+        ]
+        backlog.seen.update(place["place_id"] for place in places)
+        if places:
+            yield await _enrich_places(client, places)
+
+
+async def fetch_extension(preferences: SearchPreferences, ring: int, seen: Set[str], limit: int) -> List[Restaurant]:
+    """Search the cells of ``ring`` around the preferences' area and enrich up to ``limit`` new places.
+
+    Ring ``n`` is six circles of the same radius, centered ``2 * n * radius``
+    away in six directions, so each ring covers ground the earlier ones did not.
+    """
+    client = upstream.shared_client()
+    centers = _ring_centers(preferences.latitude, preferences.longitude, 2 * ring * preferences.radius)
+    types = _search_types(preferences)
+    cells = [preferences.model_copy(update={"latitude": lat, "longitude": lng}) for lat, lng in centers]
+    searches = await asyncio.gather(
+        *(_nearby_page(client, _nearby_params(cell, place_type)) for cell in cells for place_type in types),
+        return_exceptions=True,
+    )
+    labels = [f"{place_type} at {cell.latitude:.5f},{cell.longitude:.5f}" for cell in cells for place_type in types]
+    pages = _successful_pages(labels, searches)
+    places = [
+        place
+        for place in _rank_places([results for results, _ in pages.values()])
+        if place["place_id"] not in seen
+    ][:limit]
+    return await _enrich_places(client, places)
+
+
+async def warm_area(preferences: SearchPreferences, limit: int) -> int:
+    """Search an area, bypassing ``known_places``, and enrich up to ``limit`` of its best places.
+
+    Enriching adds them to ``known_places`` and fills the details and summary
+    caches, so groups created there soon after start warm. Returns how many
+    places were enriched.
+    """
+    client = upstream.shared_client()
+    types = _search_types(preferences)
+    searches = await asyncio.gather(
+        *(_nearby_page(client, _nearby_params(preferences, place_type)) for place_type in types),
+        return_exceptions=True,
+    )
+    pages = _successful_pages(types, searches)
+    places = _rank_places([results for results, _ in pages.values()])[:limit]
+    await _enrich_places(client, places)
+    return len(places)
+
+
+def _ring_centers(lat: float, lng: float, distance: float) -> List[Tuple[float, float]]:
+    # Metres per degree of latitude; a degree of longitude shrinks with cos(latitude).
+    lat_scale = 111_320.0
+    lng_scale = lat_scale * max(math.cos(math.radians(lat)), 0.01)
+    centers = []
+    for bearing in range(0, 360, 60):
+        north = distance * math.cos(math.radians(bearing))
+        east = distance * math.sin(math.radians(bearing))
+        center_lat = max(-90.0, min(90.0, lat + north / lat_scale))
+        center_lng = (lng + east / lng_scale + 180.0) % 360.0 - 180.0
+        centers.append((center_lat, center_lng))
+    return centers
+
+
+def _search_types(preferences: SearchPreferences) -> List[str]:
+    return list(dict.fromkeys(preferences.types or [])) or [DEFAULT_PLACE_TYPE]
+
+
+def _known_nearby(preferences: SearchPreferences, types: List[str], max_age: float) -> List[Restaurant]:
+    if max_age <= 0:
+        return []
+    return known_places.query(
+        preferences.latitude,
+        preferences.longitude,
+        preferences.radius,
+        types,
+        preferences.min_price,
+        preferences.max_price,
+        max_age,
+    )
+
+
+def _nearby_params(preferences: SearchPreferences, place_type: str) -> Dict[str, Any]:
     params = {
         "key": GOOGLE_API_KEY,
         "location": f"{preferences.latitude},{preferences.longitude}",
         "radius": preferences.radius,
-        "type": "restaurant",
+        "type": place_type,
         "opennow": True,
         "language": "ja",
     }
@@ -39,12 +326,23 @@ async def fetch_restaurants_from_google(preferences: SearchPreferences) -> List[
     if preferences.min_price is not None and preferences.max_price is not None:
         params["minprice"] = preferences.min_price
         params["maxprice"] = preferences.max_price
+    return params
 
-    restaurants: List[Restaurant] = []
 
-    async with httpx.AsyncClient() as client:
+async def _nearby_page(
+    client: httpx.AsyncClient, params: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of nearby search results and the token for the next page, if there is one."""
+    attempt = 0
+    while True:
         try:
-            response = await client.get(GOOGLE_PLACES_API_URL, params=params)
+            response = await upstream.request(
+                client, upstream.NEARBY_SEARCH, "GET", GOOGLE_PLACES_API_URL, params=params, idempotent=True
+            )
+        except httpx.TimeoutException as exc:
+            raise ServiceError(504, "Google Places API timeout") from exc
+        except ServiceError:
+            raise
         except Exception as exc:
             raise ServiceError(500, f"Failed to fetch restaurants: {exc}") from exc
 
@@ -52,106 +350,200 @@ async def fetch_restaurants_from_google(preferences: SearchPreferences) -> List[
             raise ServiceError(response.status_code, "Failed to fetch restaurants")
 
         data = response.json()
+        status = data.get("status")
+        # A next_page_token is refused with INVALID_REQUEST until Google has it ready.
+        if status == "INVALID_REQUEST" and "pagetoken" in params and attempt < NEARBY_PAGE_TOKEN_RETRIES:
+            attempt += 1
+            await asyncio.sleep(NEARBY_PAGE_TOKEN_DELAY_SECONDS)
+            continue
+        if status not in {"OK", "ZERO_RESULTS"}:
+            upstream.record_api_status(upstream.NEARBY_SEARCH, str(status))
+            raise ServiceError(500, f"Google API error: {status}")
+        return data.get("results", []), data.get("next_page_token")
+
+
+def _successful_pages(
+    types: List[str], searches: List[Any]
+) -> Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]]:
+    pages = {}
+    for place_type, search in zip(types, searches):
+        if isinstance(search, ServiceError):
+            logger.info("Nearby search for %s failed: %s", place_type, search.detail)
+        elif isinstance(search, BaseException):
+            raise search
+        else:
+            pages[place_type] = search
+    return pages
+
+
+def _rank_places(result_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge per-type results by place id, best position in any list first.
+
+    Google orders each list by prominence, so taking positions across lists
+    interleaves the types. Ties go to places found for more of the types.
+    """
+    best: Dict[str, Tuple[int, int]] = {}
+    places: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for position, place in enumerate(results):
+            place_id = place["place_id"]
+            first, matches = best.get(place_id, (position, 0))
+            best[place_id] = (min(first, position), matches + 1)
+            places.setdefault(place_id, place)
+    order = sorted(places, key=lambda place_id: (best[place_id][0], -best[place_id][1]))
+    return [places[place_id] for place_id in order]
+
+
+async def _enrich_places(client: httpx.AsyncClient, places: List[Dict[str, Any]]) -> List[Restaurant]:
+    with deadline.detached(RESTAURANT_ENRICHMENT_DEADLINE_SECONDS):
+        enriched = await asyncio.gather(*(_enrich_place(client, place) for place in places), return_exceptions=True)
+    restaurants = []
+    for place, result in zip(places, enriched):
+        if isinstance(result, Exception):
+            logger.info("Adding %s without details: %s", place["place_id"], result)
+            result = _restaurant_from_place(place)
+        elif isinstance(result, BaseException):
+            raise result
+        restaurants.append(result)
+    return restaurants
+
 
-        if data.get("status") not in {"OK", "ZERO_RESULTS"}:
-            raise ServiceError(500, f"Google API error: {data.get('status')}")
-
-        for place in data.get("results", []):
-            photo_url = None
-            photo_urls: List[str] = []
-
-            if place.get("photos"):
-                for i, photo in enumerate(place["photos"][:5]):
-                    photo_ref = photo.get("photo_reference")
-                    if photo_ref:
-                        url = (
-                            f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800"
-                            f"&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
-                        )
+def _restaurant_from_place(place: Dict[str, Any]) -> Restaurant:
+    photo_url = None
+    photo_urls: List[str] = []
+
+    if place.get("photos"):
+        for i, photo in enumerate(place["photos"][:5]):
+            photo_ref = photo.get("photo_reference")
+            if photo_ref:
+                url = (
+                    f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800"
+                    f"&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
+                )
+                photo_urls.append(url)
+                if i == 0:
+                    photo_url = url
+
+    return Restaurant(
+        place_id=place["place_id"],
+        name=place["name"],
+        address=place.get("vicinity", ""),
+        rating=place.get("rating"),
+        price_level=place.get("price_level"),
+        photo_url=photo_url,
+        photo_urls=photo_urls,
+        lat=place["geometry"]["location"]["lat"],
+        lng=place["geometry"]["location"]["lng"],
+        types=place.get("types", []),
+    )
+
+
+async def _enrich_place(client: httpx.AsyncClient, place: Dict[str, Any]) -> Restaurant:
+    restaurant = _restaurant_from_place(place)
+    photo_urls = list(restaurant.photo_urls or [])
+
+    try:
+        detail_result = await _card_details(client, place["place_id"])
+    except (ServiceError, httpx.HTTPError) as exc:
+        logger.info("Skipping details for %s: %s", place["place_id"], getattr(exc, "detail", exc))
+        return restaurant
+    reviews: List[Review] = []
+
+    if detail_result is not None:
+        detail_photos = detail_result.get("photos", [])
+        if detail_photos and len(photo_urls) < 5:
+            for photo in detail_photos[1:]:
+                if len(photo_urls) >= 5:
+                    break
+                photo_ref = photo.get("photo_reference")
+                if photo_ref:
+                    url = (
+                        "https://maps.googleapis.com/maps/api/place/photo?"
+                        f"maxwidth=800&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
+                    )
+                    if url not in photo_urls:
                         photo_urls.append(url)
-                        if i == 0:
-                            photo_url = url
-
-            detail_params = {
-                "key": GOOGLE_API_KEY,
-                "place_id": place["place_id"],
-                "fields": "reviews,rating,user_ratings_total,photos,formatted_phone_number,website,url",
-                "language": "ja",
-            }
-
-            detail_response = await client.get(GOOGLE_PLACE_DETAILS_URL, params=detail_params)
-            reviews: List[Review] = []
-
-            if detail_response.status_code == 200:
-                detail_data = detail_response.json()
-                if detail_data.get("status") == "OK":
-                    detail_result = detail_data.get("result", {})
-
-                    detail_photos = detail_result.get("photos", [])
-                    if detail_photos and len(photo_urls) < 5:
-                        for photo in detail_photos[1:]:
-                            if len(photo_urls) >= 5:
-                                break
-                            photo_ref = photo.get("photo_reference")
-                            if photo_ref:
-                                url = (
-                                    "https://maps.googleapis.com/maps/api/place/photo?"
-                                    f"maxwidth=800&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
-                                )
-                                if url not in photo_urls:
-                                    photo_urls.append(url)
-
-                    raw_reviews = detail_result.get("reviews", [])
-                    for review in raw_reviews[:5]:
-                        reviews.append(
-                            Review(
-                                author_name=review.get("author_name", ""),
-                                rating=review.get("rating", 0),
-                                text=review.get("text", ""),
-                                time=review.get("relative_time_description", ""),
-                            )
-                        )
-
-            phone_number = None
-            website = None
-            google_maps_url = None
-            user_ratings_total = None
-
-            if detail_response.status_code == 200:
-                detail_data_result = detail_response.json()
-                if detail_data_result.get("status") == "OK":
-                    detail_info = detail_data_result.get("result", {})
-                    phone_number = detail_info.get("formatted_phone_number")
-                    website = detail_info.get("website")
-                    google_maps_url = detail_info.get("url")
-                    user_ratings_total = detail_info.get("user_ratings_total")
-
-            summary = await _generate_summary(place.get("name", ""), reviews, "card")
-
-            restaurant = Restaurant(
-                place_id=place["place_id"],
-                name=place["name"],
-                address=place.get("vicinity", ""),
-                rating=place.get("rating"),
-                price_level=place.get("price_level"),
-                photo_url=photo_url,
-                photo_urls=photo_urls,
-                lat=place["geometry"]["location"]["lat"],
-                lng=place["geometry"]["location"]["lng"],
-                types=place.get("types", []),
-                reviews=reviews,
-                phone_number=phone_number,
-                website=website,
-                google_maps_url=google_maps_url,
-                user_ratings_total=user_ratings_total,
-                summary=summary,
+
+        raw_reviews = detail_result.get("reviews", [])
+        for review in raw_reviews[:5]:
+            reviews.append(
+                Review(
+                    author_name=review.get("author_name", ""),
+                    rating=review.get("rating", 0),
+                    text=review.get("text", ""),
+                    time=review.get("relative_time_description", ""),
+                )
             )
-            restaurants.append(restaurant)
 
-    return restaurants
+    phone_number = None
+    website = None
+    google_maps_url = None
+    user_ratings_total = None
+
+    if detail_result is not None:
+        phone_number = detail_result.get("formatted_phone_number")
+        website = detail_result.get("website")
+        google_maps_url = detail_result.get("url")
+        user_ratings_total = detail_result.get("user_ratings_total")
+
+    # Cards work without a summary, so a degraded Gemini must not hold up or fail group creation.
+    try:
+        with quota.priority(quota.BULK):
+            summary = await _generate_summary(place.get("name", ""), reviews, "card", timeout=GEMINI_SLOW_CALL_SECONDS)
+    except ServiceError as exc:
+        logger.info("Skipping summary for %s: %s", place["place_id"], exc.detail)
+        summary = None
+
+    enriched = restaurant.model_copy(
+        update={
+            "photo_urls": photo_urls,
+            "reviews": reviews,
+            "phone_number": phone_number,
+            "website": website,
+            "google_maps_url": google_maps_url,
+            "user_ratings_total": user_ratings_total,
+            "summary": summary,
+        }
+    )
+    if detail_result is not None and KNOWN_PLACES_ENABLED:
+        known_places.add(enriched)
+    return enriched
+
 
+async def _card_details(client: httpx.AsyncClient, place_id: str) -> Optional[Dict[str, Any]]:
+    """The details a card shows, from ``details_cache`` when fresh; None when Google answered without them."""
+    cached = details_cache.get(place_id)
+    if cached is not None:
+        return cached
 
-async def get_restaurant_details(place_id: str) -> Restaurant:
+    detail_params = {
+        "key": GOOGLE_API_KEY,
+        "place_id": place_id,
+        "fields": "reviews,rating,user_ratings_total,photos,formatted_phone_number,website,url",
+        "language": "ja",
+    }
+    detail_response = await upstream.request(
+        client,
+        upstream.PLACE_DETAILS,
+        "GET",
+        GOOGLE_PLACE_DETAILS_URL,
+        span_attributes={"place_id": place_id},
+        idempotent=True,
+        params=detail_params,
+    )
+    if detail_response.status_code != 200:
+        return None
+    detail_data = detail_response.json()
+    if detail_data.get("status") != "OK":
+        upstream.record_api_status(upstream.PLACE_DETAILS, str(detail_data.get("status")))
+        return None
+    detail_result = detail_data.get("result", {})
+    details_cache.set(place_id, detail_result)
+    return detail_result
+
+
+@traced
+async def get_restaurant_details(place_id: str, include_summary: bool = True) -> Restaurant:
     if not GOOGLE_API_KEY:
         raise ServiceError(500, "Google API key not configured")
 
@@ -163,69 +555,79 @@ async def get_restaurant_details(place_id: str) -> Restaurant:
         "language": "ja",
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(GOOGLE_PLACE_DETAILS_URL, params=params)
+    client = upstream.shared_client()
+    response = await upstream.request(
+        client,
+        upstream.PLACE_DETAILS,
+        "GET",
+        GOOGLE_PLACE_DETAILS_URL,
+        span_attributes={"place_id": place_id},
+        idempotent=True,
+        params=params,
+    )
 
-        if response.status_code != 200:
-            raise ServiceError(response.status_code, "Failed to fetch restaurant details")
+    if response.status_code != 200:
+        raise ServiceError(response.status_code, "Failed to fetch restaurant details")
 
-        data = response.json()
+    data = response.json()
 
-        if data.get("status") != "OK":
-            raise ServiceError(500, f"Google API error: {data.get('status')}")
+    if data.get("status") != "OK":
+        upstream.record_api_status(upstream.PLACE_DETAILS, str(data.get("status")))
+        raise ServiceError(500, f"Google API error: {data.get('status')}")
 
-        place = data.get("result", {})
+    place = data.get("result", {})
 
-        photo_url = None
-        photo_urls: List[str] = []
+    photo_url = None
+    photo_urls: List[str] = []
 
-        if place.get("photos"):
-            for i, photo in enumerate(place["photos"][:5]):
-                photo_ref = photo.get("photo_reference")
-                if photo_ref:
-                    url = (
-                        f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800"
-                        f"&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
-                    )
-                    photo_urls.append(url)
-                    if i == 0:
-                        photo_url = url
-
-        reviews = []
-        raw_reviews = place.get("reviews", [])
-        for review in raw_reviews[:5]:
-            reviews.append(
-                Review(
-                    author_name=review.get("author_name", ""),
-                    rating=review.get("rating", 0),
-                    text=review.get("text", ""),
-                    time=review.get("relative_time_description", ""),
+    if place.get("photos"):
+        for i, photo in enumerate(place["photos"][:5]):
+            photo_ref = photo.get("photo_reference")
+            if photo_ref:
+                url = (
+                    f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800"
+                    f"&photoreference={photo_ref}&key={GOOGLE_API_KEY}"
                 )
+                photo_urls.append(url)
+                if i == 0:
+                    photo_url = url
+
+    reviews = []
+    raw_reviews = place.get("reviews", [])
+    for review in raw_reviews[:5]:
+        reviews.append(
+            Review(
+                author_name=review.get("author_name", ""),
+                rating=review.get("rating", 0),
+                text=review.get("text", ""),
+                time=review.get("relative_time_description", ""),
             )
-
-        summary = await _generate_summary(place.get("name", ""), reviews, "detail")
-
-        return Restaurant(
-            place_id=place_id,
-            name=place.get("name", ""),
-            address=place.get("formatted_address", ""),
-            rating=place.get("rating"),
-            price_level=place.get("price_level"),
-            photo_url=photo_url,
-            photo_urls=photo_urls,
-            lat=place.get("geometry", {}).get("location", {}).get("lat", 0),
-            lng=place.get("geometry", {}).get("location", {}).get("lng", 0),
-            types=place.get("types", []),
-            reviews=reviews,
-            phone_number=place.get("formatted_phone_number"),
-            website=place.get("website"),
-            google_maps_url=place.get("url"),
-            user_ratings_total=place.get("user_ratings_total"),
-            opening_hours=place.get("opening_hours"),
-            summary=summary,
         )
 
+    summary = await _generate_summary(place.get("name", ""), reviews, "detail") if include_summary else None
+
+    return Restaurant(
+        place_id=place_id,
+        name=place.get("name", ""),
+        address=place.get("formatted_address", ""),
+        rating=place.get("rating"),
+        price_level=place.get("price_level"),
+        photo_url=photo_url,
+        photo_urls=photo_urls,
+        lat=place.get("geometry", {}).get("location", {}).get("lat", 0),
+        lng=place.get("geometry", {}).get("location", {}).get("lng", 0),
+        types=place.get("types", []),
+        reviews=reviews,
+        phone_number=place.get("formatted_phone_number"),
+        website=place.get("website"),
+        google_maps_url=place.get("url"),
+        user_ratings_total=place.get("user_ratings_total"),
+        opening_hours=place.get("opening_hours"),
+        summary=summary,
+    )
+
 
+@traced
 async def summarize_restaurant(request_data: SummarizeRequest) -> str:
     summary = await _generate_summary(request_data.restaurant_name, request_data.reviews, request_data.format or "card")
     if summary is None:
@@ -233,13 +635,187 @@ async def summarize_restaurant(request_data: SummarizeRequest) -> str:
     return summary
 
 
-async def _generate_summary(restaurant_name: str, reviews: List[Review], format: str = "card") -> Optional[str]:
+@traced
+async def _generate_summary(
+    restaurant_name: str, reviews: List[Review], format: str = "card", timeout: float = 30.0
+) -> Optional[str]:
     if not GOOGLE_API_KEY:
         raise ServiceError(500, "Google API key not configured")
 
     if not reviews or len(reviews) < 5:
         return None
 
+    format = _prompt_format(format)
+    cache_key = _summary_cache_key(restaurant_name, reviews, format)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        llm.record_call(format, "hit")
+        return cached
+
+    prompt = _build_summary_prompt(restaurant_name, reviews, format)
+
+    try:
+        # Coalesced here rather than only in upstream.request, so a shared call is accounted once.
+        summary = await singleflight.do(
+            upstream.GEMINI, cache_key, lambda: _call_gemini(prompt, timeout, format), deadline.remaining()
+        )
+    except ServiceError:
+        stale = summary_cache.get(cache_key, allow_stale=True)
+        if stale is None:
+            raise
+        llm.record_call(format, "stale")
+        return stale
+
+    if summary is not None:
+        summary_cache.set(cache_key, summary)
+    return summary
+
+
+async def _call_gemini(prompt: str, timeout: float, format: str = "card") -> Optional[str]:
+    client = upstream.shared_client()
+    try:
+        async with gemini_scheduler.slot():
+            started = perf_counter()
+            response = await upstream.request(
+                client,
+                upstream.GEMINI,
+                "POST",
+                f"{GEMINI_API_URL}?key={GOOGLE_API_KEY}",
+                idempotent=True,
+                json=_gemini_payload(prompt),
+                timeout=timeout,
+            )
+    except httpx.TimeoutException as exc:
+        raise ServiceError(504, "Gemini API timeout") from exc
+    except ServiceError:
+        raise
+    except Exception as exc:
+        raise ServiceError(500, f"Error calling Gemini API: {exc}") from exc
+
+    if response.status_code != 200:
+        raise ServiceError(response.status_code, "Failed to call Gemini API")
+
+    data = response.json()
+
+    summary = None
+    if "candidates" in data and len(data["candidates"]) > 0:
+        summary = data["candidates"][0]["content"]["parts"][0]["text"].strip()
+    prompt_tokens, response_tokens = _token_counts(prompt, summary or "", data.get("usageMetadata"))
+    llm.record_call(format, "miss", prompt_tokens, response_tokens, perf_counter() - started)
+    return summary
+
+
+async def stream_summary(restaurant_name: str, reviews: List[Review], format: str = "card") -> AsyncIterator[str]:
+    """Yield the summary in pieces as Gemini writes it; a cached summary comes as one piece.
+
+    The finished summary is cached when the stream completes. Failing before the
+    first piece falls back to a stale cached summary, as ``_generate_summary`` does;
+    a failure after it is raised to the caller.
+    """
+    if not GOOGLE_API_KEY:
+        raise ServiceError(500, "Google API key not configured")
+    if not reviews or len(reviews) < 5:
+        raise ServiceError(500, "No summary generated")
+
+    format = _prompt_format(format)
+    cache_key = _summary_cache_key(restaurant_name, reviews, format)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        llm.record_call(format, "hit")
+        yield cached
+        return
+
+    prompt = _build_summary_prompt(restaurant_name, reviews, format)
+
+    pieces: List[str] = []
+    try:
+        async for piece in _stream_gemini(prompt, format):
+            piece = piece if pieces else piece.lstrip()
+            if piece:
+                pieces.append(piece)
+                yield piece
+    except ServiceError:
+        stale = summary_cache.get(cache_key, allow_stale=True)
+        if pieces or stale is None:
+            raise
+        llm.record_call(format, "stale")
+        yield stale
+        return
+
+    summary = "".join(pieces).strip()
+    if not summary:
+        raise ServiceError(500, "No summary generated")
+    summary_cache.set(cache_key, summary)
+
+
+async def _stream_gemini(prompt: str, format: str = "card", timeout: float = 30.0) -> AsyncIterator[str]:
+    client = upstream.shared_client()
+    text: List[str] = []
+    usage_metadata = None
+    try:
+        async with gemini_scheduler.slot():
+            started = perf_counter()
+            async with upstream.stream(
+                client,
+                upstream.GEMINI,
+                "POST",
+                f"{GEMINI_STREAM_API_URL}?alt=sse&key={GOOGLE_API_KEY}",
+                json=_gemini_payload(prompt),
+                timeout=timeout,
+            ) as response:
+                if response.status_code != 200:
+                    raise ServiceError(response.status_code, "Failed to call Gemini API")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = json.loads(line[5:])
+                    # Each chunk reports the usage so far; the last one has the totals.
+                    usage_metadata = chunk.get("usageMetadata", usage_metadata)
+                    for candidate in chunk.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                text.append(part["text"])
+                                yield part["text"]
+    except httpx.TimeoutException as exc:
+        raise ServiceError(504, "Gemini API timeout") from exc
+    except ServiceError:
+        raise
+    except Exception as exc:
+        raise ServiceError(500, f"Error calling Gemini API: {exc}") from exc
+    prompt_tokens, response_tokens = _token_counts(prompt, "".join(text), usage_metadata)
+    llm.record_call(format, "miss", prompt_tokens, response_tokens, perf_counter() - started)
+
+
+def _token_counts(prompt: str, response: str, usage_metadata: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+    """Token counts Gemini reported in ``usageMetadata``, or estimates when it did not."""
+    usage_metadata = usage_metadata or {}
+    prompt_tokens = usage_metadata.get("promptTokenCount")
+    response_tokens = usage_metadata.get("candidatesTokenCount")
+    return (
+        prompt_builder.estimate_tokens(prompt) if prompt_tokens is None else prompt_tokens,
+        prompt_builder.estimate_tokens(response) if response_tokens is None else response_tokens,
+    )
+
+
+def _prompt_format(format: str) -> str:
+    # Anything but "detail" gets the card prompt; folding it here keeps metric labels bounded.
+    return "detail" if format == "detail" else "card"
+
+
+def _gemini_payload(prompt: str) -> Dict[str, Any]:
+    return {"contents": [{"parts": [{"text": prompt}]}]}
+
+
+def _summary_cache_key(restaurant_name: str, reviews: List[Review], format: str) -> bytes:
+    # Keyed on what the prompt is built from, so a hit does not pay for fitting the reviews to the budget.
+    digest = hashlib.sha256(f"{format}\0{restaurant_name}".encode())
+    for review in reviews:
+        digest.update(f"\0{review.author_name}\0{review.rating}\0{review.text}".encode())
+    return digest.digest()
+
+
+def _build_summary_prompt(restaurant_name: str, reviews: List[Review], format: str = "card") -> str:
+    reviews = prompt_builder.fit_reviews(reviews, prompt_builder.REVIEW_TOKEN_BUDGETS[_prompt_format(format)])
     reviews_text = "\n".join(
         [
             REVIEW_LINE_TEMPLATE.format(
@@ -262,35 +838,4 @@ async def _generate_summary(restaurant_name: str, reviews: List[Review], format:
             reviews_text=reviews_text,
         )
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{GEMINI_API_URL}?key={GOOGLE_API_KEY}",
-                json={
-                    "contents": [
-                        {
-                            "parts": [
-                                {
-                                    "text": prompt,
-                                }
-                            ]
-                        }
-                    ]
-                },
-                timeout=30.0,
-            )
-        except httpx.TimeoutException as exc:
-            raise ServiceError(504, "Gemini API timeout") from exc
-        except Exception as exc:
-            raise ServiceError(500, f"Error calling Gemini API: {exc}") from exc
-
-        if response.status_code != 200:
-            raise ServiceError(response.status_code, "Failed to call Gemini API")
-
-        data = response.json()
-
-        if "candidates" in data and len(data["candidates"]) > 0:
-            summary = data["candidates"][0]["content"]["parts"][0]["text"]
-            return summary.strip()
-
-        return None
+    return prompt
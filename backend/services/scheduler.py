@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, NoReturn, Optional
+
+from backend.observability import metrics
+
+from . import deadline, quota
+from .exceptions import ServiceError
+
+
+SCHEDULER_QUEUE = metrics.gauge("scheduler_queue_depth", "Work waiting for a slot", ("scheduler", "priority"))
+SCHEDULER_RUNNING = metrics.gauge("scheduler_running", "Work holding a slot", ("scheduler", "priority"))
+SCHEDULER_WAIT = metrics.histogram(
+    "scheduler_wait_seconds", "Time work waited for a slot", ("scheduler", "priority")
+)
+SCHEDULER_DROPPED = metrics.counter(
+    "scheduler_dropped",
+    "Work dropped before it ran: its request deadline could not be met, or it queued too long",
+    ("scheduler", "priority", "reason"),
+)
+
+# Weight of the newest run in the moving average of how long a slot is held.
+SERVICE_TIME_ALPHA = 0.2
+
+
+class PriorityScheduler:
+    """Concurrency slots for one kind of work, handed out by priority class.
+
+    At most ``capacity`` runs at once and at most ``caps[priority]`` of one class,
+    so capping the bulk class below ``capacity`` keeps slots free for interactive
+    work. Waiters are served highest class first, FIFO within a class. Work is
+    dropped instead of queued when its request deadline leaves less time than a
+    slot is usually held for, and is dropped from the queue once it has waited
+    ``max_queue_seconds[priority]`` or its deadline comes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        caps: Dict[str, int],
+        max_queue_seconds: Dict[str, float],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.caps = caps
+        self.max_queue_seconds = max_queue_seconds
+        self.service_seconds = 0.0
+        self.running = {priority: 0 for priority in caps}
+        self._clock = clock
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in caps}
+        for priority in caps:
+            SCHEDULER_QUEUE.labels(name, priority).set_function(lambda priority=priority: len(self._queues[priority]))
+            SCHEDULER_RUNNING.labels(name, priority).set_function(lambda priority=priority: self.running[priority])
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot for the block; ``priority`` defaults to the caller's ``quota.priority``."""
+        priority = priority or quota.current_priority.get()
+        await self._acquire(priority)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            held = self._clock() - started
+            self.service_seconds += SERVICE_TIME_ALPHA * (held - self.service_seconds)
+            self.running[priority] -= 1
+            self._dispatch()
+
+    async def _acquire(self, priority: str) -> None:
+        left = deadline.remaining()
+        if left is not None and left <= self.service_seconds:
+            self._drop(priority, "deadline", 504, f"Request deadline leaves no time to call {self.name}")
+        if not self._queues[priority] and self._can_run(priority):
+            self.running[priority] += 1
+            SCHEDULER_WAIT.labels(self.name, priority).observe(0.0)
+            return
+
+        wait = self.max_queue_seconds[priority]
+        reason = "queue_timeout"
+        if left is not None and left - self.service_seconds < wait:
+            wait, reason = left - self.service_seconds, "deadline"
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(future)
+        started = self._clock()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait ended; pass it on.
+                self.running[priority] -= 1
+                self._dispatch()
+            else:
+                future.cancel()
+                self._queues[priority].remove(future)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            if reason == "deadline":
+                self._drop(priority, reason, 504, f"Request deadline exceeded waiting to call {self.name}")
+            self._drop(priority, reason, 503, f"Too much queued work for {self.name}; try again later")
+        SCHEDULER_WAIT.labels(self.name, priority).observe(self._clock() - started)
+
+    def _can_run(self, priority: str) -> bool:
+        return sum(self.running.values()) < self.capacity and self.running[priority] < self.caps[priority]
+
+    def _dispatch(self) -> None:
+        for priority in sorted(self._queues, key=quota.PRIORITY_ORDER.__getitem__):
+            queue = self._queues[priority]
+            while queue and self._can_run(priority):
+                future = queue.popleft()
+                if not future.done():
+                    self.running[priority] += 1
+                    future.set_result(None)
+
+    def _drop(self, priority: str, reason: str, status_code: int, detail: str) -> NoReturn:
+        SCHEDULER_DROPPED.labels(self.name, priority, reason).inc()
+        raise ServiceError(status_code, detail)
@@ -0,0 +1,78 @@
+import logging
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from backend.config import SHARD_OVERRIDE_REFRESH_SECONDS
+
+from .exceptions import ServiceError
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_SEPARATOR = "~"
+
+OverrideLoader = Callable[[], Awaitable[Dict[str, int]]]
+
+
+class ShardRouter:
+    """Maps group ids to shard indexes.
+
+    New ids carry their shard as a ``"<shard>~"`` prefix, so routing needs no lookup.
+    Ids without a prefix predate sharding and live on shard 0. Groups moved by the
+    rebalancer are listed in ``group_shard_overrides`` on shard 0; that table is
+    cached here and reloaded at most every ``SHARD_OVERRIDE_REFRESH_SECONDS``.
+    """
+
+    def __init__(self, shard_count: int, load_overrides: Optional[OverrideLoader] = None) -> None:
+        self.shard_count = shard_count
+        self._load_overrides = load_overrides
+        self._overrides: Dict[str, int] = {}
+        self._loaded_at = -math.inf
+
+    def encode(self, shard: int, token: str) -> str:
+        if self.shard_count == 1:
+            return token
+        return f"{shard}{SHARD_SEPARATOR}{token}"
+
+    def home_shard(self, group_id: str) -> int:
+        prefix, separator, _ = group_id.partition(SHARD_SEPARATOR)
+        if not separator:
+            return 0
+        if not prefix.isdigit() or int(prefix) >= self.shard_count:
+            raise ServiceError(404, "Group not found")
+        return int(prefix)
+
+    def pick_shard(self) -> int:
+        return random.randrange(self.shard_count)
+
+    def lookup(self, group_id: str) -> int:
+        """Shard for ``group_id`` using the override cache as it currently stands."""
+        shard = self._overrides.get(group_id)
+        if shard is not None and shard < self.shard_count:
+            return shard
+        return self.home_shard(group_id)
+
+    async def shard_for(self, group_id: str) -> int:
+        await self.refresh()
+        return self.lookup(group_id)
+
+    async def refresh(self, force: bool = False) -> None:
+        if self.shard_count == 1 or self._load_overrides is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._loaded_at < SHARD_OVERRIDE_REFRESH_SECONDS:
+            return
+        self._loaded_at = now
+        try:
+            self._overrides = await self._load_overrides()
+        except Exception:
+            # Keep routing with the last known overrides rather than failing every request.
+            logger.warning("Failed to reload group shard overrides", exc_info=True)
+
+    def set_local_override(self, group_id: str, shard: Optional[int]) -> None:
+        if shard is None:
+            self._overrides.pop(group_id, None)
+        else:
+            self._overrides[group_id] = shard
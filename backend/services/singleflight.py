@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from backend.observability import metrics
+
+from .exceptions import ServiceError
+
+
+T = TypeVar("T")
+
+COALESCED = metrics.counter(
+    "upstream_coalesced", "Calls that joined an identical call already in flight", ("upstream",)
+)
+FLIGHTS = metrics.gauge("upstream_singleflight_inflight", "Distinct upstream calls shared by their callers")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+_flights: Dict[Hashable, _Flight] = {}
+FLIGHTS.labels().set_function(lambda: len(_flights))
+
+
+async def do(name: str, key: Hashable, call: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+    """Await ``call()``, or the identical call under ``key`` that another caller already started.
+
+    The call runs as its own task in the context (deadline, trace) of the caller that
+    started it, and every caller gets its result or exception. A caller that is
+    cancelled, or whose ``timeout`` runs out, leaves without affecting the others; the
+    call is cancelled only when its last caller leaves. ``name`` labels the metrics.
+    """
+    flight = _flights.get(key)
+    if flight is None:
+        flight = _flights[key] = _Flight(asyncio.ensure_future(call()))
+        flight.task.add_done_callback(lambda _: _forget(key, flight))
+    else:
+        COALESCED.labels(name).inc()
+    flight.waiters += 1
+    try:
+        return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+    except asyncio.TimeoutError as exc:
+        if flight.task.done():
+            # The shared call raised TimeoutError itself; pass it on as it is.
+            raise
+        raise ServiceError(504, f"Request deadline exceeded waiting for {name}") from exc
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            _forget(key, flight)
+            flight.task.cancel()
+
+
+def _forget(key: Hashable, flight: _Flight) -> None:
+    if _flights.get(key) is flight:
+        del _flights[key]
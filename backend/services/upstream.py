@@ -0,0 +1,259 @@
+import json
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from backend.config import (
+    GEMINI_QPS,
+    GEMINI_SLOW_CALL_SECONDS,
+    HEDGE_UPSTREAMS,
+    PLACES_DETAILS_QPS,
+    PLACES_NEARBY_QPS,
+    PLACES_SLOW_CALL_SECONDS,
+    UPSTREAM_CONCURRENCY_MAX_WAIT_SECONDS,
+    UPSTREAM_KEEPALIVE_SECONDS,
+)
+from backend.observability import metrics, tracing
+
+from . import deadline, hedging, quota, resilience, singleflight
+
+
+NEARBY_SEARCH = "places_nearby"
+PLACE_DETAILS = "places_details"
+GEMINI = "gemini"
+
+QUOTA_RATES = {NEARBY_SEARCH: PLACES_NEARBY_QPS, PLACE_DETAILS: PLACES_DETAILS_QPS, GEMINI: GEMINI_QPS}
+SLOW_CALL_SECONDS = {
+    NEARBY_SEARCH: PLACES_SLOW_CALL_SECONDS,
+    PLACE_DETAILS: PLACES_SLOW_CALL_SECONDS,
+    GEMINI: GEMINI_SLOW_CALL_SECONDS,
+}
+
+UPSTREAM_DURATION = metrics.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external APIs", ("upstream", "outcome")
+)
+UPSTREAM_ERRORS = metrics.counter(
+    "upstream_request_errors", "Failed calls to external APIs, by failure kind", ("upstream", "kind")
+)
+
+# Load tests and local experiments swap this for a transport that serves simulated responses
+# (e.g. httpx.ASGITransport around backend/scripts/upstream_simulator.py).
+transport: Optional[httpx.AsyncBaseTransport] = None
+
+
+def new_client(**kwargs: Any) -> httpx.AsyncClient:
+    if transport is not None:
+        kwargs.setdefault("transport", transport)
+    return httpx.AsyncClient(**kwargs)
+
+
+_shared_client: Optional[httpx.AsyncClient] = None
+
+
+def shared_client() -> httpx.AsyncClient:
+    """Process-wide client, so calls reuse keep-alive connections instead of reconnecting to Google."""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        limits = httpx.Limits(
+            max_connections=100, max_keepalive_connections=20, keepalive_expiry=UPSTREAM_KEEPALIVE_SECONDS
+        )
+        _shared_client = new_client(limits=limits)
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+async def request(
+    client: httpx.AsyncClient,
+    upstream: str,
+    method: str,
+    url: str,
+    span_attributes: Optional[Dict[str, Any]] = None,
+    idempotent: bool = False,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Send ``method url`` through ``client`` and record latency under ``upstream``.
+
+    The call is refused with ``ServiceError(503)`` while the upstream's circuit is
+    open, and otherwise waits for a token from its quota governor and then for a
+    concurrency slot (either wait may end in ``ServiceError(503)``). Inside a
+    ``deadline.budget`` both waits and the request timeout are capped to what is
+    left of it, and ``ServiceError(504)`` is raised once nothing is. Non-2xx
+    responses are returned as usual; they only count as errors here, and 429/5xx
+    ones also count against the circuit.
+
+    ``idempotent`` calls share one in-flight call with identical concurrent ones
+    (same upstream, method, URL, params and JSON body); the ``timeout`` and span
+    attributes of the caller that started it apply. To an upstream in
+    ``HEDGE_UPSTREAMS`` they are also hedged: a second attempt, with its own quota
+    token, races the first once it runs slower than recent calls.
+    """
+    if not idempotent:
+        return await _attempt(client, upstream, method, url, span_attributes, **kwargs)
+    key = (
+        upstream,
+        method,
+        url,
+        json.dumps(kwargs.get("params"), sort_keys=True, default=str),
+        json.dumps(kwargs.get("json"), sort_keys=True, default=str),
+    )
+    return await singleflight.do(
+        upstream, key, lambda: _hedged(client, upstream, method, url, span_attributes, **kwargs), deadline.remaining()
+    )
+
+
+async def _hedged(
+    client: httpx.AsyncClient,
+    upstream: str,
+    method: str,
+    url: str,
+    span_attributes: Optional[Dict[str, Any]],
+    **kwargs: Any,
+) -> httpx.Response:
+    if upstream in HEDGE_UPSTREAMS:
+        return await hedging.hedged(
+            upstream,
+            lambda is_hedge: _attempt(
+                client, upstream, method, url, {**(span_attributes or {}), "hedge": is_hedge}, **kwargs
+            ),
+            _answered,
+        )
+    return await _attempt(client, upstream, method, url, span_attributes, **kwargs)
+
+
+async def _attempt(
+    client: httpx.AsyncClient,
+    upstream: str,
+    method: str,
+    url: str,
+    span_attributes: Optional[Dict[str, Any]],
+    **kwargs: Any,
+) -> httpx.Response:
+    guard = _guard(upstream)
+    with tracing.span(f"upstream.{upstream}", method=method, **(span_attributes or {})) as span:
+        call = await _admit(client, guard, span, kwargs)
+        verdict: Optional[bool] = None
+        started = perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            verdict = _answered(response)
+        except httpx.TimeoutException:
+            verdict = False
+            _record(upstream, "timeout", started)
+            raise
+        except httpx.HTTPError:
+            verdict = False
+            _record(upstream, "transport_error", started)
+            raise
+        finally:
+            guard.finish(call, verdict)
+        span.set_attribute("status_code", response.status_code)
+        if response.is_success:
+            elapsed = perf_counter() - started
+            UPSTREAM_DURATION.labels(upstream, "ok").observe(elapsed)
+            hedging.observe(upstream, elapsed)
+        else:
+            _record(upstream, f"http_{response.status_code}", started)
+        return response
+
+
+@asynccontextmanager
+async def stream(
+    client: httpx.AsyncClient,
+    upstream: str,
+    method: str,
+    url: str,
+    span_attributes: Optional[Dict[str, Any]] = None,
+    **kwargs: Any,
+) -> AsyncIterator[httpx.Response]:
+    """Like ``request``, but yields the response as soon as its headers arrive, with the body unread.
+
+    The upstream counts as slow only if the headers take longer than its slow-call
+    threshold. The call's verdict comes from the status as soon as the headers
+    arrive, so a 429 or 5xx counts as failed even if the caller raises on it; a
+    body that then breaks off also counts as failed. Streamed calls are neither
+    coalesced nor hedged. The span stays open while the body is read, so it is
+    detached: the caller may finish reading in another task.
+    """
+    guard = _guard(upstream)
+    with tracing.detached_span(
+        f"upstream.{upstream}", method=method, stream=True, **(span_attributes or {})
+    ) as span:
+        call = await _admit(client, guard, span, kwargs)
+        verdict: Optional[bool] = None
+        started = perf_counter()
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                if call.timer is not None:
+                    call.timer.cancel()
+                span.set_attribute("status_code", response.status_code)
+                span.set_attribute("first_byte_ms", round((perf_counter() - started) * 1000, 1))
+                verdict = _answered(response)
+                if not response.is_success:
+                    _record(upstream, f"http_{response.status_code}", started)
+                yield response
+        except httpx.TimeoutException:
+            verdict = False
+            _record(upstream, "timeout", started)
+            raise
+        except httpx.HTTPError:
+            verdict = False
+            _record(upstream, "transport_error", started)
+            raise
+        finally:
+            guard.finish(call, verdict)
+        if response.is_success:
+            UPSTREAM_DURATION.labels(upstream, "ok").observe(perf_counter() - started)
+
+
+def _guard(upstream: str) -> resilience.UpstreamGuard:
+    return resilience.guard_for(upstream, SLOW_CALL_SECONDS.get(upstream, PLACES_SLOW_CALL_SECONDS))
+
+
+async def _admit(
+    client: httpx.AsyncClient, guard: resilience.UpstreamGuard, span: Any, kwargs: Dict[str, Any]
+) -> resilience.Call:
+    """Pass the deadline, circuit, quota and concurrency checks; caps ``kwargs["timeout"]`` to the deadline."""
+    upstream = guard.name
+    deadline.check(f"calling {upstream}")
+    guard.check()
+    quota_wait = await quota.acquire(upstream, QUOTA_RATES.get(upstream, 0.0))
+    if quota_wait:
+        span.set_attribute("quota_wait_ms", round(quota_wait * 1000, 1))
+    call = await guard.admit(deadline.timeout(UPSTREAM_CONCURRENCY_MAX_WAIT_SECONDS))
+    left = deadline.remaining()
+    if left is not None:
+        if left == 0.0:
+            guard.finish(call, None)
+            deadline.check(f"calling {upstream}")
+        kwargs["timeout"] = min(_read_timeout(kwargs.get("timeout", client.timeout)), left)
+        span.set_attribute("deadline_ms", round(left * 1000))
+    return call
+
+
+def _read_timeout(timeout: Any) -> float:
+    if isinstance(timeout, httpx.Timeout):
+        timeout = timeout.read
+    return float("inf") if timeout is None else timeout
+
+
+def record_api_status(upstream: str, status: str) -> None:
+    """Count a 200 response whose body reports an API-level failure (e.g. OVER_QUERY_LIMIT)."""
+    UPSTREAM_ERRORS.labels(upstream, f"api_{status}").inc()
+
+
+def _answered(response: httpx.Response) -> bool:
+    """Whether the upstream handled the call; a 429 or 5xx counts against it (and never wins a hedge)."""
+    return response.status_code < 500 and response.status_code != 429
+
+
+def _record(upstream: str, kind: str, started: float) -> None:
+    UPSTREAM_DURATION.labels(upstream, "error").observe(perf_counter() - started)
+    UPSTREAM_ERRORS.labels(upstream, kind).inc()
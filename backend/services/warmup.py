@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.config import (
+    GEMINI_API_URL,
+    GOOGLE_PLACE_DETAILS_URL,
+    GOOGLE_PLACES_API_URL,
+    WARMUP_DB_CONNECTIONS,
+    WARMUP_UPSTREAM_CONNECTIONS,
+)
+
+from . import upstream
+from .database import shards
+
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_WARMUP_TIMEOUT_SECONDS = 5.0
+
+
+class WarmupState:
+    def __init__(self) -> None:
+        self.ready = False
+        self.seconds: Dict[str, float] = {}
+
+
+state = WarmupState()
+
+
+async def _open_connections(engine: AsyncEngine, count: int) -> int:
+    # Connections beyond pool_size would be closed again on release instead of staying pooled.
+    pool_size = getattr(engine.pool, "size", None)
+    if callable(pool_size):
+        count = min(count, pool_size())
+    connections = await asyncio.gather(*(engine.connect() for _ in range(count)))
+    await asyncio.gather(*(connection.close() for connection in connections))
+    return count
+
+
+async def warm_database(connections_per_engine: int) -> int:
+    if connections_per_engine <= 0:
+        return 0
+    engines: List[AsyncEngine] = [
+        engine for replica_set in shards for engine in (replica_set.primary, *replica_set.replicas)
+    ]
+    opened = await asyncio.gather(*(_open_connections(engine, connections_per_engine) for engine in engines))
+    return sum(opened)
+
+
+async def warm_upstreams(connections_per_host: int) -> int:
+    if connections_per_host <= 0:
+        return 0
+    origins = {
+        str(httpx.URL(url).copy_with(path="/", query=None))
+        for url in (GOOGLE_PLACES_API_URL, GOOGLE_PLACE_DETAILS_URL, GEMINI_API_URL)
+    }
+    client = upstream.shared_client()
+
+    async def connect(origin: str) -> bool:
+        # Any response leaves a keep-alive connection in the shared client's pool; the status is irrelevant.
+        try:
+            await client.head(origin, timeout=UPSTREAM_WARMUP_TIMEOUT_SECONDS)
+        except httpx.HTTPError as exc:
+            logger.warning("Could not pre-connect to %s: %s", origin, exc)
+            return False
+        return True
+
+    results = await asyncio.gather(*(connect(origin) for origin in origins for _ in range(connections_per_host)))
+    return sum(results)
+
+
+async def _timed(name: str, coro) -> None:
+    started = time.perf_counter()
+    try:
+        opened = await coro
+    except Exception:
+        logger.exception("Warm-up of %s failed", name)
+        return
+    finally:
+        state.seconds[name] = time.perf_counter() - started
+    logger.info("Warmed up %d %s connections in %.3fs", opened, name, state.seconds[name])
+
+
+async def warm_up() -> None:
+    """Pre-open DB and upstream connections in parallel; /readyz reports ready once this returns."""
+    try:
+        await asyncio.gather(
+            _timed("database", warm_database(WARMUP_DB_CONNECTIONS)),
+            _timed("upstream", warm_upstreams(WARMUP_UPSTREAM_CONNECTIONS)),
+        )
+    finally:
+        state.ready = True
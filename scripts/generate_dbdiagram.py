@@ -14,6 +14,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Float,
+    Index,
     Integer,
     LargeBinary,
     Numeric,
@@ -115,7 +116,12 @@ def build_table_section(table: Table) -> Sequence[str]:
         if isinstance(constraint, UniqueConstraint) and constraint.columns
     ]
 
-    if unique_constraints:
+    indexes: List[Index] = sorted(
+        (index for index in table.indexes if index.columns),
+        key=lambda index: index.name or "",
+    )
+
+    if unique_constraints or indexes:
         lines.append("")
         lines.append("  Indexes {")
         for constraint in unique_constraints:
@@ -124,6 +130,12 @@ def build_table_section(table: Table) -> Sequence[str]:
             if constraint.name:
                 attributes.append(f'name: "{constraint.name}"')
             lines.append(f"    ({column_list}) [{', '.join(attributes)}]")
+        for index in indexes:
+            column_list = ", ".join(column.name for column in index.columns)
+            attributes = ["unique"] if index.unique else []
+            if index.name:
+                attributes.append(f'name: "{index.name}"')
+            lines.append(f"    ({column_list}) [{', '.join(attributes)}]")
         lines.append("  }")
 
     lines.append("}")